@@ -0,0 +1,86 @@
+"""Prints the query plan of every Toolbox tool statement and flags full table scans.
+
+Run after setup-env.py (migrations included) with config.env sourced:
+    python Data/check-query-plans.py
+"""
+import os
+import sys
+import yaml
+import traceback
+from google.cloud import spanner
+from google.cloud.spanner_v1 import ExecuteSqlRequest, PlanNode
+
+PROJECT_ID = os.environ.get("PROJECT_ID")
+INSTANCE_NAME = os.environ.get("SPANNER_INSTANCE_NAME")
+DATABASE_NAME = os.environ.get("SPANNER_DATABASE_NAME")
+BASE_DIR = os.environ.get("BASE_DIR")
+
+TOOLS_FILE_NAME = f"{BASE_DIR}/zooka/Toolbox/tools.yaml"
+
+# Plans don't execute the query, so any representative value works
+SAMPLE_PARAMS = {
+    "symptom": "chest pain on exertion",
+    "disease": "Essential (Primary) Hypertension",
+}
+
+def explain(database, statement, params):
+    with database.snapshot() as snapshot:
+        results = snapshot.execute_sql(
+            statement,
+            params=params,
+            param_types={name: spanner.param_types.STRING for name in params},
+            query_mode=ExecuteSqlRequest.QueryMode.PLAN,
+        )
+        list(results)
+        return results.stats.query_plan.plan_nodes
+
+def print_plan(nodes):
+    """Prints the operator tree and returns the targets that are fully scanned."""
+    full_scans = []
+
+    def walk(index, depth):
+        node = nodes[index]
+        metadata = dict(node.metadata or {})
+        line = f"{'  ' * depth}{node.display_name}"
+        if metadata.get("scan_target"):
+            line += f" [{metadata.get('scan_type')}: {metadata['scan_target']}]"
+        if metadata.get("Full scan") == "true":
+            line += "  <-- FULL SCAN"
+            full_scans.append(metadata.get("scan_target"))
+        print(line)
+        for link in node.child_links:
+            if nodes[link.child_index].kind == PlanNode.Kind.RELATIONAL:
+                walk(link.child_index, depth + 1)
+
+    walk(0, 0)
+    return full_scans
+
+def main():
+    try:
+        with open(TOOLS_FILE_NAME) as f:
+            tools = yaml.safe_load(f)["tools"]
+
+        spanner_client = spanner.Client(project=PROJECT_ID)
+        database = spanner_client.instance(INSTANCE_NAME).database(DATABASE_NAME)
+
+        failures = []
+        for name, tool in tools.items():
+            params = {p["name"]: SAMPLE_PARAMS[p["name"]] for p in tool.get("parameters", [])}
+            print(f"\n=== {name} ===")
+            full_scans = print_plan(explain(database, tool["statement"], params))
+            if full_scans:
+                failures.append((name, full_scans))
+
+        print()
+        if failures:
+            for name, targets in failures:
+                print(f"{name}: full scan of {', '.join(targets)}")
+            sys.exit(1)
+        print("No full table scans in the Toolbox queries.")
+    except Exception as e:
+        print(f"Error checking query plans: {e}")
+        traceback.print_exc()
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
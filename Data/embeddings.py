@@ -0,0 +1,149 @@
+"""Incremental embedding refresh for symptom.Embedding.
+
+Only rows whose Embedding is missing, whose Name/Details changed since they were embedded,
+or that were embedded by another model version are sent to TextEmbeddingModel. Work is
+split into fixed-size chunks, embedded with bounded concurrency and committed per chunk,
+so one failing chunk is retried on its own and never loses the rest of the run.
+
+With EMBEDDING_SOURCE=fake the vectors are computed locally by fake_embedding instead:
+deterministic, and close for texts that share words, so synthetic catalogs (see
+generate_catalog.py) can be embedded and searched without a model endpoint. They are
+labelled with their own model version, so switching back to the model re-embeds every row.
+"""
+import os
+import re
+import time
+import hashlib
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+from google.cloud import spanner
+from migrations import EMBEDDING_DIMENSIONS
+
+# Label of the model behind TextEmbeddingModel. Changing it (after pointing the model at a new
+# endpoint) makes every row stale, i.e. a planned full re-embed.
+EMBEDDING_MODEL_VERSION = os.environ.get("EMBEDDING_MODEL_VERSION", "text-embedding-004")
+EMBED_CHUNK_SIZE = int(os.environ.get("EMBED_CHUNK_SIZE", "250"))
+EMBED_WORKERS = int(os.environ.get("EMBED_WORKERS", "4"))
+EMBED_RETRIES = int(os.environ.get("EMBED_RETRIES", "3"))
+# "model" embeds with TextEmbeddingModel, "fake" with fake_embedding (load tests only: the agent
+# still embeds questions with the model, so its searches against fake vectors are meaningless)
+EMBEDDING_SOURCE = os.environ.get("EMBEDDING_SOURCE", "model")
+FAKE_EMBEDDING_DIMENSIONS = int(os.environ.get("FAKE_EMBEDDING_DIMENSIONS", str(EMBEDDING_DIMENSIONS)))
+FAKE_MODEL_VERSION = f"fake-{FAKE_EMBEDDING_DIMENSIONS}"
+
+CONTENT = "COALESCE(Name, '') || ' ' || COALESCE(Details, '')"
+
+STALE_ROWS_SQL = f"""
+    SELECT ID
+    FROM symptom
+    WHERE Embedding IS NULL
+       OR EmbeddingHash IS NULL
+       OR EmbeddingHash != TO_HEX(SHA256({CONTENT}))
+       OR EmbeddingModel IS NULL
+       OR EmbeddingModel != @model
+    ORDER BY ID
+"""
+
+EMBED_CHUNK_SQL = f"""
+    SELECT ID, embeddings.values, content_hash
+    FROM ML.PREDICT(
+        MODEL TextEmbeddingModel,
+        (SELECT ID, {CONTENT} AS content, TO_HEX(SHA256({CONTENT})) AS content_hash
+         FROM symptom
+         WHERE ID IN UNNEST(@ids))
+    )
+"""
+
+CONTENT_CHUNK_SQL = f"""
+    SELECT ID, {CONTENT} AS content, TO_HEX(SHA256({CONTENT})) AS content_hash
+    FROM symptom
+    WHERE ID IN UNNEST(@ids)
+"""
+
+@lru_cache(maxsize=100_000)
+def _word_vector(word, dimensions):
+    seed = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
+    return np.random.default_rng(seed).standard_normal(dimensions)
+
+def fake_embedding(content, dimensions=FAKE_EMBEDDING_DIMENSIONS):
+    """Unit vector summing a fixed random vector per word of content; the same text always gets the same vector."""
+    vector = np.zeros(dimensions)
+    for word in re.findall(r"[a-z0-9]+", (content or "").lower()):
+        vector += _word_vector(word, dimensions)
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).astype(np.float32).tolist()
+
+def stale_symptom_ids(database, model_version):
+    with database.snapshot() as snapshot:
+        results = snapshot.execute_sql(
+            STALE_ROWS_SQL,
+            params={"model": model_version},
+            param_types={"model": spanner.param_types.STRING},
+        )
+        return [row[0] for row in results]
+
+def embed_chunk(database, ids, model_version, source=EMBEDDING_SOURCE):
+    """Embeds one chunk and commits it in its own transaction; returns the rows written."""
+    with database.snapshot() as snapshot:
+        results = snapshot.execute_sql(
+            CONTENT_CHUNK_SQL if source == "fake" else EMBED_CHUNK_SQL,
+            params={"ids": ids},
+            param_types={"ids": spanner.param_types.Array(spanner.param_types.STRING)},
+        )
+        if source == "fake":
+            results = [(row[0], fake_embedding(row[1]), row[2]) for row in results]
+        # The commit timestamp lets the agent's symptom index pick up only the new vectors
+        updates = [(row[0], row[1], row[2], model_version, spanner.COMMIT_TIMESTAMP) for row in results]
+
+    if updates:
+        with database.batch() as batch:
+            batch.update(
+                table='symptom',
+                columns=['ID', 'Embedding', 'EmbeddingHash', 'EmbeddingModel', 'EmbeddingUpdatedAt'],
+                values=updates
+            )
+    return len(updates)
+
+def embed_chunk_with_retries(database, ids, model_version, retries, source=EMBEDDING_SOURCE):
+    for attempt in range(1, retries + 1):
+        try:
+            return embed_chunk(database, ids, model_version, source)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = 2 ** attempt
+            print(f"Embedding chunk starting at {ids[0]} failed ({e}); retrying in {delay}s...")
+            time.sleep(delay)
+
+def refresh_embeddings(database, model_version=None, chunk_size=EMBED_CHUNK_SIZE,
+                       workers=EMBED_WORKERS, retries=EMBED_RETRIES, source=EMBEDDING_SOURCE):
+    """Re-embeds stale symptom rows; returns a summary including rows per second."""
+    start = time.perf_counter()
+    if model_version is None:
+        model_version = FAKE_MODEL_VERSION if source == "fake" else EMBEDDING_MODEL_VERSION
+    ids = stale_symptom_ids(database, model_version)
+    chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+    print(f"{len(ids)} symptom(s) need embeddings ({len(chunks)} chunk(s) of up to {chunk_size}).")
+
+    written = 0
+    failed_chunks = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(embed_chunk_with_retries, database, chunk, model_version, retries, source): chunk
+                   for chunk in chunks}
+        for future in as_completed(futures):
+            try:
+                written += future.result()
+            except Exception as e:
+                failed_chunks += 1
+                print(f"Giving up on chunk starting at {futures[future][0]} after {retries} attempts: {e}")
+
+    seconds = time.perf_counter() - start
+    return {
+        'source': source,
+        'stale': len(ids),
+        'embedded': written,
+        'failed_chunks': failed_chunks,
+        'seconds': round(seconds, 2),
+        'rows_per_second': round(written / seconds, 1) if seconds else 0.0,
+    }
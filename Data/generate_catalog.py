@@ -0,0 +1,196 @@
+"""Generates synthetic data.json-shaped catalogs for scale tests, streamed straight to disk.
+
+Every entry has the shape data.json has, so the output loads through setup-env.py
+(CATALOG_FILE=...) and loader.py like the real catalog. Content is built from data.json's
+own vocabulary:
+
+- Diseases are data.json's diseases with numbered subtypes ("Unstable Angina Subtype 12").
+- Symptoms, diagnostic procedures and treatments are drawn either from a shared pool,
+  whose rows many diseases reuse with Zipf-distributed popularity (a few rows such as
+  "Fatigue" or "Echocardiogram" are everywhere, most are rare), or written for the
+  disease alone. Pools grow sublinearly with the number of diseases, as a real catalog's
+  vocabulary does. Diagnostic procedures are shared the most and treatments the least.
+- Shared symptoms are non-specific, so their confidence is mostly Low or Medium, while
+  disease-specific ones are mostly High. Treatment efficacy and types follow data.json's
+  own distribution, and each disease has one gold-standard procedure, sometimes two.
+
+The output depends only on the arguments, so a run can be reproduced from its command
+line. Embeddings are not part of the file: load it with EMBEDDING_SOURCE=fake to have
+update_embeddings write deterministic vectors (see embeddings.py) without a model endpoint.
+
+    python Data/generate_catalog.py --diseases 100000 --out /tmp/catalog-100k.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from collections import Counter
+import numpy as np
+
+SEED_CATALOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data.json")
+
+# Average rows per disease; data.json itself has about 2 of each
+SYMPTOMS_PER_DISEASE = float(os.environ.get("CATALOG_SYMPTOMS_PER_DISEASE", "5"))
+DIAGNOSTICS_PER_DISEASE = float(os.environ.get("CATALOG_DIAGNOSTICS_PER_DISEASE", "2.5"))
+TREATMENTS_PER_DISEASE = float(os.environ.get("CATALOG_TREATMENTS_PER_DISEASE", "3"))
+
+# kind -> (share of a disease's rows taken from the shared pool, pool size = scale * diseases ** exponent)
+SHARING = {
+    "symptom": (0.4, 3.0, 0.75),
+    "diagnostic": (0.7, 2.0, 0.6),
+    "treatment": (0.3, 2.0, 0.7),
+}
+# Popularity of the n-th most used pool row falls off as 1 / n ** ZIPF_EXPONENT
+ZIPF_EXPONENT = 1.05
+
+# Symptom confidence for shared (non-specific) and disease-specific rows
+SHARED_CONFIDENCE = {"High": 0.2, "Medium": 0.5, "Low": 0.3}
+SPECIFIC_CONFIDENCE = {"High": 0.75, "Medium": 0.22, "Low": 0.03}
+# Chance that a disease has a second gold-standard procedure
+SECOND_GOLD_STANDARD = 0.12
+
+
+class Pool:
+    """Rows reused across diseases, picked by Zipf-distributed popularity."""
+
+    def __init__(self, vocabulary, size, rng):
+        self.vocabulary = vocabulary
+        self.size = max(len(vocabulary), size)
+        weights = 1.0 / np.arange(1, self.size + 1) ** ZIPF_EXPONENT
+        self._cumulative = np.cumsum(weights / weights.sum())
+        # Popular ranks shouldn't all come from the start of data.json
+        self._order = rng.permutation(self.size)
+        self._rng = rng
+
+    def draw(self, count):
+        ranks = np.searchsorted(self._cumulative, self._rng.random(count), side="right")
+        return list(dict.fromkeys(int(self._order[min(r, self.size - 1)]) for r in ranks))
+
+    def row(self, index):
+        """The index-th pool row: a data.json row, then numbered variants of them."""
+        base = self.vocabulary[index % len(self.vocabulary)]
+        variant = index // len(self.vocabulary)
+        return base, variant
+
+
+class CatalogGenerator:
+
+    def __init__(self, diseases, seed=0, seed_catalog=SEED_CATALOG, symptoms=SYMPTOMS_PER_DISEASE,
+                 diagnostics=DIAGNOSTICS_PER_DISEASE, treatments=TREATMENTS_PER_DISEASE):
+        with open(seed_catalog) as f:
+            catalog = json.load(f)
+        self.diseases = diseases
+        self.rng = np.random.default_rng(seed)
+        self.means = {"symptom": symptoms, "diagnostic": diagnostics, "treatment": treatments}
+        self.base_diseases = [(e["disease_name"], e["description"]) for e in catalog]
+
+        vocabulary = {
+            "symptom": [(s["symptom"], s["details"]) for e in catalog for s in e["symptoms"]],
+            "diagnostic": [(d["procedure"], d["purpose"]) for e in catalog for d in e["diagnostic_procedures"]],
+            "treatment": [(t["treatment"], t["details"], t["treatment_type"])
+                          for e in catalog for t in e["treatments_and_cures"]],
+        }
+        self.vocabulary = {kind: list(dict.fromkeys(rows)) for kind, rows in vocabulary.items()}
+        self.pools = {
+            kind: Pool(self.vocabulary[kind], int(scale * diseases ** exponent), self.rng)
+            for kind, (_, scale, exponent) in SHARING.items()
+        }
+        efficacy = Counter(t["confidence_efficacy"] for e in catalog for t in e["treatments_and_cures"])
+        self.efficacy = (list(efficacy), np.array(list(efficacy.values())) / sum(efficacy.values()))
+
+    def _count(self, kind):
+        return 1 + int(self.rng.poisson(self.means[kind] - 1))
+
+    def _choice(self, weights):
+        labels = list(weights)
+        return labels[int(self.rng.choice(len(labels), p=list(weights.values())))]
+
+    def _rows(self, kind, disease_name):
+        """(shared, row fields) for one disease: pool rows first, then rows written for it alone."""
+        count = self._count(kind)
+        share = SHARING[kind][0]
+        shared = self.pools[kind].draw(int(self.rng.binomial(count, share)))
+        rows = []
+        for index in shared:
+            (name, text, *rest), variant = self.pools[kind].row(index)
+            if variant:
+                text = f"{text} (presentation {variant})"
+            rows.append((True, (name, text, *rest)))
+        vocabulary = self.vocabulary[kind]
+        for position in self.rng.integers(0, len(vocabulary), size=count - len(shared)):
+            name, text, *rest = vocabulary[int(position)]
+            rows.append((False, (name, f"{text} Seen in {disease_name}.", *rest)))
+        # A disease lists each procedure or treatment name once, even if two pool rows share it
+        return list({fields[0]: (is_shared, fields) for is_shared, fields in rows}.values())
+
+    def entry(self, number):
+        base, description = self.base_diseases[number % len(self.base_diseases)]
+        subtype = number // len(self.base_diseases)
+        name = f"{base} Subtype {subtype}" if subtype else base
+        if subtype:
+            description = f"{description} Subtype {subtype} of {base}."
+
+        symptoms = [
+            {"symptom": symptom, "confidence_indicator": self._choice(SHARED_CONFIDENCE if shared else SPECIFIC_CONFIDENCE),
+             "details": details}
+            for shared, (symptom, details) in self._rows("symptom", name)
+        ]
+        diagnostics = [
+            {"procedure": procedure, "is_gold_standard": False, "purpose": purpose}
+            for _, (procedure, purpose) in self._rows("diagnostic", name)
+        ]
+        gold = 2 if len(diagnostics) > 1 and self.rng.random() < SECOND_GOLD_STANDARD else 1
+        for position in self.rng.choice(len(diagnostics), size=gold, replace=False):
+            diagnostics[int(position)]["is_gold_standard"] = True
+        labels, p = self.efficacy
+        treatments = [
+            {"treatment_type": treatment_type, "treatment": treatment,
+             "confidence_efficacy": labels[int(self.rng.choice(len(labels), p=p))], "details": details}
+            for _, (treatment, details, treatment_type) in self._rows("treatment", name)
+        ]
+        return {"disease_name": name, "description": description, "symptoms": symptoms,
+                "diagnostic_procedures": diagnostics, "treatments_and_cures": treatments}
+
+    def __iter__(self):
+        for number in range(self.diseases):
+            yield self.entry(number)
+
+
+def write_catalog(path, entries):
+    """Writes entries as one JSON array, an entry at a time; returns how many were written."""
+    count = 0
+    with open(path, "w") as f:
+        f.write("[\n")
+        for entry in entries:
+            if count:
+                f.write(",\n")
+            f.write(json.dumps(entry, ensure_ascii=False))
+            count += 1
+        f.write("\n]\n")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--diseases", type=int, required=True, help="number of diseases, e.g. 10000 to 1000000")
+    parser.add_argument("--out", required=True, help="output file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--seed-catalog", default=SEED_CATALOG, help="catalog whose vocabulary is reused")
+    parser.add_argument("--symptoms", type=float, default=SYMPTOMS_PER_DISEASE, help="average symptoms per disease")
+    parser.add_argument("--diagnostics", type=float, default=DIAGNOSTICS_PER_DISEASE, help="average diagnostics per disease")
+    parser.add_argument("--treatments", type=float, default=TREATMENTS_PER_DISEASE, help="average treatments per disease")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    generator = CatalogGenerator(args.diseases, args.seed, args.seed_catalog, args.symptoms,
+                                 args.diagnostics, args.treatments)
+    count = write_catalog(args.out, generator)
+    seconds = time.perf_counter() - start
+    size_mb = os.path.getsize(args.out) / 2 ** 20
+    print(f"Wrote {count} diseases to {args.out} ({size_mb:.1f} MB) in {seconds:.1f}s "
+          f"({count / seconds:.0f} diseases/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
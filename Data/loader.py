@@ -0,0 +1,194 @@
+"""Idempotent, streaming bulk loader for data.json-shaped catalogs.
+
+IDs are derived from content, so a symptom, test or treatment shared by several diseases
+is stored once and re-running the load produces the same keys. Each wave's rows are
+compared with the stored rows under the same keys, read by key, and only new or changed
+rows are upserted, in mutation-bounded batches committed in parallel. Rows that
+disappeared from the file are deleted, found by streaming the stored keys only.
+"""
+import os
+import json
+import time
+import uuid
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from google.cloud import spanner
+
+# Spanner allows 80,000 mutations per commit; leave room for the secondary and FK backing indexes
+MAX_MUTATIONS_PER_BATCH = int(os.environ.get("LOADER_MAX_MUTATIONS", "20000"))
+LOADER_WORKERS = int(os.environ.get("LOADER_WORKERS", "8"))
+# Catalog entries parsed before each write wave; bounds memory on large files
+WAVE_ENTRIES = int(os.environ.get("LOADER_WAVE_ENTRIES", "5000"))
+# Keys per read of the stored rows a wave is compared with
+READ_KEYS = int(os.environ.get("LOADER_READ_KEYS", "2000"))
+
+ID_NAMESPACE = uuid.UUID("6f1c2a8e-3b5d-4e7f-9a0b-1c2d3e4f5a6b")
+
+# table -> (key columns, all written columns). Embedding columns are left to update_embeddings.
+TABLES = {
+    'disease': (('ID',), ('ID', 'Name', 'Description')),
+    'symptom': (('ID',), ('ID', 'Name', 'Details')),
+    'diagnostic': (('ID',), ('ID', 'Name', 'Purpose')),
+    'treatment': (('ID',), ('ID', 'Name', 'Details')),
+    'indicate': (('DiseaseID', 'SymptomID'), ('DiseaseID', 'SymptomID', 'Confidence')),
+    'verify': (('DiseaseID', 'DiagnosticID'), ('DiseaseID', 'DiagnosticID', 'IsGoldStandard')),
+    'cure': (('DiseaseID', 'TreatmentID'), ('DiseaseID', 'TreatmentID', 'TreatmentType', 'Confidence')),
+}
+NODE_TABLES = ('disease', 'symptom', 'diagnostic', 'treatment')
+EDGE_TABLES = ('indicate', 'verify', 'cure')
+
+def iter_json_array(path, read_size=1 << 16):
+    """Yields the elements of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buffer = f.read(read_size).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f"{path} does not contain a JSON array")
+        buffer = buffer[1:]
+        eof = False
+        while True:
+            buffer = buffer.lstrip().lstrip(',').lstrip()
+            if buffer.startswith(']'):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(read_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            yield item
+            buffer = buffer[end:]
+
+def stable_id(kind, *fields):
+    """Deterministic UUID (fits STRING(36)) derived from the entity kind and its content."""
+    normalized = "\x1f".join(" ".join(str(f or "").split()).lower() for f in fields)
+    return str(uuid.uuid5(ID_NAMESPACE, f"{kind}\x1e{normalized}"))
+
+def row_digest(row):
+    return hashlib.blake2b(repr(row).encode(), digest_size=8).digest()
+
+
+class CatalogLoader:
+
+    def __init__(self, database, max_mutations=MAX_MUTATIONS_PER_BATCH, workers=LOADER_WORKERS,
+                 wave_entries=WAVE_ENTRIES, prune=True, read_keys=READ_KEYS):
+        self.database = database
+        self.max_mutations = max_mutations
+        self.workers = workers
+        self.wave_entries = wave_entries
+        self.read_keys = read_keys
+        self.prune = prune
+        self.stats = {'entries': 0, 'unchanged': 0, 'upserted': 0, 'deleted': 0, 'batches': 0}
+
+    def _read_existing(self, work):
+        """Returns {key: digest} for the stored rows of table among keys."""
+        table, keys = work
+        key_columns, columns = TABLES[table]
+        with self.database.snapshot() as snapshot:
+            rows = snapshot.read(table=table, columns=columns, keyset=spanner.KeySet(keys=[list(k) for k in keys]))
+            return {tuple(row[:len(key_columns)]): row_digest(tuple(row)) for row in rows}
+
+    def _stored_keys(self, table):
+        """Yields the key of every stored row of table, reading the key columns only."""
+        with self.database.snapshot() as snapshot:
+            for row in snapshot.execute_sql(f"SELECT {', '.join(TABLES[table][0])} FROM {table}"):
+                yield tuple(row)
+
+    def _rows(self, entries):
+        """Turns catalog entries into deduplicated rows per table."""
+        rows = {table: {} for table in TABLES}
+        for entry in entries:
+            disease_id = stable_id('disease', entry.get('disease_name'))
+            rows['disease'][(disease_id,)] = (disease_id, entry.get('disease_name'), entry.get('description'))
+
+            for sym in entry.get('symptoms', []):
+                s_id = stable_id('symptom', sym.get('symptom'), sym.get('details'))
+                rows['symptom'][(s_id,)] = (s_id, sym.get('symptom'), sym.get('details'))
+                rows['indicate'][(disease_id, s_id)] = (disease_id, s_id, sym.get('confidence_indicator'))
+
+            for diag in entry.get('diagnostic_procedures', []):
+                d_id = stable_id('diagnostic', diag.get('procedure'), diag.get('purpose'))
+                rows['diagnostic'][(d_id,)] = (d_id, diag.get('procedure'), diag.get('purpose'))
+                rows['verify'][(disease_id, d_id)] = (disease_id, d_id, diag.get('is_gold_standard'))
+
+            for treat in entry.get('treatments_and_cures', []):
+                t_id = stable_id('treatment', treat.get('treatment'), treat.get('details'))
+                rows['treatment'][(t_id,)] = (t_id, treat.get('treatment'), treat.get('details'))
+                rows['cure'][(disease_id, t_id)] = (
+                    disease_id, t_id, treat.get('treatment_type'), treat.get('confidence_efficacy'))
+        return rows
+
+    def _changed(self, pool, table, rows, seen):
+        keys = [key for key in rows if key not in seen[table]]
+        seen[table].update(keys)
+        existing = {}
+        for digests in pool.map(self._read_existing, [(table, keys[i:i + self.read_keys])
+                                                       for i in range(0, len(keys), self.read_keys)]):
+            existing.update(digests)
+        changed = []
+        for key in keys:
+            row = rows[key]
+            if existing.get(key) == row_digest(row):
+                self.stats['unchanged'] += 1
+            else:
+                changed.append(row)
+        return changed
+
+    def _batches(self, table, rows):
+        """Splits rows so each commit stays under max_mutations cells."""
+        size = max(1, self.max_mutations // len(TABLES[table][1]))
+        for start in range(0, len(rows), size):
+            yield table, rows[start:start + size]
+
+    def _commit_upsert(self, work):
+        table, rows = work
+        with self.database.batch() as batch:
+            batch.insert_or_update(table=table, columns=TABLES[table][1], values=rows)
+        return len(rows)
+
+    def _commit_delete(self, work):
+        table, keys = work
+        with self.database.batch() as batch:
+            batch.delete(table, spanner.KeySet(keys=[list(k) for k in keys]))
+        return len(keys)
+
+    def _run(self, pool, commit, work):
+        work = list(work)
+        self.stats['batches'] += len(work)
+        return sum(pool.map(commit, work))
+
+    def load(self, path):
+        """Synchronizes the database with the catalog at `path`; returns load statistics."""
+        start = time.perf_counter()
+        seen = {table: set() for table in TABLES}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            wave = []
+            for entry in iter_json_array(path):
+                wave.append(entry)
+                if len(wave) >= self.wave_entries:
+                    self._write_wave(pool, wave, seen)
+                    wave = []
+            if wave:
+                self._write_wave(pool, wave, seen)
+
+            if self.prune:
+                # Edges first, so no foreign key points at a node we are about to delete
+                for tables in (EDGE_TABLES, NODE_TABLES):
+                    stale = [(t, [k for k in self._stored_keys(t) if k not in seen[t]]) for t in tables]
+                    work = [b for table, keys in stale for b in self._batches(table, keys)]
+                    self.stats['deleted'] += self._run(pool, self._commit_delete, work)
+
+        self.stats['seconds'] = round(time.perf_counter() - start, 2)
+        return self.stats
+
+    def _write_wave(self, pool, wave, seen):
+        self.stats['entries'] += len(wave)
+        rows = self._rows(wave)
+        # Nodes must be committed before the edges that reference them
+        for tables in (NODE_TABLES, EDGE_TABLES):
+            work = [b for t in tables for b in self._batches(t, self._changed(pool, t, rows[t], seen))]
+            self.stats['upserted'] += self._run(pool, self._commit_upsert, work)
@@ -0,0 +1,225 @@
+"""Versioned schema migrations for the Zooka Spanner database.
+
+Each migration is applied once, in order, and recorded in schema_migrations. Re-running
+setup only applies what is pending. Databases created before migrations existed are
+adopted by probing INFORMATION_SCHEMA for each migration's objects.
+"""
+import os
+import traceback
+from google.cloud import spanner
+
+PROJECT_ID = os.environ.get("PROJECT_ID")
+REGION_ID = os.environ.get("REGION_ID")
+
+# text-embedding-004 returns 768 dimensions; the vector index needs the length fixed on the column
+EMBEDDING_DIMENSIONS = 768
+# Leaves of the vector index tree; roughly sqrt(rows) with headroom for catalog growth
+VECTOR_INDEX_LEAVES = int(os.environ.get("VECTOR_INDEX_LEAVES", "100"))
+
+TABLE_EXISTS = "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = '' AND table_name = '{}'"
+COLUMN_EXISTS = ("SELECT COUNT(*) FROM information_schema.columns "
+                 "WHERE table_schema = '' AND table_name = '{}' AND column_name = '{}'")
+INDEX_EXISTS = "SELECT COUNT(*) FROM information_schema.indexes WHERE table_schema = '' AND index_name = '{}'"
+GRAPH_EXISTS = "SELECT COUNT(*) FROM information_schema.property_graphs WHERE property_graph_name = '{}'"
+
+
+class Migration:
+
+    def __init__(self, version, name, statements, probe):
+        self.version = version
+        self.name = name
+        self.statements = statements
+        # Query returning a count > 0 when the migration's objects already exist
+        self.probe = probe
+
+
+MIGRATIONS = [
+    Migration(1, "initial_schema", [
+        """CREATE TABLE disease (
+            ID STRING(36) NOT NULL,
+            Name STRING(MAX),
+            Description STRING(MAX)
+        ) PRIMARY KEY (ID)""",
+
+        # Embedding column
+        """CREATE TABLE symptom (
+            ID STRING(36) NOT NULL,
+            Name STRING(MAX),
+            Details STRING(MAX),
+            Embedding ARRAY<FLOAT32>
+        ) PRIMARY KEY (ID)""",
+
+        """CREATE TABLE diagnostic (
+            ID STRING(36) NOT NULL,
+            Name STRING(MAX),
+            Purpose STRING(MAX)
+        ) PRIMARY KEY (ID)""",
+
+        """CREATE TABLE treatment (
+            ID STRING(36) NOT NULL,
+            Name STRING(MAX),
+            Details STRING(MAX)
+        ) PRIMARY KEY (ID)""",
+
+        """CREATE TABLE indicate (
+            DiseaseID STRING(36) NOT NULL,
+            SymptomID STRING(36) NOT NULL,
+            Confidence STRING(MAX),
+            FOREIGN KEY (DiseaseID) REFERENCES disease (ID),
+            FOREIGN KEY (SymptomID) REFERENCES symptom (ID)
+        ) PRIMARY KEY (DiseaseID, SymptomID)""",
+
+        """CREATE TABLE verify (
+            DiseaseID STRING(36) NOT NULL,
+            DiagnosticID STRING(36) NOT NULL,
+            IsGoldStandard BOOL,
+            FOREIGN KEY (DiseaseID) REFERENCES disease (ID),
+            FOREIGN KEY (DiagnosticID) REFERENCES diagnostic (ID)
+        ) PRIMARY KEY (DiseaseID, DiagnosticID)""",
+
+        """CREATE TABLE cure (
+            DiseaseID STRING(36) NOT NULL,
+            TreatmentID STRING(36) NOT NULL,
+            TreatmentType STRING(MAX),
+            Confidence STRING(MAX),
+            FOREIGN KEY (DiseaseID) REFERENCES disease (ID),
+            FOREIGN KEY (TreatmentID) REFERENCES treatment (ID)
+        ) PRIMARY KEY (DiseaseID, TreatmentID)""",
+
+        """CREATE TABLE users (
+            username STRING(128) NOT NULL,
+            password_hash STRING(256) NOT NULL,
+        ) PRIMARY KEY (username)""",
+
+        f"""CREATE MODEL TextEmbeddingModel
+        INPUT(content STRING(MAX))
+        OUTPUT(
+            embeddings STRUCT<
+                values ARRAY<FLOAT32>,
+                statistics STRUCT<truncated BOOL, token_count FLOAT64>
+            >
+        )
+        REMOTE OPTIONS (
+            endpoint = '//aiplatform.googleapis.com/projects/{PROJECT_ID}/locations/{REGION_ID}/publishers/google/models/text-embedding-004'
+        )""",
+    ], TABLE_EXISTS.format("disease")),
+
+    # Lets the agent's symptom index pick up only the vectors written since its last load
+    Migration(2, "symptom_embedding_updated_at", [
+        "ALTER TABLE symptom ADD COLUMN EmbeddingUpdatedAt TIMESTAMP OPTIONS (allow_commit_timestamp=true)",
+    ], COLUMN_EXISTS.format("symptom", "EmbeddingUpdatedAt")),
+
+    # Bumped after every load so in-process caches know when to reload
+    Migration(3, "data_version", [
+        """CREATE TABLE data_version (
+            Name STRING(64) NOT NULL,
+            Version INT64 NOT NULL,
+            UpdatedAt TIMESTAMP OPTIONS (allow_commit_timestamp=true)
+        ) PRIMARY KEY (Name)""",
+    ], TABLE_EXISTS.format("data_version")),
+
+    # We define nodes for entities and edges for the relationship tables connecting them.
+    Migration(4, "heart_disease_graph", ["""
+        CREATE PROPERTY GRAPH HeartDiseaseGraph
+        NODE TABLES (
+            disease,
+            symptom,
+            diagnostic,
+            treatment
+        )
+        EDGE TABLES (
+            indicate
+                SOURCE KEY (SymptomID) REFERENCES symptom (ID)
+                DESTINATION KEY (DiseaseID) REFERENCES disease (ID)
+                LABEL Indicates,
+            verify
+                SOURCE KEY (DiseaseID) REFERENCES disease (ID)
+                DESTINATION KEY (DiagnosticID) REFERENCES diagnostic (ID)
+                LABEL VerifiedBy,
+            cure
+                SOURCE KEY (DiseaseID) REFERENCES disease (ID)
+                DESTINATION KEY (TreatmentID) REFERENCES treatment (ID)
+                LABEL CuredBy
+        )
+    """], GRAPH_EXISTS.format("HeartDiseaseGraph")),
+
+    # search-diagnostic-by-disease and search-cure-by-disease filter on d.Name
+    Migration(5, "disease_name_index", [
+        "CREATE INDEX DiseaseByName ON disease(Name) STORING (Description)",
+    ], INDEX_EXISTS.format("DiseaseByName")),
+
+    # find-all-diseases-by-symptom orders by APPROX_COSINE_DISTANCE over this index
+    Migration(6, "symptom_embedding_vector_index", [
+        f"ALTER TABLE symptom ALTER COLUMN Embedding ARRAY<FLOAT32>(vector_length=>{EMBEDDING_DIMENSIONS})",
+        f"""CREATE VECTOR INDEX SymptomEmbeddingIndex
+        ON symptom(Embedding)
+        WHERE Embedding IS NOT NULL
+        OPTIONS (distance_type = 'COSINE', tree_depth = 2, num_leaves = {VECTOR_INDEX_LEAVES})""",
+    ], INDEX_EXISTS.format("SymptomEmbeddingIndex")),
+
+    # Which content and model produced each vector, so refreshes only re-embed what changed
+    Migration(7, "symptom_embedding_provenance", [
+        "ALTER TABLE symptom ADD COLUMN EmbeddingHash STRING(64)",
+        "ALTER TABLE symptom ADD COLUMN EmbeddingModel STRING(MAX)",
+    ], COLUMN_EXISTS.format("symptom", "EmbeddingModel")),
+]
+
+SCHEMA_MIGRATIONS_DDL = """CREATE TABLE schema_migrations (
+    Version INT64 NOT NULL,
+    Name STRING(MAX),
+    AppliedAt TIMESTAMP OPTIONS (allow_commit_timestamp=true)
+) PRIMARY KEY (Version)"""
+
+def _count(database, sql):
+    with database.snapshot() as snapshot:
+        return next(iter(snapshot.execute_sql(sql)))[0]
+
+def _record(database, migration):
+    with database.batch() as batch:
+        batch.insert_or_update(
+            table='schema_migrations',
+            columns=['Version', 'Name', 'AppliedAt'],
+            values=[(migration.version, migration.name, spanner.COMMIT_TIMESTAMP)]
+        )
+
+def applied_versions(database):
+    """Returns the applied migration versions, creating schema_migrations on first use."""
+    if _count(database, TABLE_EXISTS.format("schema_migrations")):
+        with database.snapshot() as snapshot:
+            return {row[0] for row in snapshot.execute_sql("SELECT Version FROM schema_migrations")}
+
+    print("Creating schema_migrations table...")
+    database.update_ddl([SCHEMA_MIGRATIONS_DDL]).result(timeout=240)
+
+    # Adopt a database created before migrations existed
+    applied = set()
+    for migration in MIGRATIONS:
+        if _count(database, migration.probe):
+            print(f"Migration {migration.version} ({migration.name}) already present, recording it.")
+            _record(database, migration)
+            applied.add(migration.version)
+    return applied
+
+def pending_migrations(database):
+    applied = applied_versions(database)
+    return [m for m in MIGRATIONS if m.version not in applied]
+
+def apply_migrations(database):
+    """Applies every pending migration in order; returns how many ran."""
+    try:
+        pending = pending_migrations(database)
+        if not pending:
+            print("Schema is up to date.")
+            return 0
+
+        for migration in pending:
+            print(f"Applying migration {migration.version} ({migration.name})...")
+            operation = database.update_ddl(migration.statements)
+            operation.result(timeout=1800)
+            _record(database, migration)
+        print(f"Applied {len(pending)} migration(s).")
+        return len(pending)
+    except Exception as e:
+        print(f"Error applying migrations: {e}")
+        traceback.print_exc()
+        raise
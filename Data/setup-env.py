@@ -1,10 +1,10 @@
 import os
-import uuid
-import json
-import time
 import traceback
 from google.cloud import spanner
 from google.cloud.spanner_admin_instance_v1.types import spanner_instance_admin
+from migrations import apply_migrations
+from loader import CatalogLoader
+from embeddings import refresh_embeddings, EMBEDDING_SOURCE
 
 # --- Configuration Loading ---
 PROJECT_ID = os.environ.get("PROJECT_ID")
@@ -13,7 +13,8 @@ INSTANCE_NAME = os.environ.get("SPANNER_INSTANCE_NAME")
 DATABASE_NAME = os.environ.get("SPANNER_DATABASE_NAME")
 BASE_DIR = os.environ.get("BASE_DIR")
 
-JSON_FILE_NAME = f"{BASE_DIR}/zooka/Data/data.json"
+# A synthetic catalog from generate_catalog.py can be loaded instead, for scale tests
+JSON_FILE_NAME = os.environ.get("CATALOG_FILE") or f"{BASE_DIR}/zooka/Data/data.json"
 
 def validate_env():
     try:
@@ -64,289 +65,80 @@ def create_instance(instance_id):
         raise
 
 def create_database(instance_id, database_id):
-    """Creates a database, tables, and the ML Model within the instance."""
+    """Creates the database if needed, then applies any pending schema migrations."""
     try:
         spanner_client = spanner.Client(project=PROJECT_ID)
         instance = spanner_client.instance(instance_id)
-        
-        print(f"Creating Database: {database_id}...")
-        
-        # DDL Statements
-        ddl_statements = [
-            """CREATE TABLE disease (
-                ID STRING(36) NOT NULL,
-                Name STRING(MAX),
-                Description STRING(MAX)
-            ) PRIMARY KEY (ID)""",
-            
-            # Embedding column
-            """CREATE TABLE symptom (
-                ID STRING(36) NOT NULL,
-                Name STRING(MAX),
-                Details STRING(MAX),
-                Embedding ARRAY<FLOAT32>
-            ) PRIMARY KEY (ID)""",
-
-            """CREATE TABLE diagnostic (
-                ID STRING(36) NOT NULL,
-                Name STRING(MAX),
-                Purpose STRING(MAX)
-            ) PRIMARY KEY (ID)""",
-
-            """CREATE TABLE treatment (
-                ID STRING(36) NOT NULL,
-                Name STRING(MAX),
-                Details STRING(MAX)
-            ) PRIMARY KEY (ID)""",
-
-            """CREATE TABLE indicate (
-                DiseaseID STRING(36) NOT NULL,
-                SymptomID STRING(36) NOT NULL,
-                Confidence STRING(MAX),
-                FOREIGN KEY (DiseaseID) REFERENCES disease (ID),
-                FOREIGN KEY (SymptomID) REFERENCES symptom (ID)
-            ) PRIMARY KEY (DiseaseID, SymptomID)""",
-
-            """CREATE TABLE verify (
-                DiseaseID STRING(36) NOT NULL,
-                DiagnosticID STRING(36) NOT NULL,
-                IsGoldStandard BOOL,
-                FOREIGN KEY (DiseaseID) REFERENCES disease (ID),
-                FOREIGN KEY (DiagnosticID) REFERENCES diagnostic (ID)
-            ) PRIMARY KEY (DiseaseID, DiagnosticID)""",
-
-            """CREATE TABLE cure (
-                DiseaseID STRING(36) NOT NULL,
-                TreatmentID STRING(36) NOT NULL,
-                TreatmentType STRING(MAX),
-                Confidence STRING(MAX),
-                FOREIGN KEY (DiseaseID) REFERENCES disease (ID),
-                FOREIGN KEY (TreatmentID) REFERENCES treatment (ID)
-            ) PRIMARY KEY (DiseaseID, TreatmentID)""",
+        database = instance.database(database_id)
 
-            """CREATE TABLE users (
-                username STRING(128) NOT NULL,
-                password_hash STRING(256) NOT NULL,
-                ) PRIMARY KEY (username)""",
-                
-                f"""CREATE MODEL TextEmbeddingModel
-                INPUT(content STRING(MAX))
-                OUTPUT(
-                    embeddings STRUCT<
-                        values ARRAY<FLOAT32>,
-                        statistics STRUCT<truncated BOOL, token_count FLOAT64>
-                    >
-                )
-                REMOTE OPTIONS (
-                    endpoint = '//aiplatform.googleapis.com/projects/{PROJECT_ID}/locations/{REGION_ID}/publishers/google/models/text-embedding-004'
-                )"""
-        ]
-        database = instance.database(database_id, ddl_statements)
-        operation = database.create()
-        print("Waiting for database and table creation...")
-        operation.result(timeout=240)
-        print("Database created successfully.")
+        if database.exists():
+            print(f"Database {database_id} already exists.")
+        else:
+            print(f"Creating Database: {database_id}...")
+            operation = database.create()
+            print("Waiting for database creation...")
+            operation.result(timeout=240)
+            print("Database created successfully.")
+
+        # Tables, the ML Model, the graph and the indexes all live in Data/migrations.py
+        apply_migrations(database)
         return database
     except Exception as e:
         print(f"Error in create_database: {e}")
         traceback.print_exc()
         raise
 
-def read_json_local():
-    """Reads the JSON file from the local directory."""
+def insert_data(database):
+    """Streams data.json into Spanner, upserting only new or changed rows."""
     try:
-        print(f"Reading {JSON_FILE_NAME} from local directory...")
+        print(f"Loading {JSON_FILE_NAME}...")
         if not os.path.exists(JSON_FILE_NAME):
-            raise FileNotFoundError(f"File {JSON_FILE_NAME} not found in current directory.")
-        
-        with open(JSON_FILE_NAME, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Error reading JSON file: {e}")
-        traceback.print_exc()
-        raise
-
-def insert_data(database, data):
-    """Parses JSON and inserts data into Spanner with deduplication."""
-    try:
-        print("Parsing data and preparing for insertion...")
-        
-        #symptom_lookup = {} 
-        #diagnostic_lookup = {}
-        #treatment_lookup = {}
-
-        rows_disease = []
-        rows_symptom = []
-        rows_diagnostic = []
-        rows_treatment = []
-        
-        rows_indicate = []
-        rows_verify = []
-        rows_cure = []
-
-        for entry in data:
-            disease_id = str(uuid.uuid4())
-            rows_disease.append((
-                disease_id, 
-                entry.get('disease_name'), 
-                entry.get('description')
-            ))
-
-            for sym in entry.get('symptoms', []):
-                s_name = sym.get('symptom')
-                #if s_name not in symptom_lookup:
-                s_uuid = str(uuid.uuid4())
-                #symptom_lookup[s_name] = s_uuid
-                # Note: Embedding is None initially
-                rows_symptom.append((s_uuid, s_name, sym.get('details'), None))
-               # else:
-                   # s_uuid = symptom_lookup[s_name]
-                
-                rows_indicate.append((
-                    disease_id, 
-                    s_uuid, 
-                    sym.get('confidence_indicator')
-                ))
-
-            for diag in entry.get('diagnostic_procedures', []):
-                d_name = diag.get('procedure')
-                #if d_name not in diagnostic_lookup:
-                d_uuid = str(uuid.uuid4())
-                #diagnostic_lookup[d_name] = d_uuid
-                rows_diagnostic.append((d_uuid, d_name, diag.get('purpose')))
-                #else:
-                 #   d_uuid = diagnostic_lookup[d_name]
-                
-                rows_verify.append((
-                    disease_id, 
-                    d_uuid, 
-                    diag.get('is_gold_standard')
-                ))
+            raise FileNotFoundError(f"File {JSON_FILE_NAME} not found.")
 
-            for treat in entry.get('treatments_and_cures', []):
-                t_name = treat.get('treatment')
-                #if t_name not in treatment_lookup:
-                t_uuid = str(uuid.uuid4())
-                #treatment_lookup[t_name] = t_uuid
-                rows_treatment.append((t_uuid, t_name, treat.get('details')))
-                #else:
-                #    t_uuid = treatment_lookup[t_name]
-                
-                rows_cure.append((
-                    disease_id, 
-                    t_uuid, 
-                    treat.get('treatment_type'),
-                    treat.get('confidence_efficacy')
-                ))
-
-        def insert_batch(txn):
-            if rows_disease:
-                txn.insert(table='disease', columns=('ID', 'Name', 'Description'), values=rows_disease)
-            if rows_symptom:
-                txn.insert(table='symptom', columns=('ID', 'Name', 'Details', 'Embedding'), values=rows_symptom)
-            if rows_diagnostic:
-                txn.insert(table='diagnostic', columns=('ID', 'Name', 'Purpose'), values=rows_diagnostic)
-            if rows_treatment:
-                txn.insert(table='treatment', columns=('ID', 'Name', 'Details'), values=rows_treatment)
-            
-            if rows_indicate:
-                txn.insert(table='indicate', columns=('DiseaseID', 'SymptomID', 'Confidence'), values=rows_indicate)
-            if rows_verify:
-                txn.insert(table='verify', columns=('DiseaseID', 'DiagnosticID', 'IsGoldStandard'), values=rows_verify)
-            if rows_cure:
-                txn.insert(table='cure', columns=('DiseaseID', 'TreatmentID', 'TreatmentType', 'Confidence'), values=rows_cure)
-
-        print("Writing data to Spanner...")
-        database.run_in_transaction(insert_batch)
-        print("Data insertion complete.")
+        stats = CatalogLoader(database).load(JSON_FILE_NAME)
+        print(f"Data load complete: {stats}")
+        return stats
     except Exception as e:
         print(f"Error in insert_data: {e}")
         traceback.print_exc()
         raise
 
 def update_embeddings(database):
-    """Uses the Spanner ML Model to generate and store embeddings."""
+    """Uses the Spanner ML Model to embed new or changed symptoms only."""
     try:
-        print("Generating Embeddings using Database Model (TextEmbeddingModel)...")
-        
-        sql_query = """
-            SELECT ID, embeddings.values 
-            FROM ML.PREDICT(
-                MODEL TextEmbeddingModel, 
-                (SELECT ID, Name || ' ' || Details AS content FROM symptom)
-            )
-        """
-        
-        updates = []
-        
-        with database.snapshot() as snapshot:
-            results = snapshot.execute_sql(sql_query)
-            for row in results:
-                updates.append((row[0], row[1]))
-        
-        if not updates:
-            print("No symptoms found to embed.")
-            return
-
-        print(f"Fetched {len(updates)} embeddings. Updating table...")
-
-        def write_embeddings(txn):
-            txn.update(
-                table='symptom',
-                columns=['ID', 'Embedding'],
-                values=updates
-            )
-            
-        database.run_in_transaction(write_embeddings)
-        print("Embeddings generated and updated successfully.")
-        
+        if EMBEDDING_SOURCE == "fake":
+            print("Generating deterministic fake embeddings (EMBEDDING_SOURCE=fake)...")
+        else:
+            print("Generating Embeddings using Database Model (TextEmbeddingModel)...")
+        stats = refresh_embeddings(database)
+        print(f"Embedding refresh complete: {stats}")
+        if stats['failed_chunks']:
+            print("NOTE: Failed chunks are picked up again on the next run. "
+                  "Ensure the Spanner Service Agent has 'Vertex AI User' role.")
+        return stats
     except Exception as e:
         print(f"\nError generating embeddings: {e}")
         print("NOTE: Ensure the Spanner Service Agent has 'Vertex AI User' role.")
         traceback.print_exc()
 
-def create_spanner_graph(instance_id, database_id):
-    """Creates the Spanner Graph (Knowledge Graph) schema."""
+def bump_data_version(database):
+    """Increments the catalog data version read by the agent's graph and symptom caches."""
     try:
-        print("Creating Spanner Graph Schema...")
-        spanner_client = spanner.Client(project=PROJECT_ID)
-        instance = spanner_client.instance(instance_id)
-        database = instance.database(database_id)
-
-        # Graph DDL
-        # We define nodes for entities and edges for the relationship tables
-        # connecting them.
-        graph_ddl = ["""
-            CREATE PROPERTY GRAPH HeartDiseaseGraph
-            NODE TABLES (
-                disease,
-                symptom,
-                diagnostic,
-                treatment
+        def increment(txn):
+            results = txn.execute_sql("SELECT Version FROM data_version WHERE Name = 'catalog'")
+            row = next(iter(results), None)
+            version = (row[0] if row else 0) + 1
+            txn.insert_or_update(
+                table='data_version',
+                columns=['Name', 'Version', 'UpdatedAt'],
+                values=[('catalog', version, spanner.COMMIT_TIMESTAMP)]
             )
-            EDGE TABLES (
-                indicate
-                    SOURCE KEY (SymptomID) REFERENCES symptom (ID)
-                    DESTINATION KEY (DiseaseID) REFERENCES disease (ID)
-                    LABEL Indicates,
-                verify
-                    SOURCE KEY (DiseaseID) REFERENCES disease (ID)
-                    DESTINATION KEY (DiagnosticID) REFERENCES diagnostic (ID)
-                    LABEL VerifiedBy,
-                cure
-                    SOURCE KEY (DiseaseID) REFERENCES disease (ID)
-                    DESTINATION KEY (TreatmentID) REFERENCES treatment (ID)
-                    LABEL CuredBy
-            )
-        """]
-
-        operation = database.update_ddl(graph_ddl)
-        print("Waiting for Graph creation...")
-        operation.result(timeout=240)
-        print("Spanner Graph 'HeartDiseaseGraph' created successfully.")
+            return version
 
+        version = database.run_in_transaction(increment)
+        print(f"Catalog data version is now {version}.")
     except Exception as e:
-        print(f"Error creating Spanner Graph: {e}")
+        print(f"Error bumping data version: {e}")
         traceback.print_exc()
 
 def main():
@@ -354,12 +146,13 @@ def main():
         validate_env()
         create_instance(INSTANCE_NAME)
         database = create_database(INSTANCE_NAME, DATABASE_NAME)
-        json_data = read_json_local()
-        insert_data(database, json_data)
+        insert_data(database)
         update_embeddings(database)
-        create_spanner_graph(INSTANCE_NAME, DATABASE_NAME)
+        bump_data_version(database)
     except Exception as e:
-        print("Script failed due to an unhandled exception.")
+        print(f"Script failed due to an unhandled exception: {e}")
+        traceback.print_exc()
+        exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
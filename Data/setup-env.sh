@@ -64,4 +64,7 @@ done
 
 echo "Time's up!"
 
-python $BASE_DIR/zooka/Data/setup-env.py
\ No newline at end of file
+python $BASE_DIR/zooka/Data/setup-env.py
+
+echo "Checking the Toolbox query plans for full table scans"
+python $BASE_DIR/zooka/Data/check-query-plans.py
@@ -0,0 +1,126 @@
+import os
+import math
+import time
+import threading
+from metrics import ADMISSION_IN_FLIGHT, ADMISSION_WAITING, ADMISSION_WAIT_SECONDS, ADMISSION_REJECTED
+
+# Agent streams one container runs at once; each holds a Gemini stream in Agent Engine
+MAX_STREAMS = int(os.environ.get("AGENT_MAX_STREAMS", "100"))
+# Requests allowed to wait for a stream, and for how long. In-flight plus waiting requests
+# must stay below GUNICORN_THREADS so other routes always find a thread.
+MAX_WAITING = int(os.environ.get("AGENT_MAX_WAITING", "100"))
+WAIT_SECONDS = float(os.environ.get("AGENT_WAIT_SECONDS", "10"))
+# Bounds of the Retry-After sent with a 429
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 30
+
+
+class Rejected(Exception):
+    """The request wasn't admitted; `status` and `retry_after` go into the response."""
+
+    def __init__(self, reason, retry_after, status=429):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+        self.status = status
+
+
+class Ticket:
+    """An admitted request's stream slot; release it when the response is closed."""
+
+    def __init__(self, controller, session_key):
+        self._controller = controller
+        self._session_key = session_key
+        self._started = time.perf_counter()
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._controller._release(self._session_key, time.perf_counter() - self._started)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+class AdmissionController:
+    """Caps in-flight agent streams, with a bounded wait, and runs one stream per session at a time.
+
+    A second question on a session waits for the first answer, so Agent Engine never runs
+    two turns on one session at once. The same question sent again while it is being
+    answered (a double submit) is refused with 409. When every stream is busy, requests
+    wait up to `wait_seconds` in a queue of at most `max_waiting`; past that they get a 429
+    with a Retry-After estimated from recent stream durations.
+    """
+
+    def __init__(self, max_streams=MAX_STREAMS, max_waiting=MAX_WAITING, wait_seconds=WAIT_SECONDS):
+        self.max_streams = max_streams
+        self.max_waiting = max_waiting
+        self.wait_seconds = wait_seconds
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._waiting = 0
+        # session key -> message being answered
+        self._sessions = {}
+        # Moving average of stream durations, for Retry-After; None until a stream finished
+        self._stream_seconds = None
+
+    def _retry_after(self):
+        seconds = (self._stream_seconds or 1.0) * (self._waiting + 1) / self.max_streams
+        return max(MIN_RETRY_AFTER, min(MAX_RETRY_AFTER, math.ceil(seconds)))
+
+    def _reject(self, reason, status=429):
+        ADMISSION_REJECTED.labels(reason=reason).inc()
+        return Rejected(reason, self._retry_after(), status)
+
+    def _can_start(self, session_key):
+        return self._in_flight < self.max_streams and session_key not in self._sessions
+
+    def acquire(self, session_key, message):
+        """Blocks until the request may stream and returns its Ticket, or raises Rejected."""
+        start = time.perf_counter()
+        with self._cond:
+            if session_key in self._sessions and self._sessions[session_key] == message:
+                raise self._reject("duplicate", status=409)
+            if not self._can_start(session_key):
+                if self._waiting >= self.max_waiting:
+                    raise self._reject("queue_full")
+                self._waiting += 1
+                ADMISSION_WAITING.set(self._waiting)
+                deadline = start + self.wait_seconds
+                try:
+                    while not self._can_start(session_key):
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            raise self._reject("session_busy" if session_key in self._sessions else "timeout")
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+                    ADMISSION_WAITING.set(self._waiting)
+            self._in_flight += 1
+            self._sessions[session_key] = message
+            ADMISSION_IN_FLIGHT.set(self._in_flight)
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - start)
+        return Ticket(self, session_key)
+
+    def _release(self, session_key, seconds):
+        with self._cond:
+            self._in_flight -= 1
+            self._sessions.pop(session_key, None)
+            if self._stream_seconds is None:
+                self._stream_seconds = seconds
+            else:
+                self._stream_seconds = 0.8 * self._stream_seconds + 0.2 * seconds
+            ADMISSION_IN_FLIGHT.set(self._in_flight)
+            self._cond.notify_all()
+
+    def summary(self):
+        with self._cond:
+            return {"in_flight": self._in_flight, "waiting": self._waiting, "max_streams": self.max_streams}
@@ -0,0 +1,200 @@
+import os
+import time
+import socket
+import random
+import sqlite3
+import asyncio
+import threading
+from metrics import CLEANUP_QUEUE_DEPTH, CLEANUP_JOB_SECONDS, CLEANUP_ATTEMPTS
+
+# Sessions waiting to be stored in memory and deleted. Keep it on a disk that outlives the
+# process; on Cloud Run /tmp survives worker restarts but not a new instance, and sessions
+# lost that way are picked up by the next login's sweep of leftover sessions.
+QUEUE_PATH = os.environ.get("CLEANUP_QUEUE_PATH", "/tmp/zooka-cleanup-queue.sqlite3")
+CONCURRENCY = int(os.environ.get("CLEANUP_CONCURRENCY", "4"))
+MAX_ATTEMPTS = int(os.environ.get("CLEANUP_MAX_ATTEMPTS", "8"))
+BACKOFF_SECONDS = float(os.environ.get("CLEANUP_BACKOFF_SECONDS", "2"))
+MAX_BACKOFF_SECONDS = float(os.environ.get("CLEANUP_MAX_BACKOFF_SECONDS", "300"))
+# A claimed job whose worker hasn't finished it after this long is handed to another worker
+LEASE_SECONDS = float(os.environ.get("CLEANUP_LEASE_SECONDS", "600"))
+# Workers look for jobs whose backoff expired at least this often
+POLL_SECONDS = float(os.environ.get("CLEANUP_POLL_SECONDS", "5"))
+
+SCHEMA = """CREATE TABLE IF NOT EXISTS cleanup_jobs (
+    session_id TEXT PRIMARY KEY,
+    username TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    run_after REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    stored INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    claimed_by TEXT,
+    claimed_at REAL,
+    last_error TEXT
+)"""
+
+# A session that ended twice is queued once; one that gave up earlier is tried afresh
+ENQUEUE_SQL = """INSERT INTO cleanup_jobs (session_id, username, enqueued_at, run_after) VALUES (?, ?, ?, ?)
+    ON CONFLICT (session_id) DO UPDATE SET
+        enqueued_at = excluded.enqueued_at, run_after = excluded.run_after, attempts = 0, failed = 0, last_error = NULL
+    WHERE failed = 1"""
+
+CLAIM_SQL = """UPDATE cleanup_jobs SET claimed_by = ?, claimed_at = ?
+    WHERE session_id = (
+        SELECT session_id FROM cleanup_jobs
+        WHERE failed = 0 AND run_after <= ? AND (claimed_by IS NULL OR claimed_at < ?)
+        ORDER BY run_after LIMIT 1
+    )
+    RETURNING session_id, username, enqueued_at, attempts, stored"""
+
+DEPTH_SQL = """SELECT
+    SUM(failed = 0 AND claimed_by IS NULL), SUM(failed = 0 AND claimed_by IS NOT NULL), SUM(failed = 1)
+    FROM cleanup_jobs"""
+
+
+def is_not_found(error):
+    """True when Agent Engine says the session doesn't exist (any more)."""
+    return getattr(error, "code", None) in (404, "NOT_FOUND") or "not found" in str(error).lower()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class CleanupJob:
+
+    def __init__(self, queue, session_id, username, enqueued_at, attempts, stored):
+        self.queue = queue
+        self.session_id = session_id
+        self.username = username
+        self.enqueued_at = enqueued_at
+        self.attempts = attempts
+        self.stored = bool(stored)
+
+    async def mark_stored(self):
+        """Records that the session is in memory, so a retry only has to delete it."""
+        await asyncio.to_thread(self.queue.mark_stored, self.session_id)
+        self.stored = True
+
+
+class CleanupQueue:
+    """SQLite-backed queue of sessions to store in memory and delete, drained by async workers.
+
+    Jobs are claimed with a lease rather than removed, and only deleted once cleaned up, so
+    jobs that a dead process had claimed are picked up again when the app restarts.
+    """
+
+    def __init__(self, path=QUEUE_PATH, concurrency=CONCURRENCY, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(SCHEMA)
+        self._loop = None
+        self._wake = None
+        self.release_orphans()
+        self._publish_depth()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def _publish_depth(self):
+        pending, running, failed = self._execute(DEPTH_SQL)[0]
+        CLEANUP_QUEUE_DEPTH.labels(state="pending").set(pending or 0)
+        CLEANUP_QUEUE_DEPTH.labels(state="running").set(running or 0)
+        CLEANUP_QUEUE_DEPTH.labels(state="failed").set(failed or 0)
+
+    def release_orphans(self):
+        """Frees jobs claimed by processes on this host that are gone, e.g. a crashed worker."""
+        host = socket.gethostname()
+        for (owner,) in self._execute("SELECT DISTINCT claimed_by FROM cleanup_jobs WHERE claimed_by IS NOT NULL"):
+            owner_host, _, pid = owner.rpartition(":")
+            if owner_host == host and owner != self.owner and not _pid_alive(int(pid)):
+                self._execute("UPDATE cleanup_jobs SET claimed_by = NULL, claimed_at = NULL WHERE claimed_by = ?", (owner,))
+
+    def enqueue(self, username, session_id):
+        now = time.time()
+        self._execute(ENQUEUE_SQL, (session_id, username, now, now))
+        self._publish_depth()
+        # Otherwise the workers find the job on their next poll
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def queued(self, session_ids):
+        """The subset of session_ids that are waiting to be cleaned up."""
+        session_ids = list(session_ids)
+        if not session_ids:
+            return set()
+        placeholders = ", ".join("?" * len(session_ids))
+        rows = self._execute(f"SELECT session_id FROM cleanup_jobs WHERE session_id IN ({placeholders})", session_ids)
+        return {row[0] for row in rows}
+
+    def claim(self):
+        now = time.time()
+        rows = self._execute(CLAIM_SQL, (self.owner, now, now, now - LEASE_SECONDS))
+        if not rows:
+            return None
+        self._publish_depth()
+        return CleanupJob(self, *rows[0])
+
+    def mark_stored(self, session_id):
+        self._execute("UPDATE cleanup_jobs SET stored = 1 WHERE session_id = ?", (session_id,))
+
+    def complete(self, job):
+        self._execute("DELETE FROM cleanup_jobs WHERE session_id = ?", (job.session_id,))
+        self._publish_depth()
+        CLEANUP_ATTEMPTS.labels(outcome="done").inc()
+        CLEANUP_JOB_SECONDS.labels(outcome="done").observe(time.time() - job.enqueued_at)
+
+    def retry(self, job, error):
+        """Schedules the job again after an exponential backoff, or gives up on it."""
+        attempts = job.attempts + 1
+        failed = attempts >= self.max_attempts
+        delay = min(MAX_BACKOFF_SECONDS, BACKOFF_SECONDS * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+        self._execute(
+            """UPDATE cleanup_jobs SET attempts = ?, failed = ?, run_after = ?, last_error = ?,
+               claimed_by = NULL, claimed_at = NULL WHERE session_id = ?""",
+            (attempts, int(failed), time.time() + delay, repr(error)[:1000], job.session_id),
+        )
+        self._publish_depth()
+        CLEANUP_ATTEMPTS.labels(outcome="failed" if failed else "retry").inc()
+        if failed:
+            CLEANUP_JOB_SECONDS.labels(outcome="failed").observe(time.time() - job.enqueued_at)
+            print(f"Giving up cleaning session {job.session_id} after {attempts} attempts: {error}")
+
+    def summary(self):
+        pending, running, failed = self._execute(DEPTH_SQL)[0]
+        return {"pending": pending or 0, "running": running or 0, "failed": failed or 0}
+
+    async def _work(self, cleanup):
+        while True:
+            job = await asyncio.to_thread(self.claim)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                continue
+            try:
+                await cleanup(job)
+            except Exception as e:
+                await asyncio.to_thread(self.retry, job, e)
+            else:
+                await asyncio.to_thread(self.complete, job)
+
+    async def run(self, cleanup):
+        """Drains the queue forever with `concurrency` workers, each running `await cleanup(job)`."""
+        self._wake = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        await asyncio.gather(*(self._work(cleanup) for _ in range(self.concurrency)))
@@ -0,0 +1,154 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from google.cloud import spanner
+from google.cloud.spanner_v1.pool import FixedSizePool
+
+PROJECT_ID = os.environ.get("PROJECT_ID")
+INSTANCE_NAME = os.environ.get("SPANNER_INSTANCE_NAME")
+DATABASE_NAME = os.environ.get("SPANNER_DATABASE_NAME")
+
+# One session per gunicorn thread up to 32: most threads hold agent streams and never query
+# Spanner, and FixedSizePool creates every session up front
+MAX_DEFAULT_POOL_SIZE = 32
+POOL_SIZE = int(os.environ.get("SPANNER_POOL_SIZE",
+                               min(int(os.environ.get("GUNICORN_THREADS", "8")), MAX_DEFAULT_POOL_SIZE)))
+POOL_TIMEOUT = float(os.environ.get("SPANNER_POOL_TIMEOUT", "10"))
+
+# Query shapes are constant text with parameters, so Spanner reuses one cached plan per shape
+USER_EXISTS_SQL = "SELECT username FROM users WHERE username = @username"
+PASSWORD_HASH_SQL = "SELECT password_hash FROM users WHERE username = @username"
+INSERT_USER_SQL = "INSERT users (username, password_hash) VALUES (@username, @password_hash)"
+WARM_UP_SQL = "SELECT 1"
+
+USERNAME_TYPES = {"username": spanner.param_types.STRING}
+INSERT_USER_TYPES = {"username": spanner.param_types.STRING, "password_hash": spanner.param_types.STRING}
+
+
+class LatencyStats:
+    """Thread-safe count/mean/max and recent-sample percentiles per operation."""
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self._ops = {}
+
+    def record(self, name, seconds):
+        with self._lock:
+            op = self._ops.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0, "samples": []})
+            op["count"] += 1
+            op["total"] += seconds
+            op["max"] = max(op["max"], seconds)
+            op["samples"].append(seconds)
+            if len(op["samples"]) > self.window:
+                del op["samples"][:len(op["samples"]) - self.window]
+
+    def summary(self):
+        with self._lock:
+            result = {}
+            for name, op in self._ops.items():
+                samples = sorted(op["samples"])
+                result[name] = {
+                    "count": op["count"],
+                    "mean_ms": round(op["total"] / op["count"] * 1000, 3),
+                    "p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+                    "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000, 3),
+                    "max_ms": round(op["max"] * 1000, 3),
+                }
+            return result
+
+
+class Database:
+    """Spanner access for the frontend, with a pre-filled session pool.
+
+    Nothing connects when it's created: warm_up (or the first query) creates the client
+    and binds the pool, so the app imports and answers /readyz while Spanner is unreachable.
+    """
+
+    def __init__(self, pool_size=POOL_SIZE, pool_timeout=POOL_TIMEOUT):
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self.stats = LatencyStats()
+        self.ready = False
+        self.last_error = None
+        self.pool = None
+        self._database = None
+        self._connect_lock = threading.Lock()
+        self._warm_up_lock = threading.Lock()
+        self._warm_up_thread = None
+
+    @property
+    def database(self):
+        """The bound Spanner database, created on first use."""
+        if self._database is None:
+            with self._connect_lock:
+                if self._database is None:
+                    instance = spanner.Client(project=PROJECT_ID).instance(INSTANCE_NAME)
+                    # FixedSizePool creates all of its sessions when the database binds it
+                    pool = FixedSizePool(size=self.pool_size, default_timeout=self.pool_timeout)
+                    self._database = instance.database(DATABASE_NAME, pool=pool)
+                    self.pool = pool
+        return self._database
+
+    def warm_up(self):
+        """Binds the pool and runs one query so the first user request doesn't pay for it."""
+        try:
+            self.fetch_one("warm_up", WARM_UP_SQL)
+            self.ready = True
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Spanner warm-up failed: {e}")
+        return self.ready
+
+    def start_warm_up(self):
+        """Runs warm_up in a background thread unless the database is ready or one is running."""
+        with self._warm_up_lock:
+            if self.ready or (self._warm_up_thread is not None and self._warm_up_thread.is_alive()):
+                return
+            self._warm_up_thread = threading.Thread(target=self.warm_up, name="spanner-warm-up", daemon=True)
+            self._warm_up_thread.start()
+
+    @contextmanager
+    def snapshot(self, name):
+        """Read-only snapshot that records the session-pool wait and the query time under `name`."""
+        start = time.perf_counter()
+        with self.database.snapshot() as snapshot:
+            acquired = time.perf_counter()
+            self.stats.record("pool_wait", acquired - start)
+            try:
+                yield snapshot
+            finally:
+                self.stats.record(name, time.perf_counter() - acquired)
+
+    def fetch_one(self, name, sql, params=None, param_types=None):
+        with self.snapshot(name) as snapshot:
+            results = snapshot.execute_sql(sql, params=params, param_types=param_types)
+            return next(iter(results), None)
+
+    def user_exists(self, username):
+        return self.fetch_one("user_exists", USER_EXISTS_SQL, {"username": username}, USERNAME_TYPES) is not None
+
+    def password_hash(self, username):
+        row = self.fetch_one("password_hash", PASSWORD_HASH_SQL, {"username": username}, USERNAME_TYPES)
+        return row[0] if row else None
+
+    def insert_user(self, username, password_hash):
+        def insert_user(transaction):
+            transaction.execute_update(
+                INSERT_USER_SQL,
+                params={"username": username, "password_hash": password_hash},
+                param_types=INSERT_USER_TYPES
+            )
+        start = time.perf_counter()
+        self.database.run_in_transaction(insert_user)
+        self.stats.record("insert_user", time.perf_counter() - start)
+
+    def summary(self):
+        warming_up = self._warm_up_thread is not None and self._warm_up_thread.is_alive()
+        pool = {"size": self.pool_size, "bound": self.pool is not None}
+        if self.pool is not None:
+            pool["available_sessions"] = self.pool._sessions.qsize()
+        return {"ready": self.ready, "warming_up": warming_up, "last_error": self.last_error,
+                "pool": pool, "operations": self.stats.summary()}
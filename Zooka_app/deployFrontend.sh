@@ -96,4 +96,6 @@ gcloud run deploy $SERVICE_NAME \
   --service-account $APP_SERVICE_ACCOUNT \
   --allow-unauthenticated \
   --no-invoker-iam-check \
+  --concurrency 250 \
+  --startup-probe httpGet.path=/readyz,periodSeconds=5,timeoutSeconds=5,failureThreshold=24 \
   --set-env-vars PROJECT_ID=$PROJECT_ID,REGION_ID=$REGION_ID,SPANNER_INSTANCE_NAME=$SPANNER_INSTANCE_NAME,SPANNER_DATABASE_NAME=$SPANNER_DATABASE_NAME,AGENT_RESOURCE_ID=$AGENT_URL
@@ -0,0 +1,66 @@
+import os
+import time
+import asyncio
+import threading
+from metrics import ASYNC_DISPATCH_SECONDS
+
+# "shared" runs every coroutine on one long-lived loop owned by a background thread,
+# so the HTTP/gRPC channels opened by remote_app survive across requests.
+# "per_request" is the old behaviour (asyncio.run in the request thread), kept for benchmarking.
+ASYNC_MODE = os.environ.get("ASYNC_MODE", "shared")
+
+_loop = None
+_loop_lock = threading.Lock()
+
+def get_loop():
+    """Returns the shared event loop, starting its thread on first use (i.e. after gunicorn forks)."""
+    global _loop
+
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="zooka-event-loop", daemon=True)
+                thread.start()
+                _loop = loop
+
+    return _loop
+
+def submit(coro):
+    """Schedules a coroutine on the shared loop without waiting for it."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+async def _timed(coro, handed_off):
+    # Loop start-up (per_request) or the hop onto the loop thread (shared)
+    ASYNC_DISPATCH_SECONDS.labels(mode=ASYNC_MODE).observe(time.perf_counter() - handed_off)
+    return await coro
+
+def run_async(coro):
+    """Runs a coroutine to completion from a request thread and returns its result."""
+    coro = _timed(coro, time.perf_counter())
+    if ASYNC_MODE == "per_request":
+        return asyncio.run(coro)
+    return submit(coro).result()
+
+async def _next_item(async_gen):
+    return await async_gen.__anext__()
+
+def iterate_async(async_gen):
+    """Drives an async generator from a sync (WSGI) generator, one item at a time."""
+    if ASYNC_MODE == "per_request":
+        loop = asyncio.new_event_loop()
+        step = loop.run_until_complete
+    else:
+        loop = None
+        step = lambda coro: submit(coro).result()
+
+    try:
+        while True:
+            try:
+                yield step(_next_item(async_gen))
+            except StopAsyncIteration:
+                break
+    finally:
+        step(async_gen.aclose())
+        if loop is not None:
+            loop.close()
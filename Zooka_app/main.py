@@ -1,74 +1,177 @@
 import os
 import uuid
+import json
+import time
 import asyncio
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash
+from flask import Flask, Response, render_template, request, redirect, url_for, session, jsonify, flash, stream_with_context, g
 from werkzeug.security import generate_password_hash, check_password_hash
-from google.cloud import spanner
 import vertexai
 from vertexai import agent_engines
+from event_loop import run_async, iterate_async, submit
+from database import Database
+from cleanup_queue import CleanupQueue, is_not_found
+from admission import AdmissionController, Rejected
+from metrics import (
+    HTTP_REQUEST_SECONDS, STREAM_FIRST_EVENT_SECONDS, STREAM_TOTAL_SECONDS, CLEANUP_STEP_SECONDS,
+    TURN_TIMINGS_KEY, observe, record_agent_timings, log_event, render,
+)
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'dev_key_for_session_security')
 
-# --- SPANNER CONFIGURATION ---
+# --- AGENT CONFIGURATION ---
+# Spanner settings are read by database.py
 PROJECT_ID = os.environ.get("PROJECT_ID")
 REGION_ID = os.environ.get("REGION_ID")
-INSTANCE_NAME = os.environ.get("SPANNER_INSTANCE_NAME")
-DATABASE_NAME = os.environ.get("SPANNER_DATABASE_NAME")
 AGENT_RESOURCE_ID = os.environ.get("AGENT_RESOURCE_ID")
 
+# --- SESSION CLEANUP CONFIGURATION ---
+# Reuse the user's most recent session at login if it was active within this many seconds (0 disables reuse)
+SESSION_REUSE_SECONDS = int(os.environ.get("SESSION_REUSE_SECONDS", "0"))
+# Queue size, concurrency, retries and backoff are set in cleanup_queue.py
+
 vertexai.init(project=PROJECT_ID, location=REGION_ID)
 remote_app = agent_engines.get(AGENT_RESOURCE_ID)
 
-_database = None
+# Connects and fills the session pool in the background at startup, so the first login
+# doesn't pay for it and an unreachable Spanner shows up in /readyz instead of crashing the worker
+db = Database()
+db.start_warm_up()
 
-def get_database():
-    global _database
-    
-    if _database is None:
+# Ended sessions are stored in memory and deleted in the background, including the
+# ones a previous run of the app queued but didn't get to
+cleanup_jobs = CleanupQueue()
 
-        spanner_client = spanner.Client(project=PROJECT_ID)
-        instance = spanner_client.instance(INSTANCE_NAME)
-        _database = instance.database(DATABASE_NAME)
-        
-    return _database
+# Caps concurrent agent streams and runs one question per Zooka session at a time; the
+# stream cap, wait queue size and wait time are set in admission.py
+admission = AdmissionController()
+
+def rejected_response(rejection):
+    """429 (or 409 for a repeated question) telling the client when to try again."""
+    message = 'This question is already being answered.' if rejection.status == 409 else 'Zooka is busy, please try again shortly.'
+    return (jsonify({'error': message, 'reason': rejection.reason, 'retry_after': rejection.retry_after}),
+            rejection.status, {'Retry-After': str(rejection.retry_after)})
+
+def _last_update_time(remote_session):
+    return float(remote_session.get('lastUpdateTime') or remote_session.get('last_update_time') or 0)
 
 async def chat_with_zooka_init(username):
 
     USER_ID = username
     raw_sessions_list = await remote_app.async_list_sessions(user_id=USER_ID)
-    open_sessions = raw_sessions_list.get('sessions', [])
-    for session in open_sessions:
-        session_id = session.get('id')
-        if session_id:
-            await cleanup_session_logic(USER_ID, session_id)
-
-    remote_session = await remote_app.async_create_session(user_id=USER_ID)
-    session_id=remote_session["id"]
+    open_sessions = [s for s in raw_sessions_list.get('sessions', []) if s.get('id')]
+    # Sessions already queued for cleanup are on their way out; never reuse or re-queue them
+    queued = await asyncio.to_thread(cleanup_jobs.queued, [s['id'] for s in open_sessions])
+    open_sessions = [s for s in open_sessions if s['id'] not in queued]
+
+    session_id = None
+    if SESSION_REUSE_SECONDS > 0 and open_sessions:
+        latest = max(open_sessions, key=_last_update_time)
+        if time.time() - _last_update_time(latest) <= SESSION_REUSE_SECONDS:
+            session_id = latest['id']
+            open_sessions.remove(latest)
+
+    if session_id is None:
+        remote_session = await remote_app.async_create_session(user_id=USER_ID)
+        session_id=remote_session["id"]
+
+    # Leftover sessions go to memory in the background so login doesn't wait on them
+    for stale in open_sessions:
+        await asyncio.to_thread(cleanup_jobs.enqueue, USER_ID, stale['id'])
     return session_id
 
-async def ask_question_logic(username, session_id, message):
-    full_response = []
+async def stream_question_logic(username, session_id, message, request_id=None):
+    """Yields text and tool-progress events as soon as the agent emits them."""
+    start = time.perf_counter()
+    first_event_at = None
+    invocation_id = None
     async for event in remote_app.async_stream_query(
         user_id=username,
         session_id=session_id,
         message=message,
+        # Lets the agent's telemetry log lines carry the frontend request ID
+        run_config={'custom_metadata': {'request_id': request_id}},
     ):
-        data = event
-        parts = data.get('content', {}).get('parts', [])
-        if parts:
-            text_chunk = parts[0].get('text', '')
-            if text_chunk:
-                full_response.append(text_chunk)
+        if first_event_at is None:
+            first_event_at = time.perf_counter() - start
+            STREAM_FIRST_EVENT_SECONDS.observe(first_event_at)
+            invocation_id = event.get('invocation_id')
+            log_event(request_id, 'first_event', seconds=first_event_at, invocation_id=invocation_id)
+
+        timings = event.get('actions', {}).get('state_delta', {}).get(TURN_TIMINGS_KEY)
+        if timings:
+            record_agent_timings(timings)
+            log_event(request_id, 'agent_turn', invocation_id=invocation_id, **timings)
+
+        parts = event.get('content', {}).get('parts', [])
+        for part in parts:
+            if part.get('thought'):
+                continue
+            if part.get('text'):
+                yield {'type': 'text', 'text': part['text']}
+            elif part.get('function_call'):
+                yield {'type': 'tool', 'name': part['function_call'].get('name'), 'status': 'started'}
+            elif part.get('function_response'):
+                yield {'type': 'tool', 'name': part['function_response'].get('name'), 'status': 'done'}
+
+    total = time.perf_counter() - start
+    STREAM_TOTAL_SECONDS.observe(total)
+    log_event(request_id, 'stream_end', seconds=total, invocation_id=invocation_id)
+
+async def ask_question_logic(username, session_id, message, request_id=None):
+    full_response = []
+    async for event in stream_question_logic(username, session_id, message, request_id):
+        if event['type'] == 'text':
+            full_response.append(event['text'])
     
     return "".join(full_response)
 
-async def cleanup_session_logic(username, session_id):
+async def cleanup_session_logic(job):
+    """Stores a queued session in memory, then deletes it; safe to run again after a failure."""
+    if not job.stored:
+        try:
+            with observe(CLEANUP_STEP_SECONDS, step='get_session'):
+                remote_session = await remote_app.async_get_session(user_id=job.username, session_id=job.session_id)
+        except Exception as e:
+            # Deleted by an earlier attempt that died before recording it
+            if is_not_found(e):
+                return
+            raise
+        with observe(CLEANUP_STEP_SECONDS, step='add_session_to_memory'):
+            await remote_app.async_add_session_to_memory(session=remote_session)
+        await job.mark_stored()
+    try:
+        with observe(CLEANUP_STEP_SECONDS, step='delete_session'):
+            await remote_app.async_delete_session(user_id=job.username, session_id=job.session_id)
+    except Exception as e:
+        if not is_not_found(e):
+            raise
+
+submit(cleanup_jobs.run(cleanup_session_logic))
+
+# --- INSTRUMENTATION ---
+
+@app.before_request
+def start_request_timer():
+    # Cloud Run forwards the caller's X-Request-ID untouched; otherwise we mint one
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    g.request_start = time.perf_counter()
 
-    remote_session = await remote_app.async_get_session(user_id=username, session_id=session_id)
-    await remote_app.async_add_session_to_memory(session=remote_session)
-    await remote_app.async_delete_session(user_id=username, session_id=session_id)
-    return True
+@app.after_request
+def record_request(response):
+    seconds = time.perf_counter() - g.request_start
+    # The rule, not the path, so label cardinality stays bounded
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    HTTP_REQUEST_SECONDS.labels(route=route, method=request.method, status=response.status_code).observe(seconds)
+    log_event(g.request_id, 'request', route=route, method=request.method,
+              status=response.status_code, seconds=seconds)
+    response.headers['X-Request-ID'] = g.request_id
+    return response
+
+@app.route('/metrics')
+def metrics():
+    body, content_type = render()
+    return Response(body, content_type=content_type)
 
 # --- ROUTES ---
 
@@ -76,6 +179,16 @@ async def cleanup_session_logic(username, session_id):
 def home():
     return render_template('home.html')
 
+@app.route('/readyz')
+def readyz():
+    """Startup/readiness probe: only ready once Spanner answered the warm-up query."""
+    if not db.ready:
+        # Retries a failed warm-up without holding the probe
+        db.start_warm_up()
+        return jsonify({'status': 'starting', 'database': db.summary()}), 503
+    return jsonify({'status': 'ready', 'database': db.summary(), 'cleanup_queue': cleanup_jobs.summary(),
+                    'admission': admission.summary()})
+
 @app.route('/auth', methods=['GET', 'POST'])
 def auth():
 
@@ -83,7 +196,6 @@ def auth():
         action = request.form.get('action')
         username = request.form.get('username')
         password = request.form.get('password')
-        db = get_database()
         if action == 'signup':
             confirm_password = request.form.get('confirm_password')
             if password != confirm_password:
@@ -91,45 +203,27 @@ def auth():
                 return redirect(url_for('auth'))
             
             # Check if user exists
-            with db.snapshot() as snapshot:
-                results = snapshot.execute_sql(
-                    "SELECT username FROM users WHERE username = @username",
-                    params={"username": username},
-                    param_types={"username": spanner.param_types.STRING}
-                )
-                if list(results):
-                    flash('Username already exists.')
-                    return redirect(url_for('auth'))
+            if db.user_exists(username):
+                flash('Username already exists.')
+                return redirect(url_for('auth'))
 
             # Create user
             hashed_pw = generate_password_hash(password)
-            def insert_user(transaction):
-                transaction.execute_update(
-                    "INSERT users (username, password_hash) VALUES (@username, @password_hash)",
-                    params={"username": username, "password_hash": hashed_pw},
-                    param_types={"username": spanner.param_types.STRING, "password_hash": spanner.param_types.STRING}
-                )
-            db.run_in_transaction(insert_user)
+            db.insert_user(username, hashed_pw)
             flash('Signup successful! Please login.')
             
         elif action == 'login':
             # Verify User
-            with db.snapshot() as snapshot:
-                results = snapshot.execute_sql(
-                    "SELECT password_hash FROM users WHERE username = @username",
-                    params={"username": username},
-                    param_types={"username": spanner.param_types.STRING}
-                )
-                row = next(iter(results), None)
-                
-                if row and check_password_hash(row[0], password):
-                    session['username'] = username
-                    # Call user's custom init function
-                    session_id = asyncio.run(chat_with_zooka_init(username))
-                    session['zooka_session_id'] = session_id
-                    return redirect(url_for('chat_page'))
-                else:
-                    flash('Invalid credentials.')
+            password_hash = db.password_hash(username)
+
+            if password_hash and check_password_hash(password_hash, password):
+                session['username'] = username
+                # Call user's custom init function
+                session_id = run_async(chat_with_zooka_init(username))
+                session['zooka_session_id'] = session_id
+                return redirect(url_for('chat_page'))
+            else:
+                flash('Invalid credentials.')
                     
     return render_template('login.html')
 
@@ -151,11 +245,54 @@ def api_ask():
     username = session['username']
     session_id = session.get('zooka_session_id')
     
+    try:
+        ticket = admission.acquire(session_id or username, message)
+    except Rejected as rejection:
+        return rejected_response(rejection)
+
     # Call user's custom question logic
-    response_text = asyncio.run(ask_question_logic(username, session_id, message))
+    with ticket:
+        response_text = run_async(ask_question_logic(username, session_id, message, g.request_id))
     
     return jsonify({'response': response_text})
 
+@app.route('/api/ask/stream', methods=['POST'])
+def api_ask_stream():
+    """Same as /api/ask but streams newline-delimited JSON events while the agent works."""
+    if 'username' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    data = request.json
+    message = data.get('message')
+    username = session['username']
+    session_id = session.get('zooka_session_id')
+    request_id = g.request_id
+
+    # Waits here for a free stream, so a refusal can still be a 429 instead of a stream error
+    try:
+        ticket = admission.acquire(session_id or username, message)
+    except Rejected as rejection:
+        return rejected_response(rejection)
+
+    def generate():
+        try:
+            for event in iterate_async(stream_question_logic(username, session_id, message, request_id)):
+                yield json.dumps(event) + "\n"
+            yield json.dumps({'type': 'end'}) + "\n"
+        except Exception as e:
+            print(f"Error streaming answer: {e}")
+            yield json.dumps({'type': 'error', 'error': 'Error communicating with Zooka.'}) + "\n"
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        # Keep proxies (and Cloud Run's front end) from buffering the stream
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+    # Runs when the server closes the response, whether the stream finished or the client left
+    response.call_on_close(ticket.release)
+    return response
+
 @app.route('/api/end_session', methods=['POST'])
 def api_end_session():
     if 'username' not in session:
@@ -164,8 +301,9 @@ def api_end_session():
     username = session['username']
     session_id = session.get('zooka_session_id')
     
-    # Call user's custom cleanup logic
-    asyncio.run(cleanup_session_logic(username, session_id))
+    # Storing the session in memory is slow; the cleanup queue does it after we answer
+    if session_id:
+        cleanup_jobs.enqueue(username, session_id)
     
     session.clear()
     return jsonify({'status': 'ok'})
@@ -0,0 +1,106 @@
+import os
+import json
+import time
+from contextlib import contextmanager
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+
+# Emit one JSON log line per request/stream/cleanup step, keyed by request ID
+REQUEST_LOGS = os.environ.get("REQUEST_LOGS", "0") == "1"
+
+# Session state key the agent's telemetry callbacks write each turn's timings to
+TURN_TIMINGS_KEY = "zooka_turn_timings"
+
+# Agent turns take seconds, not milliseconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "zooka_http_request_seconds", "Time to produce the response headers, per route.",
+    ["route", "method", "status"], buckets=BUCKETS)
+ASYNC_DISPATCH_SECONDS = Histogram(
+    "zooka_async_dispatch_seconds", "Delay between a request thread handing off a coroutine and it starting.",
+    ["mode"], buckets=BUCKETS)
+STREAM_FIRST_EVENT_SECONDS = Histogram(
+    "zooka_stream_first_event_seconds", "Time from sending a question to the agent's first event.",
+    buckets=BUCKETS)
+STREAM_TOTAL_SECONDS = Histogram(
+    "zooka_stream_total_seconds", "Time from sending a question to the agent's last event.",
+    buckets=BUCKETS)
+CLEANUP_STEP_SECONDS = Histogram(
+    "zooka_cleanup_step_seconds", "Session cleanup steps against Agent Engine.",
+    ["step"], buckets=BUCKETS)
+CLEANUP_QUEUE_DEPTH = Gauge(
+    "zooka_cleanup_queue_depth", "Ended sessions waiting to be stored in memory and deleted, by state.",
+    ["state"])
+CLEANUP_JOB_SECONDS = Histogram(
+    "zooka_cleanup_job_seconds", "Time from a session being queued for cleanup to it being done or given up on.",
+    ["outcome"], buckets=BUCKETS + (160, 320, 640, 1280))
+CLEANUP_ATTEMPTS = Counter(
+    "zooka_cleanup_attempts", "Session cleanup attempts, by outcome (done, retry, failed).", ["outcome"])
+ADMISSION_IN_FLIGHT = Gauge(
+    "zooka_admission_in_flight_streams", "Agent streams running in this process.")
+ADMISSION_WAITING = Gauge(
+    "zooka_admission_waiting_requests", "Questions waiting for a free agent stream or for their session.")
+ADMISSION_WAIT_SECONDS = Histogram(
+    "zooka_admission_wait_seconds", "Time an admitted question waited before its agent stream started.",
+    buckets=BUCKETS)
+ADMISSION_REJECTED = Counter(
+    "zooka_admission_rejected", "Questions refused by admission control, by reason.", ["reason"])
+
+# Reported by the agent itself (zooka_agent/telemetry.py) at the end of each turn
+AGENT_MODEL_SECONDS = Histogram(
+    "zooka_agent_model_seconds", "Gemini call latency inside the agent.", ["model"], buckets=BUCKETS)
+AGENT_MODEL_TOKENS = Counter(
+    "zooka_agent_model_tokens", "Tokens used by Gemini calls inside the agent.", ["model", "kind"])
+AGENT_TOOL_SECONDS = Histogram(
+    "zooka_agent_tool_seconds", "Tool call latency inside the agent.", ["tool"], buckets=BUCKETS)
+AGENT_TOOL_CALLS = Counter(
+    "zooka_agent_tool_calls", "Catalog tool calls inside the agent, by whether they queried the backend "
+    "(executed) or shared the result of an identical call running (coalesced) or just finished (window).",
+    ["tool", "outcome"])
+AGENT_EMBEDDING_CACHE_LOOKUPS = Counter(
+    "zooka_agent_embedding_cache_lookups", "Query embedding cache lookups inside the agent, by result "
+    "(hit, persistent_hit from the SQLite tier, or miss, which calls ML.PREDICT).", ["result"])
+AGENT_ROUTE_SECONDS = Histogram(
+    "zooka_agent_route_seconds", "Fast-model triage latency, by the route it chose.", ["route"], buckets=BUCKETS)
+AGENT_MEMORY_PRELOAD_SECONDS = Histogram(
+    "zooka_agent_memory_preload_seconds", "PreloadMemoryTool memory search latency.", buckets=BUCKETS)
+
+
+def log_event(request_id, event, **fields):
+    if REQUEST_LOGS:
+        print(json.dumps({"request_id": request_id, "event": event, **fields}, default=str), flush=True)
+
+
+@contextmanager
+def observe(histogram, **labels):
+    """Times the block into `histogram`, with `labels` if the histogram has any."""
+    metric = histogram.labels(**labels) if labels else histogram
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metric.observe(time.perf_counter() - start)
+
+
+def record_agent_timings(timings):
+    """Folds the per-turn timings reported by the agent into the agent histograms."""
+    for call in timings.get("model", []):
+        model = call.get("model") or "unknown"
+        AGENT_MODEL_SECONDS.labels(model=model).observe(call["seconds"])
+        for kind in ("prompt", "output", "thoughts", "cached"):
+            if call.get(f"{kind}_tokens"):
+                AGENT_MODEL_TOKENS.labels(model=model, kind=kind).inc(call[f"{kind}_tokens"])
+    for call in timings.get("tools", []):
+        AGENT_TOOL_SECONDS.labels(tool=call["name"]).observe(call["seconds"])
+        if call.get("outcome"):
+            AGENT_TOOL_CALLS.labels(tool=call["name"], outcome=call["outcome"]).inc()
+    for result, count in (timings.get("embedding_cache") or {}).items():
+        AGENT_EMBEDDING_CACHE_LOOKUPS.labels(result=result).inc(count)
+    if timings.get("route"):
+        AGENT_ROUTE_SECONDS.labels(route=timings["route"]["route"]).observe(timings["route"]["seconds"])
+    for seconds in timings.get("memory_preload", []):
+        AGENT_MEMORY_PRELOAD_SECONDS.observe(seconds)
+
+
+def render():
+    return generate_latest(), CONTENT_TYPE_LATEST
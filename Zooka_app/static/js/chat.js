@@ -21,15 +21,53 @@ document.addEventListener('DOMContentLoaded', () => {
         }
         
         scrollToBottom();
+        return msgDiv;
     }
 
     function scrollToBottom() {
         chatHistory.scrollTop = chatHistory.scrollHeight;
     }
 
+    function setLoaderLabel(label) {
+        const loaderLabel = document.getElementById('loading-label');
+        if (loaderLabel) loaderLabel.textContent = label;
+    }
+
+    // Turns a tool name such as "find-all-diseases-by-symptom" into "Find all diseases by symptom"
+    function toolLabel(name) {
+        const words = (name || 'tool').replace(/[-_]+/g, ' ');
+        return words.charAt(0).toUpperCase() + words.slice(1);
+    }
+
+    // Gives up on a busy server after this many 429s and waits at most this long between tries
+    const MAX_BUSY_RETRIES = 3;
+    const MAX_RETRY_AFTER_SECONDS = 30;
+    let sending = false;
+
+    const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+    // POSTs the question, waiting out 429s for as long as the server's Retry-After asks
+    async function postQuestion(text) {
+        for (let attempt = 0; ; attempt++) {
+            const response = await fetch('/api/ask/stream', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ message: text })
+            });
+            if (response.status !== 429 || attempt >= MAX_BUSY_RETRIES) return response;
+            const seconds = Math.min(parseInt(response.headers.get('Retry-After'), 10) || 1, MAX_RETRY_AFTER_SECONDS);
+            setLoaderLabel(`Zooka is busy, retrying in ${seconds}s`);
+            await sleep(seconds * 1000);
+            setLoaderLabel('Thinking');
+        }
+    }
+
     async function sendMessage() {
         const text = inputField.value.trim();
-        if (!text) return;
+        // One question at a time; the server refuses a second one on the same session anyway
+        if (!text || sending) return;
+        sending = true;
+        sendBtn.disabled = true;
 
         // Add user message immediately
         addMessage(text, 'user');
@@ -37,30 +75,74 @@ document.addEventListener('DOMContentLoaded', () => {
 
         // 3. SHOW "Thinking..."
         if (loader) {
+            setLoaderLabel('Thinking');
             loader.style.display = 'flex';
             scrollToBottom();
         }
 
+        let bubble = null;
+        let replyText = '';
+
+        // Appends a streamed chunk to the agent's reply bubble, creating it on the first chunk
+        function appendChunk(chunk) {
+            replyText += chunk;
+            if (!bubble) {
+                bubble = addMessage(replyText, 'agent').querySelector('.bubble');
+            } else {
+                bubble.innerHTML = replyText;
+            }
+            scrollToBottom();
+        }
+
+        function handleEvent(event) {
+            if (event.type === 'text') {
+                appendChunk(event.text);
+            } else if (event.type === 'tool') {
+                setLoaderLabel(event.status === 'started' ? toolLabel(event.name) : 'Thinking');
+            } else if (event.type === 'error') {
+                appendChunk(replyText ? `<br>${event.error}` : event.error);
+            }
+        }
+
         try {
-            const response = await fetch('/api/ask', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ message: text })
-            });
-            const data = await response.json();
+            const response = await postQuestion(text);
+            if (response.status === 429 || response.status === 409) {
+                const body = await response.json().catch(() => ({}));
+                if (loader) loader.style.display = 'none';
+                addMessage(body.error || 'Zooka is busy, please try again shortly.', 'agent');
+                return;
+            }
+            if (!response.ok || !response.body) throw new Error(`HTTP ${response.status}`);
+
+            // Read newline-delimited JSON events as they arrive
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+                for (const line of lines) {
+                    if (line.trim()) handleEvent(JSON.parse(line));
+                }
+            }
+            if (buffer.trim()) handleEvent(JSON.parse(buffer));
 
             // 4. HIDE "Thinking..."
             if (loader) loader.style.display = 'none';
 
-            // Handle potential difference in API key (response vs message)
-            const replyText = data.response || data.message || "I didn't catch that.";
-            addMessage(replyText, 'agent');
+            if (!replyText) addMessage("I didn't catch that.", 'agent');
 
         } catch (error) {
             // Hide loader on error too
             if (loader) loader.style.display = 'none';
             addMessage("Error communicating with Zooka.", 'agent');
             console.error(error);
+        } finally {
+            sending = false;
+            sendBtn.disabled = false;
         }
     }
 
@@ -0,0 +1,82 @@
+"""Compares concurrent /api/ask throughput of the per-request asyncio.run mode
+against the shared event loop, using the fake agent engine.
+
+    python benchmarks/bench_async_modes.py --requests 500 --concurrency 8,64,250
+"""
+import os
+import json
+import time
+import argparse
+import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_agent_engine import FakeRemoteApp, load_app
+
+
+def run(main, event_loop, mode, concurrency, total_requests):
+    event_loop.ASYNC_MODE = mode
+    main.remote_app.reset()
+    local = threading.local()
+
+    def ask(i):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = main.app.test_client()
+            with client.session_transaction() as sess:
+                sess['username'] = f"user{threading.get_ident()}"
+                sess['zooka_session_id'] = f"bench-{i}"
+        start = time.perf_counter()
+        response = client.post('/api/ask', json={'message': f"chest pain {i}"})
+        assert response.status_code == 200, response.status_code
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(ask, range(total_requests)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'mode': mode,
+        'concurrency': concurrency,
+        'requests': total_requests,
+        'throughput_rps': round(total_requests / elapsed, 2),
+        'latency_mean_s': round(statistics.mean(latencies), 4),
+        'latency_p95_s': round(latencies[int(len(latencies) * 0.95) - 1], 4),
+        'channels_opened': main.remote_app.channels_opened,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", default="8,64,250",
+                        help="comma separated thread counts (8 is the old gunicorn setting)")
+    parser.add_argument("--first-chunk-delay", type=float, default=0.5)
+    parser.add_argument("--channel-setup", type=float, default=0.2)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    concurrencies = [int(c) for c in args.concurrency.split(",")]
+    # Compares the loop modes, not admission control: let every thread stream at once
+    os.environ.setdefault("AGENT_MAX_STREAMS", str(max(concurrencies)))
+    fake = FakeRemoteApp(first_chunk_delay=args.first_chunk_delay, channel_setup=args.channel_setup)
+    app_module = load_app(fake)
+    import event_loop
+
+    results = []
+    for concurrency in concurrencies:
+        for mode in ("per_request", "shared"):
+            results.append(run(app_module, event_loop, mode, concurrency, args.requests))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mode':<12} {'threads':>7} {'req/s':>9} {'mean s':>8} {'p95 s':>8} {'channels':>9}")
+    for r in results:
+        print(f"{r['mode']:<12} {r['concurrency']:>7} {r['throughput_rps']:>9} "
+              f"{r['latency_mean_s']:>8} {r['latency_p95_s']:>8} {r['channels_opened']:>9}")
+
+
+if __name__ == "__main__":
+    main()
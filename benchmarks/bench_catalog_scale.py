@@ -0,0 +1,140 @@
+"""Ingest throughput and retrieval latency against catalog size, with generated catalogs.
+
+For each size in --diseases, Data/generate_catalog.py writes a catalog to a temporary
+file, and the real setup and retrieval code runs against the in-memory stand-in of
+benchmarks/fake_catalog.py, where every query takes --query-ms and every commit --commit-ms:
+
+- insert_data: CatalogLoader.load into an empty database, then again with nothing changed;
+- update_embeddings: refresh_embeddings with EMBEDDING_SOURCE=fake, --dims wide vectors;
+- agent start: loading the graph cache and the symptom index (IVF above SYMPTOM_IVF_MIN_ROWS);
+- retrieval: rank_diseases_by_symptoms on --queries symptom lists taken from random
+  diseases, find_all_diseases_by_symptom's top-k search done exactly (the scan
+  find-all-diseases-by-symptom runs on Toolbox) and through the index, and
+  get_disease_dossier, each reported as p50/p95/p99 in milliseconds.
+
+One line per size gives the curves. The stand-in holds every row in Python objects, so
+memory, not the generator, bounds the largest size: about 3 GB per 100k diseases at 64
+dimensions.
+
+    python benchmarks/bench_catalog_scale.py --diseases 10000,30000,100000 --commit-ms 20
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "Data"))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Importing the package defines the agent; don't let it warm up against real services
+os.environ.setdefault("AGENT_STARTUP_MODE", "lazy")
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    pick = lambda q: round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 3)
+    return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99)}
+
+
+def timed(func, inputs):
+    latencies = []
+    for value in inputs:
+        start = time.perf_counter()
+        func(value)
+        latencies.append(time.perf_counter() - start)
+    return percentiles(latencies)
+
+
+def run(diseases, args, workdir):
+    from generate_catalog import CatalogGenerator, write_catalog
+    from loader import CatalogLoader
+    from embeddings import refresh_embeddings
+    from fake_catalog import CatalogDatabase, install, fake_embeddings
+    from zooka_agent import tools, graph_cache, symptom_index
+
+    result = {"diseases": diseases}
+    path = os.path.join(workdir, f"catalog-{diseases}.json")
+    start = time.perf_counter()
+    write_catalog(path, CatalogGenerator(diseases, seed=args.seed))
+    result["generate_s"] = round(time.perf_counter() - start, 2)
+    result["file_mb"] = round(os.path.getsize(path) / 2 ** 20, 1)
+
+    database = CatalogDatabase(query_ms=args.query_ms, commit_ms=args.commit_ms)
+    stats = CatalogLoader(database, workers=args.workers).load(path)
+    rows = stats["upserted"]
+    result.update(rows=rows, symptoms=len(database.tables["symptom"]), batches=stats["batches"],
+                  insert_s=stats["seconds"], insert_rows_per_s=round(rows / stats["seconds"]) if stats["seconds"] else 0)
+    reload = CatalogLoader(database, workers=args.workers).load(path)
+    result["reload_unchanged_s"] = reload["seconds"]
+    os.remove(path)
+
+    stats = refresh_embeddings(database, workers=args.workers, source="fake")
+    result.update(embed_s=stats["seconds"], embed_rows_per_s=stats["rows_per_second"])
+
+    # Fresh caches per size, read through the module globals the tools use
+    graph_cache._graph_cache = graph_cache.KnowledgeGraphCache(database, embed=fake_embeddings)
+    symptom_index._symptom_index = symptom_index.SymptomIndex(database)
+    install(database)
+    start = time.perf_counter()
+    graph = graph_cache.get_graph_cache().graph()
+    result["graph_load_s"] = round(time.perf_counter() - start, 2)
+    start = time.perf_counter()
+    index = symptom_index.get_symptom_index()
+    result["index_load_s"] = round(time.perf_counter() - start, 2)
+    result["ivf"] = index._snapshot.ivf is not None
+
+    # What a user would report: stored symptoms without the disease-specific suffix
+    rng = random.Random(args.seed)
+    names = list(graph.diseases)
+    sampled = [rng.choice(names) for _ in range(args.queries)]
+    by_disease = {}
+    for disease_id, symptom_id in database.tables["indicate"]:
+        by_disease.setdefault(disease_id, []).append(symptom_id)
+    symptom_lists = []
+    for name in sampled:
+        texts = []
+        for symptom_id in by_disease.get(graph.diseases[name][0], []):
+            _, symptom, details, *_ = database.tables["symptom"][(symptom_id,)]
+            texts.append(f"{symptom} {details.split(' Seen in ')[0]}")
+        symptom_lists.append(texts)
+    vectors = fake_embeddings([texts[0] for texts in symptom_lists if texts])
+
+    result["rank_ms"] = timed(tools._rank_diseases_by_symptoms, symptom_lists)
+    result["search_exact_ms"] = timed(lambda v: index.search(v, k=tools.SYMPTOM_TOP_K, exact=True), vectors)
+    result["search_index_ms"] = timed(lambda v: index.search(v, k=tools.SYMPTOM_TOP_K), vectors)
+    result["dossier_ms"] = timed(tools._disease_dossier, sampled)
+    result["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--diseases", default="10000,30000,100000", help="comma-separated catalog sizes")
+    parser.add_argument("--dims", type=int, default=64, help="fake embedding dimensions (768 in Spanner)")
+    parser.add_argument("--query-ms", type=float, default=0, help="latency of each stand-in query")
+    parser.add_argument("--commit-ms", type=float, default=20, help="latency of each stand-in commit")
+    parser.add_argument("--workers", type=int, default=8, help="loader and embedding workers")
+    parser.add_argument("--queries", type=int, default=200, help="retrieval queries per size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+    # Read when Data/embeddings.py is imported
+    os.environ["FAKE_EMBEDDING_DIMENSIONS"] = str(args.dims)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for diseases in (int(size) for size in args.diseases.split(",")):
+            results.append(run(diseases, args, workdir))
+            if not args.json:
+                print(", ".join(f"{key}={value}" for key, value in results[-1].items()), flush=True)
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Spanner reads and tool-call latency under concurrent users, with and without coalescing.
+
+--users virtual users, all at once, each make --calls tool calls in a row, picking arguments from a
+small set of popular diseases and symptoms with Zipf-distributed popularity, as at peak.
+Spanner is a stand-in that serves at most --spanner-concurrency queries at a time, each
+taking --spanner-ms, so duplicate queries queue behind each other like they would on
+a busy instance. Every query it serves counts as one read.
+
+- toolbox: the agent's ManifestToolset against the Toolbox stand-in of bench_toolsets.py,
+  which runs one Spanner query per tools/call; coalescing wraps it in CoalescingToolset.
+- native: find_all_diseases_by_symptom and rank_diseases_by_symptoms on the catalog in
+  Data/data.json, embedding every argument through Spanner as on an embedding-cache miss.
+
+Each toolset runs with coalescing off, sharing in-flight calls only (window 0), and with
+the default result window.
+
+    python benchmarks/bench_coalescing.py --users 100 --calls 5 --spanner-ms 30
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Importing the package defines the agent; don't let it warm up against real services
+os.environ.setdefault("AGENT_STARTUP_MODE", "lazy")
+
+import bench_toolsets
+from bench_toolsets import ToolboxStandIn
+from zooka_agent import coalescing, tools
+from zooka_agent.coalescing import QueryCoalescer, CoalescingToolset
+from zooka_agent.tool_manifest import ManifestToolset
+
+DISEASES = ["Unstable Angina", "Essential (Primary) Hypertension", "Pulmonary Embolism (PE)", "Acute Pericarditis",
+            "Hypertrophic Cardiomyopathy (HCM)", "Aortic Dissection (Type A)", "Deep Vein Thrombosis (DVT)",
+            "Infective Endocarditis", "Atrial Flutter", "Mitral Valve Stenosis"]
+SYMPTOMS = ["chest pain on exertion relieved by rest", "shortness of breath when lying flat", "palpitations",
+            "swollen ankles in the evening", "fainting during exercise", "sharp chest pain when breathing in",
+            "fatigue", "dizziness when standing up", "calf pain and swelling", "tearing back pain"]
+
+
+class SpannerStandIn:
+    """Serves at most `concurrency` queries at once, each taking `query_ms`; counts what it served."""
+
+    def __init__(self, query_ms, concurrency):
+        self.query_ms = query_ms
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+        self.reads = 0
+
+    def query(self):
+        with self._slots:
+            time.sleep(self.query_ms / 1000)
+        with self._lock:
+            self.reads += 1
+
+
+def popular(rng, values):
+    # Zipf-like: the n-th value is picked with weight 1 / n
+    return rng.choices(values, weights=[1 / n for n in range(1, len(values) + 1)])[0]
+
+
+def workload(args, toolset):
+    rng = random.Random(args.seed)
+    calls = []
+    for _ in range(args.users):
+        user = []
+        for _ in range(args.calls):
+            if toolset == "toolbox":
+                tool = rng.choice(["search-diagnostic-by-disease", "search-cure-by-disease", "find-all-diseases-by-symptom"])
+                arguments = ({"symptom": popular(rng, SYMPTOMS)} if tool == "find-all-diseases-by-symptom"
+                             else {"disease": popular(rng, DISEASES)})
+            else:
+                tool = rng.choice(["find_all_diseases_by_symptom", "rank_diseases_by_symptoms"])
+                arguments = ({"symptom": popular(rng, SYMPTOMS)} if tool == "find_all_diseases_by_symptom"
+                             else {"symptoms": sorted({popular(rng, SYMPTOMS) for _ in range(2)})})
+            user.append((tool, arguments))
+        calls.append(user)
+    return calls
+
+
+def percentile(latencies, q):
+    return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 1)
+
+
+async def drive(calls, call_one):
+    latencies = []
+
+    async def user(steps):
+        for tool, arguments in steps:
+            start = time.perf_counter()
+            await call_one(tool, arguments)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(steps) for steps in calls))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {"seconds": round(elapsed, 2), "p50_ms": percentile(latencies, 0.5),
+            "p95_ms": percentile(latencies, 0.95), "p99_ms": percentile(latencies, 0.99)}
+
+
+async def run_toolbox(calls, url, coalescer):
+    manifest = ManifestToolset(url)
+    toolset = CoalescingToolset(manifest, coalescer) if coalescer else manifest
+    by_name = {tool.name: tool for tool in await toolset.get_tools()}
+    # Connect before timing, as a warm instance would be
+    await manifest.remote_tool(next(iter(by_name)))
+    try:
+        return await drive(calls, lambda tool, arguments: by_name[tool].run_async(args=arguments, tool_context=None))
+    finally:
+        await toolset.close()
+
+
+async def run_native(calls):
+    functions = {"find_all_diseases_by_symptom": tools.find_all_diseases_by_symptom,
+                 "rank_diseases_by_symptoms": tools.rank_diseases_by_symptoms}
+    return await drive(calls, lambda tool, arguments: functions[tool](**arguments))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--toolset", choices=("toolbox", "native", "both"), default="both")
+    parser.add_argument("--users", type=int, default=100, help="concurrent virtual users")
+    parser.add_argument("--calls", type=int, default=5, help="tool calls per user, one after the other")
+    parser.add_argument("--spanner-ms", type=float, default=30, help="stand-in Spanner query time")
+    parser.add_argument("--spanner-concurrency", type=int, default=4, help="queries Spanner serves at once")
+    parser.add_argument("--window", type=float, default=coalescing.WINDOW_SECONDS, help="result window in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    spanner = SpannerStandIn(args.spanner_ms, args.spanner_concurrency)
+    modes = [("off", None), ("in_flight", 0.0), ("window", args.window)]
+    results = []
+
+    if args.toolset in ("toolbox", "both"):
+        bench_toolsets.spanner_stand_in = lambda spanner_ms, tool, tool_args: spanner.query() or [{"tool": tool}]
+        url = ToolboxStandIn(args.spanner_ms, 0, 0).start()
+        calls = workload(args, "toolbox")
+        for mode, window in modes:
+            coalescer = QueryCoalescer(window=window) if window is not None else None
+            spanner.reads = 0
+            timings = asyncio.run(run_toolbox(calls, url, coalescer))
+            results.append({"toolset": "toolbox", "mode": mode, "calls": args.users * args.calls,
+                            "spanner_reads": spanner.reads, **(coalescer.stats() if coalescer else {}), **timings})
+
+    if args.toolset in ("native", "both"):
+        from fake_catalog import CatalogDatabase, install, load_catalog, fake_embeddings
+
+        install(CatalogDatabase(load_catalog()))
+
+        def embed_texts(texts):
+            spanner.query()
+            return fake_embeddings(texts)
+        tools.embed_texts = embed_texts
+        tools.embed_text = lambda text: embed_texts([text])[0]
+        tools.get_symptom_index()
+        calls = workload(args, "native")
+        for mode, window in modes:
+            coalescer = QueryCoalescer(window=window, enabled=window is not None)
+            coalescing._coalescer = coalescer
+            spanner.reads = 0
+            timings = asyncio.run(run_native(calls))
+            stats = coalescer.stats() if window is not None else {}
+            results.append({"toolset": "native", "mode": mode, "calls": args.users * args.calls,
+                            "spanner_reads": spanner.reads, **stats, **timings})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for r in results:
+        print(", ".join(f"{key}={value}" for key, value in r.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Prompt size and model latency per turn, with and without conversation compaction.
+
+Replays a scripted 20-turn interview (symptoms -> differential -> diagnostics -> results
+-> treatments) with realistically sized tool outputs. Every model call of every turn
+goes through ConversationCompactor.before_model_callback exactly as in the agent.
+
+Offline (default) the summary is extracted from tool calls, prompt tokens are estimated
+at 4 characters per token and latency is modelled as --base-ms plus --prefill-ms-per-1k
+per thousand prompt tokens. With --live each request is sent to Gemini and the real
+prompt_token_count and latency are reported. Tool calls are flattened to text for that,
+because the requests carry no tool declarations.
+
+    python benchmarks/bench_compaction.py --budget 6000 --keep-turns 3
+    python benchmarks/bench_compaction.py --live --model gemini-2.5-flash --json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Importing the agent would otherwise start warming up clients against the real services
+os.environ.setdefault("AGENT_STARTUP_MODE", "lazy")
+from google.genai import types
+from google.adk.models.llm_request import LlmRequest
+from zooka_agent.agent import prompt_root
+from zooka_agent.compaction import ConversationCompactor, estimate_tokens, CHARS_PER_TOKEN, _part_text
+
+DISEASES = ["Stable Angina", "Unstable Angina", "Myocardial Infarction", "Pericarditis", "Aortic Stenosis",
+            "Hypertrophic Cardiomyopathy", "Atrial Fibrillation", "Heart Failure", "Mitral Valve Prolapse",
+            "Aortic Dissection"]
+
+# (user message, tool name, tool args, reply length in characters)
+SCRIPT = [
+    ("Hi Zooka", None, None, 300),
+    ("I get chest pain when I climb stairs, it goes away when I rest. I'm also short of breath and tired.",
+     "rank_diseases_by_symptoms", {"symptoms": [
+         "chest pain on exertion relieved by rest", "shortness of breath on exertion", "fatigue"]}, 1400),
+    ("Also my ankles are swollen in the evening.", "find_all_diseases_by_symptom",
+     {"symptom": "ankle swelling in the evening"}, 900),
+    ("Which one is most likely?", None, None, 700),
+    ("How do I verify Stable Angina?", "search_diagnostic_by_disease", {"disease": "Stable Angina"}, 1300),
+    ("What does a stress test involve?", None, None, 900),
+    ("Is the coronary angiography risky?", None, None, 800),
+    ("I did the stress test, it was normal with no ST changes.", None, None, 1100),
+    ("OK so what's next?", None, None, 700),
+    ("How do I verify Heart Failure?", "search_diagnostic_by_disease", {"disease": "Heart Failure"}, 1300),
+    ("Can you explain what BNP means?", None, None, 800),
+    ("My echocardiogram shows an ejection fraction of 35%.", None, None, 1200),
+    ("And my BNP was 900 pg/mL.", None, None, 900),
+    ("So it's heart failure?", None, None, 800),
+    ("What are the treatments?", "search_cure_by_disease", {"disease": "Heart Failure"}, 1600),
+    ("What are the side effects of ACE inhibitors?", None, None, 900),
+    ("Can I still exercise?", None, None, 800),
+    ("What about salt in my diet?", None, None, 800),
+    ("Remind me which diseases we ruled out?", None, None, 700),
+    ("Thanks, bye", None, None, 300),
+]
+
+
+def tool_output(name, args):
+    """Tool responses shaped and sized like zooka_agent/tools.py's."""
+    description = "A condition of the heart and blood vessels. " * 6
+    if name == "rank_diseases_by_symptoms":
+        return {"symptoms": args["symptoms"], "diseases": [{
+            "disease_name": d, "disease_description": description,
+            "matched_symptom_count": 3 - i // 4, "confidence_score": round(0.9 - i * 0.07, 4),
+            "matched_symptoms": [{"reported_symptom": s, "stored_symptom": s, "confidence": "high", "distance": 0.12}
+                                 for s in args["symptoms"]],
+        } for i, d in enumerate(DISEASES)]}
+    if name == "find_all_diseases_by_symptom":
+        return {"symptom": args["symptom"], "matches": [{
+            "symptom_name": f"{args['symptom']} variant {m}", "symptom_details": description, "distance": 0.1 + m / 10,
+            "diseases": [{"disease_name": d, "confidence": "medium", "disease_description": description}
+                         for d in DISEASES[m:m + 4]],
+        } for m in range(3)]}
+    match = {"disease": args["disease"], "matched_disease": args["disease"], "match_score": 1.0}
+    if name == "search_diagnostic_by_disease":
+        return {**match, "diagnostics": [{"DiagnosticName": f"Procedure {i}", "DiagnosticPurpose": description,
+                                          "IsGoldStandard": i == 0} for i in range(6)]}
+    return {**match, "treatments": [{"TreatmentName": f"Treatment {i}", "TreatmentDetails": description,
+                                     "treatmenttype": "medication", "Confidence": "high"} for i in range(8)]}
+
+
+def reply(length, turn):
+    sentence = f"Based on what you told me in turn {turn}, here is what I found and what we should do next. "
+    return (sentence * (length // len(sentence) + 1))[:length]
+
+
+def flatten(contents):
+    return [types.Content(role=c.role, parts=[types.Part(text="".join(_part_text(p) for p in c.parts or []))])
+            for c in contents]
+
+
+async def replay(compactor, live_client, model, base_ms, prefill_ms_per_1k):
+    context = SimpleNamespace(state={})
+    history = []
+    turns = []
+
+    async def model_call():
+        request = LlmRequest(contents=list(history), config=types.GenerateContentConfig(system_instruction=prompt_root))
+        if compactor:
+            await compactor.before_model_callback(context, request)
+        if live_client:
+            start = time.perf_counter()
+            response = await live_client.aio.models.generate_content(
+                model=model, contents=flatten(request.contents),
+                config=types.GenerateContentConfig(system_instruction=request.config.system_instruction,
+                                                   max_output_tokens=16))
+            return response.usage_metadata.prompt_token_count, time.perf_counter() - start
+        tokens = estimate_tokens(request.contents) + len(request.config.system_instruction) // CHARS_PER_TOKEN
+        return tokens, (base_ms + prefill_ms_per_1k * tokens / 1000) / 1000
+
+    for turn, (message, tool, args, reply_length) in enumerate(SCRIPT, start=1):
+        history.append(types.Content(role="user", parts=[types.Part(text=message)]))
+        calls = [await model_call()]
+        if tool:
+            history.append(types.Content(role="model", parts=[
+                types.Part(function_call=types.FunctionCall(id=f"call-{turn}", name=tool, args=args))]))
+            history.append(types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(
+                id=f"call-{turn}", name=tool, response=tool_output(tool, args)))]))
+            calls.append(await model_call())
+        history.append(types.Content(role="model", parts=[types.Part(text=reply(reply_length, turn))]))
+        turns.append({
+            "turn": turn,
+            "model_calls": len(calls),
+            "prompt_tokens": sum(c[0] for c in calls),
+            "latency_s": round(sum(c[1] for c in calls), 3),
+        })
+    return turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=int, default=6000, help="COMPACTION_TOKEN_BUDGET")
+    parser.add_argument("--keep-turns", type=int, default=3, help="COMPACTION_KEEP_TURNS")
+    parser.add_argument("--base-ms", type=float, default=600, help="offline: fixed model latency")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=60, help="offline: latency per 1k prompt tokens")
+    parser.add_argument("--live", action="store_true", help="send every request to Gemini")
+    parser.add_argument("--model", default="gemini-2.5-flash", help="--live: model answering the requests")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    live_client = None
+    summarizer = "extract"
+    if args.live:
+        from google.genai import Client
+        live_client = Client(vertexai=True, project=os.getenv("GOOGLE_CLOUD_PROJECT"), location="global")
+        summarizer = "model"
+
+    compactor = ConversationCompactor(token_budget=args.budget, keep_turns=args.keep_turns, summarizer=summarizer)
+    baseline = asyncio.run(replay(None, live_client, args.model, args.base_ms, args.prefill_ms_per_1k))
+    compacted = asyncio.run(replay(compactor, live_client, args.model, args.base_ms, args.prefill_ms_per_1k))
+
+    rows = [{
+        "turn": b["turn"],
+        "model_calls": b["model_calls"],
+        "full_prompt_tokens": b["prompt_tokens"],
+        "compacted_prompt_tokens": c["prompt_tokens"],
+        "full_latency_s": b["latency_s"],
+        "compacted_latency_s": c["latency_s"],
+    } for b, c in zip(baseline, compacted)]
+    totals = {key: round(sum(r[key] for r in rows), 3) for key in rows[0] if key not in ("turn", "model_calls")}
+
+    if args.json:
+        print(json.dumps({"live": args.live, "turns": rows, "totals": totals}, indent=2))
+        return
+    for r in rows:
+        print(", ".join(f"{key}={value}" for key, value in r.items()))
+    print("totals: " + ", ".join(f"{key}={value}" for key, value in totals.items()))
+
+
+if __name__ == "__main__":
+    main()
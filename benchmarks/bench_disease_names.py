@@ -0,0 +1,157 @@
+"""Retry turns saved by resolving disease names in search_diagnostic_by_disease and search_cure_by_disease.
+
+Replays disease arguments the way the model writes them (REPLAY: short names,
+abbreviations, common names, possessives, and names the catalog doesn't have) against
+the catalog in Data/data.json, once with the exact `d.Name = @disease` match the
+tools used before and once through zooka_agent/disease_names.py. An argument that
+matches nothing costs the model at least one more turn (a model call and a tool round
+trip, --turn-ms) to retry with another spelling; one that resolves to the wrong disease
+is counted separately, since the model would present the wrong diagnostics. Embedding
+similarity needs TextEmbeddingModel and is left out here.
+
+    python benchmarks/bench_disease_names.py --turn-ms 2500
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Importing the package defines the agent; don't let it warm up against real services
+os.environ.setdefault("AGENT_STARTUP_MODE", "lazy")
+
+from zooka_agent.disease_names import DiseaseNameIndex
+
+# (argument the model passed, the stored name the user meant, or None when it isn't in the catalog
+# or names several diseases, so the model should ask the user)
+REPLAY = [
+    ("Hypertension", None),
+    ("Essential Hypertension", "Essential (Primary) Hypertension"),
+    ("high blood pressure", "Essential (Primary) Hypertension"),
+    ("Unstable Angina", "Unstable Angina"),
+    ("unstable angina", "Unstable Angina"),
+    ("NSTEMI", "NSTEMI (Non-ST Elevation Myocardial Infarction)"),
+    ("Non-ST Elevation Myocardial Infarction", "NSTEMI (Non-ST Elevation Myocardial Infarction)"),
+    ("Pulmonary Embolism", "Pulmonary Embolism (PE)"),
+    ("PE", "Pulmonary Embolism (PE)"),
+    ("Mitral Stenosis", "Mitral Valve Stenosis"),
+    ("Dilated Cardiomyopathy", "Dilated Cardiomyopathy"),
+    ("Hypertrophic Cardiomyopathy", "Hypertrophic Cardiomyopathy (HCM)"),
+    ("HOCM", "Hypertrophic Cardiomyopathy (HCM)"),
+    ("Pericarditis", "Acute Pericarditis"),
+    ("Infective Endocarditis", "Infective Endocarditis"),
+    ("Endocarditis", "Infective Endocarditis"),
+    ("Atrial Flutter", "Atrial Flutter"),
+    ("AAA", "Abdominal Aortic Aneurysm (AAA)"),
+    ("Abdominal aortic aneurysm", "Abdominal Aortic Aneurysm (AAA)"),
+    ("Aortic Dissection", "Aortic Dissection (Type A)"),
+    ("Type A Aortic Dissection", "Aortic Dissection (Type A)"),
+    ("Deep Vein Thrombosis", "Deep Vein Thrombosis (DVT)"),
+    ("DVT", "Deep Vein Thrombosis (DVT)"),
+    ("Peripheral Arterial Disease", "Peripheral Artery Disease (PAD)"),
+    ("Complete Heart Block", "Third-Degree Atrioventricular Block"),
+    ("Third-Degree AV Block", "Third-Degree Atrioventricular Block"),
+    ("Wolff-Parkinson-White", "Wolff-Parkinson-White Syndrome (WPW)"),
+    ("WPW Syndrome", "Wolff-Parkinson-White Syndrome (WPW)"),
+    ("Long QT Syndrome", "Long QT Syndrome"),
+    ("Sick Sinus Syndrome", "Sick Sinus Syndrome"),
+    ("Raynaud's", "Raynaud's Phenomenon"),
+    ("Raynaud Phenomenon", "Raynaud's Phenomenon"),
+    ("Myocarditis", "Acute Myocarditis"),
+    ("Takotsubo", "Takotsubo Cardiomyopathy"),
+    ("Broken Heart Syndrome", "Takotsubo Cardiomyopathy"),
+    ("Pulmonary Hypertension", "Pulmonary Arterial Hypertension (PAH)"),
+    ("PAH", "Pulmonary Arterial Hypertension (PAH)"),
+    ("SVT", "Paroxysmal Supraventricular Tachycardia (PSVT)"),
+    ("PSVT", "Paroxysmal Supraventricular Tachycardia (PSVT)"),
+    ("Ventricular Tachycardia", "Ventricular Tachycardia (VT)"),
+    ("PVCs", "Premature Ventricular Contractions (PVCs)"),
+    ("Premature Ventricular Contraction", "Premature Ventricular Contractions (PVCs)"),
+    ("Cardiac Tamponade", "Cardiac Tamponade"),
+    ("Prinzmetal Angina", "Prinzmetal's Angina (Variant Angina)"),
+    ("Variant Angina", "Prinzmetal's Angina (Variant Angina)"),
+    ("Brugada", "Brugada Syndrome"),
+    ("Giant Cell Arteritis", "Giant Cell Arteritis (Temporal Arteritis)"),
+    ("Temporal Arteritis", "Giant Cell Arteritis (Temporal Arteritis)"),
+    ("Chagas Disease", "Chagas Cardiomyopathy"),
+    ("TIA", "Transient Ischemic Attack (TIA)"),
+    ("Mini-stroke", "Transient Ischemic Attack (TIA)"),
+    ("Subarachnoid Hemorrhage", "Subarachnoid Hemorrhage (SAH)"),
+    ("SVC Syndrome", "Superior Vena Cava (SVC) Syndrome"),
+    ("Marfan's Syndrome", "Marfan Syndrome"),
+    ("Buerger Disease", "Buerger's Disease (Thromboangiitis Obliterans)"),
+    ("Thromboangiitis Obliterans", "Buerger's Disease (Thromboangiitis Obliterans)"),
+    ("Ebstein Anomaly", "Ebstein's Anomaly"),
+    ("Guillain-Barre Syndrome", "Guillain-Barré Syndrome (GBS)"),
+    ("Hemorrhagic Stroke", "Intracerebral Hemorrhage (Hemorrhagic Stroke)"),
+    ("Sleep Apnea", "Obstructive Sleep Apnea (OSA)"),
+    ("Kidney Stones", "Nephrolithiasis (Kidney Stones)"),
+    ("Takayasu's Arteritis", "Takayasu Arteritis"),
+    ("Tetralogy of Fallot", "Tetralogy of Fallot"),
+    ("Atrial Fibrillation", None),
+    ("AFib", None),
+    ("Stable Angina", None),
+    ("Heart Failure", None),
+    ("Stroke", None),
+    ("Myocardial Infarction", None),
+    ("Cardiomyopathy", None),
+    ("Angina", None),
+]
+
+
+def replay(index, names):
+    stats = {"calls": len(REPLAY), "exact_hits": 0, "resolved": 0, "correct": 0, "wrong": 0,
+             "unresolved": 0, "retry_turns_before": 0, "retry_turns_after": 0}
+    start = time.perf_counter()
+    outcomes = []
+    for argument, expected in REPLAY:
+        exact = argument in names
+        stats["exact_hits"] += exact
+        # A miss that the catalog could have answered sends the model round again
+        stats["retry_turns_before"] += not exact and expected is not None
+        match, _ = index.match(argument)
+        resolved = match["disease_name"] if match else None
+        if resolved is None:
+            stats["unresolved"] += 1
+            stats["retry_turns_after"] += expected is not None
+        else:
+            stats["resolved"] += 1
+            stats["correct" if resolved == expected else "wrong"] += 1
+        outcomes.append({"argument": argument, "expected": expected, "resolved": resolved,
+                         "score": match["match_score"] if match else None})
+    stats["resolve_us_avg"] = round((time.perf_counter() - start) / len(REPLAY) * 1e6, 1)
+    return stats, outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--catalog", default=os.path.join(ROOT, "Data", "data.json"))
+    parser.add_argument("--turn-ms", type=float, default=2500, help="cost of one retry: a model call and a tool round trip")
+    parser.add_argument("--verbose", action="store_true", help="print every replayed argument")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    with open(args.catalog) as f:
+        names = [disease["disease_name"] for disease in json.load(f)]
+    start = time.perf_counter()
+    index = DiseaseNameIndex(names)
+    build_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    stats, outcomes = replay(index, set(names))
+    saved = stats["retry_turns_before"] - stats["retry_turns_after"]
+    results = {"diseases": len(names), "index_build_ms": build_ms, **stats, "retry_turns_saved": saved,
+               "seconds_saved": round(saved * args.turn_ms / 1000, 1)}
+
+    if args.json:
+        print(json.dumps({**results, "outcomes": outcomes} if args.verbose else results, indent=2))
+        return
+    if args.verbose:
+        for o in outcomes:
+            print(", ".join(f"{key}={value}" for key, value in o.items()))
+    print(", ".join(f"{key}={value}" for key, value in results.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Tool calls and wall-clock time of a full diagnostic interview, before and after get_disease_dossier.
+
+Drives the real agent (callbacks, compaction, session state) through an InMemoryRunner
+against the catalog in Data/data.json (benchmarks/fake_catalog.py), with a scripted model
+standing in for Gemini: every model request takes --model-ms and every tool call adds
+--tool-ms for its round trip. The interview is the one the prompt describes: symptoms,
+how to verify the top disease, the diagnostic results, then the treatments.
+
+- before: the model verifies with search_diagnostic_by_disease and later looks the
+  treatments up with search_cure_by_disease, a tool call and one more model request.
+- after: the model fetches the dossier once when asked how to verify, and answers the
+  treatment question from the dossier dossier.py keeps in the system instruction.
+
+    python benchmarks/bench_dossier.py --model-ms 1500 --tool-ms 150
+"""
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Importing the package defines the agent; don't let it warm up against real services
+os.environ.setdefault("AGENT_STARTUP_MODE", "lazy")
+os.environ.setdefault("AGENT_TOOLSET", "native")
+os.environ.setdefault("COMPACTION_SUMMARIZER", "extract")
+os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "bench-project")
+# Interviews repeat the same calls; each one should pay for its own
+os.environ.setdefault("TOOL_COALESCING", "0")
+
+from fake_catalog import CatalogDatabase, install, load_catalog
+
+MODES = ("before", "after")
+DISEASE = "Unstable Angina"
+MESSAGES = [
+    "I get chest pain even at rest and it's getting worse over the last days. I'm also short of breath and sweating.",
+    f"How do I verify {DISEASE}?",
+    "The ECG shows ST depression and the troponin is normal. Does that confirm it?",
+    "Yes please, what are the treatments?",
+]
+SYMPTOMS = ["chest pain at rest, worsening over days", "shortness of breath", "sweating"]
+DOSSIER_MARKER = "Disease dossiers already fetched"
+
+
+class ScriptedGemini:
+    """Answers like the agent would on MESSAGES; `mode` decides which tools it reaches for."""
+
+    def __init__(self, model_ms):
+        self.model_ms = model_ms
+        self.mode = None
+        self.calls = Counter()
+        self.tool_calls = Counter()
+        self._lock = threading.Lock()
+
+    def respond(self, contents, config):
+        from google.genai import types
+
+        def reply(*parts):
+            return types.GenerateContentResponse(
+                candidates=[types.Candidate(content=types.Content(role="model", parts=list(parts)), finish_reason="STOP")],
+                usage_metadata=types.GenerateContentResponseUsageMetadata(prompt_token_count=1000, candidates_token_count=20),
+            )
+
+        def call(name, **args):
+            with self._lock:
+                self.tool_calls[name] += 1
+            return reply(types.Part(function_call=types.FunctionCall(name=name, args=args)))
+
+        if config is not None and config.response_mime_type == "application/json":
+            with self._lock:
+                self.calls["router"] += 1
+            return reply(types.Part(text=json.dumps({"route": "diagnostic", "reply": ""})))
+        with self._lock:
+            self.calls["agent"] += 1
+        if isinstance(contents, str):
+            return reply(types.Part(text="OK"))
+        if any(part.function_response for part in contents[-1].parts or []):
+            return reply(types.Part(text="Here is what I found."))
+
+        text = " ".join(part.text or "" for part in contents[-1].parts or [])
+        instruction = str(config.system_instruction) if config is not None else ""
+        verify = re.search(r"verify (.+)\?", text)
+        if "chest pain" in text:
+            return call("rank_diseases_by_symptoms", symptoms=SYMPTOMS)
+        if verify:
+            tool = "get_disease_dossier" if self.mode == "after" else "search_diagnostic_by_disease"
+            return call(tool, disease=verify.group(1))
+        if "treatments" in text:
+            if DOSSIER_MARKER in instruction and DISEASE in instruction:
+                return reply(types.Part(text=f"The treatments for {DISEASE} are, from its dossier: ..."))
+            return call("search_cure_by_disease", disease=DISEASE)
+        return reply(types.Part(text=f"The results confirm {DISEASE}."))
+
+    def install(self):
+        from google.genai import models
+
+        fake = self
+
+        def generate_content(self, *, model, contents, config=None):
+            time.sleep(fake.model_ms / 1000)
+            return fake.respond(contents, config)
+
+        async def async_generate_content(self, *, model, contents, config=None):
+            await asyncio.sleep(fake.model_ms / 1000)
+            return fake.respond(contents, config)
+
+        models.Models.generate_content = generate_content
+        models.AsyncModels.generate_content = async_generate_content
+
+
+def install_tool_latency(tool_ms):
+    from zooka_agent import tools
+
+    run_blocking = tools._run_blocking
+
+    async def timed(func, *args):
+        await asyncio.sleep(tool_ms / 1000)
+        return await run_blocking(func, *args)
+
+    tools._run_blocking = timed
+
+
+async def interview(app):
+    from google.genai import types
+    from google.adk.runners import InMemoryRunner
+
+    runner = InMemoryRunner(app=app)
+    session = await runner.session_service.create_session(app_name=app.name, user_id="bench")
+    turns = []
+    for message in MESSAGES:
+        start = time.perf_counter()
+        async for _ in runner.run_async(user_id="bench", session_id=session.id,
+                                        new_message=types.Content(role="user", parts=[types.Part(text=message)])):
+            pass
+        turns.append(round(time.perf_counter() - start, 3))
+    session = await runner.session_service.get_session(app_name=app.name, user_id="bench", session_id=session.id)
+    await runner.close()
+    return turns, session.state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model-ms", type=float, default=1500, help="fake model latency per request")
+    parser.add_argument("--tool-ms", type=float, default=150, help="round trip of each tool call")
+    parser.add_argument("--interviews", type=int, default=3, help="interviews per mode")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    from zooka_agent import agent, dossier
+
+    database = CatalogDatabase(load_catalog())
+    install(database)
+    model = ScriptedGemini(args.model_ms)
+    model.install()
+    install_tool_latency(args.tool_ms)
+
+    results = []
+    for mode in MODES:
+        model.mode = mode
+        model.calls.clear()
+        model.tool_calls.clear()
+        start = time.perf_counter()
+        turns = []
+        for _ in range(args.interviews):
+            turn_seconds, state = asyncio.run(interview(agent.app))
+            turns.append(turn_seconds)
+        elapsed = time.perf_counter() - start
+        n = args.interviews
+        results.append({
+            "mode": mode,
+            "tool_calls": round(sum(model.tool_calls.values()) / n, 2),
+            "model_calls": round(model.calls["agent"] / n, 2),
+            "router_calls": round(model.calls["router"] / n, 2),
+            "interview_s": round(elapsed / n, 3),
+            "treatment_turn_s": round(sum(t[-1] for t in turns) / n, 3),
+            "dossiers_in_state": len(state.get(dossier.DOSSIER_KEY) or {}),
+            "tools": dict(model.tool_calls),
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for r in results:
+        print(", ".join(f"{key}={value}" for key, value in r.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""Cold-start latency of a new agent instance: import, warm-up and its first turns.
+
+Each mode runs in a fresh interpreter. The import is timed on its own, with nothing
+patched; the time to import google.cloud.spanner afterwards is what the deferred imports
+keep off that path. A second interpreter per mode fakes the remote services and sends
+two diagnostic turns (router, model, tool call, model) through an InMemoryRunner the
+moment the import returns, as if a request had been waiting for the new instance:
+
+- GenAI: every request takes --model-ms; the first request of each client also pays
+  --token-ms for credentials and an access token, and the first request on each
+  connection pool (the sync pool, or the async pool of an event loop) pays --connect-ms.
+- Spanner: creating the session pool takes --session-ms and every query --query-ms.
+- Toolbox (--toolset toolbox): the stand-in MCP server from bench_toolsets.py, with
+  --rtt-ms per request and --cold-start-ms on its first one.
+
+init_s is how long the warm-up took after the import (0 when lazy). The turns are timed
+from the moment they were sent, so a turn that had to wait for the warm-up includes it;
+--arrive-after-ms delays the first one, as when an instance starts ahead of traffic.
+
+    python benchmarks/bench_startup.py --model-ms 400 --token-ms 300 --session-ms 500
+    python benchmarks/bench_startup.py --toolset toolbox --rtt-ms 20 --cold-start-ms 1500
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import importlib
+import threading
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODES = ("lazy", "warm")
+MESSAGES = [
+    "I get chest pain when I climb stairs, it goes away when I rest. I'm also short of breath.",
+    "How do I verify Stable Angina?",
+]
+# Tool the fake model calls on each turn, per toolset
+TOOL_CALLS = {
+    "native": [
+        ("rank_diseases_by_symptoms", {"symptoms": ["chest pain on exertion relieved by rest", "shortness of breath"]}),
+        ("search_diagnostic_by_disease", {"disease": "Stable Angina"}),
+    ],
+    "toolbox": [
+        ("find-all-diseases-by-symptom", {"symptom": "chest pain on exertion relieved by rest"}),
+        ("search-diagnostic-by-disease", {"disease": "Stable Angina"}),
+    ],
+}
+
+
+class FakeGenAI:
+    """Stands in for the Vertex AI endpoint behind google.genai's Models and AsyncModels."""
+
+    def __init__(self, args):
+        self.args = args
+        self._lock = threading.Lock()
+        self._authorized = set()
+        self._connected = set()
+
+    def latency(self, api_client, pool):
+        seconds = self.args.model_ms
+        with self._lock:
+            if id(api_client) not in self._authorized:
+                self._authorized.add(id(api_client))
+                seconds += self.args.token_ms
+            if (id(api_client), pool) not in self._connected:
+                self._connected.add((id(api_client), pool))
+                seconds += self.args.connect_ms
+        return seconds / 1000
+
+    def respond(self, contents, config):
+        from google.genai import types
+
+        if config is not None and config.response_mime_type == "application/json":
+            parts = [types.Part(text=json.dumps({"route": "diagnostic", "reply": ""}))]
+        elif isinstance(contents, str):
+            parts = [types.Part(text="OK")]
+        elif any(part.function_response for part in contents[-1].parts or []):
+            parts = [types.Part(text="Stable Angina is the most likely disease.")]
+        else:
+            user_turns = sum(1 for content in contents if content.role == "user" and any(
+                part.text and "<PAST_CONVERSATIONS>" not in part.text for part in content.parts or []))
+            name, tool_args = TOOL_CALLS[self.args.toolset][min(user_turns, len(MESSAGES)) - 1]
+            parts = [types.Part(function_call=types.FunctionCall(name=name, args=tool_args))]
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(content=types.Content(role="model", parts=parts), finish_reason="STOP")],
+            usage_metadata=types.GenerateContentResponseUsageMetadata(prompt_token_count=1000, candidates_token_count=20),
+        )
+
+    def install(self):
+        from google.genai import models
+
+        fake = self
+
+        def generate_content(self, *, model, contents, config=None):
+            time.sleep(fake.latency(self._api_client, "sync"))
+            return fake.respond(contents, config)
+
+        async def async_generate_content(self, *, model, contents, config=None):
+            await asyncio.sleep(fake.latency(self._api_client, id(asyncio.get_running_loop())))
+            return fake.respond(contents, config)
+
+        models.Models.generate_content = generate_content
+        models.AsyncModels.generate_content = async_generate_content
+
+
+class FakeResults(list):
+    fields = []
+
+
+class FakeDatabase:
+    """An empty catalog: every query returns no rows after --query-ms."""
+
+    def __init__(self, query_ms):
+        self.query_ms = query_ms
+
+    def snapshot(self, **kwargs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_sql(self, sql, params=None, param_types=None):
+        time.sleep(self.query_ms / 1000)
+        return FakeResults()
+
+
+class FakeSpannerClient:
+
+    def __init__(self, args, project=None):
+        self.args = args
+
+    def instance(self, name):
+        return self
+
+    def database(self, name, pool=None):
+        time.sleep(self.args.session_ms / 1000)
+        return FakeDatabase(self.args.query_ms)
+
+
+async def run_turns(app):
+    from google.genai import types
+    from google.adk.runners import InMemoryRunner
+
+    start = time.perf_counter()
+    runner = InMemoryRunner(app=app)
+    session = await runner.session_service.create_session(app_name=app.name, user_id="bench")
+    latencies = []
+    for message in MESSAGES:
+        async for _ in runner.run_async(user_id="bench", session_id=session.id,
+                                        new_message=types.Content(role="user", parts=[types.Part(text=message)])):
+            pass
+        latencies.append(round(time.perf_counter() - start, 4))
+        start = time.perf_counter()
+    await runner.close()
+    return latencies
+
+
+def child_import():
+    start = time.perf_counter()
+    importlib.import_module("zooka_agent.agent")
+    imported = time.perf_counter()
+    importlib.import_module("google.cloud.spanner")
+    return {"import_s": round(imported - start, 4), "deferred_spanner_import_s": round(time.perf_counter() - imported, 4)}
+
+
+def child_turns(args):
+    import google.cloud.spanner
+    FakeGenAI(args).install()
+    google.cloud.spanner.Client = lambda project=None: FakeSpannerClient(args, project)
+    if args.toolset == "toolbox":
+        from bench_toolsets import ToolboxStandIn
+        os.environ["TOOLBOX_URL"] = ToolboxStandIn(args.query_ms, args.rtt_ms, args.cold_start_ms).start()
+
+    start = time.perf_counter()
+    from zooka_agent import agent, startup
+    imported = time.perf_counter()
+    startup_done = {}
+    threading.Thread(target=lambda: startup_done.setdefault("at", startup.wait() and time.perf_counter()),
+                     daemon=True).start()
+
+    time.sleep(args.arrive_after_ms / 1000)
+    first_turn_s, second_turn_s = asyncio.run(run_turns(agent.app))
+    startup.wait()
+    init_s = round(startup_done["at"] - imported, 4) if startup.STARTUP_MODE == "warm" else 0.0
+    return {
+        "patched_import_s": round(imported - start, 4),
+        "init_s": init_s,
+        "first_turn_s": first_turn_s,
+        "second_turn_s": second_turn_s,
+        "warm_up": dict(startup.timings),
+    }
+
+
+def run_child(mode, phase, argv):
+    env = {
+        **os.environ,
+        "AGENT_STARTUP_MODE": mode,
+        "GOOGLE_CLOUD_PROJECT": os.getenv("GOOGLE_CLOUD_PROJECT", "bench-project"),
+        "TOOLBOX_URL": "http://127.0.0.1:9",
+    }
+    # The import is timed lazily so nothing reaches for the network
+    if phase == "import":
+        env["AGENT_STARTUP_MODE"] = "lazy"
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", phase, *argv],
+                            env=env, cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--toolset", choices=("native", "toolbox"), default="native")
+    parser.add_argument("--model-ms", type=float, default=400, help="fake model latency per request")
+    parser.add_argument("--token-ms", type=float, default=300, help="credentials and access token, per client")
+    parser.add_argument("--connect-ms", type=float, default=80, help="DNS and TLS, per client connection pool")
+    parser.add_argument("--session-ms", type=float, default=500, help="Spanner session pool creation")
+    parser.add_argument("--query-ms", type=float, default=40, help="each Spanner query")
+    parser.add_argument("--rtt-ms", type=float, default=20, help="toolbox: round trip to the Toolbox service")
+    parser.add_argument("--cold-start-ms", type=float, default=1500, help="toolbox: Toolbox cold start")
+    parser.add_argument("--arrive-after-ms", type=float, default=0, help="first turn arrives this long after the import")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--child", choices=("import", "turns"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child == "import":
+        print(json.dumps(child_import()))
+        return
+    if args.child == "turns":
+        os.environ["AGENT_TOOLSET"] = args.toolset
+        print(json.dumps(child_turns(args)))
+        return
+
+    argv = [arg for arg in sys.argv[1:] if arg != "--json"]
+    imports = run_child("lazy", "import", argv)
+    results = [{"mode": mode, "toolset": args.toolset, **imports, **run_child(mode, "turns", argv)} for mode in MODES]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for r in results:
+        print(", ".join(f"{key}={value}" for key, value in r.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Recall and latency of the in-process symptom index (IVF) against the exact scan.
+
+The exact scan scores every row, like the COSINE_DISTANCE query in Toolbox/tools.yaml,
+and is used as ground truth. Vectors are synthetic and clustered like real embeddings.
+
+    python benchmarks/bench_symptom_index.py --rows 1000,20000,200000 --k 5
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Importing the agent would otherwise start warming up clients against the real services
+os.environ.setdefault("AGENT_STARTUP_MODE", "lazy")
+from zooka_agent.symptom_index import SymptomIndex
+
+
+def synthetic_vectors(rows, dims, clusters, rng):
+    centers = rng.standard_normal((clusters, dims)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=rows)
+    return centers[labels] + 0.6 * rng.standard_normal((rows, dims)).astype(np.float32)
+
+
+def timed_search(index, queries, k, exact):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(index.search(query, k=k, exact=exact))
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return results, latencies
+
+
+def run(rows, dims, k, queries_count, probes, rng):
+    vectors = synthetic_vectors(rows, dims, clusters=max(8, rows // 200), rng=rng)
+    ids = [str(i) for i in range(rows)]
+    queries = vectors[rng.integers(0, rows, size=queries_count)] + 0.3 * rng.standard_normal((queries_count, dims))
+
+    index = SymptomIndex(database=object(), ivf_min_rows=0, probes=probes)
+    start = time.perf_counter()
+    index.build(ids, ids, ids, vectors)
+    build_s = time.perf_counter() - start
+
+    exact, exact_lat = timed_search(index, queries, k, exact=True)
+    approx, approx_lat = timed_search(index, queries, k, exact=False)
+    recall = np.mean([
+        len({m["symptom_id"] for m in a} & {m["symptom_id"] for m in e}) / k
+        for a, e in zip(approx, exact)
+    ])
+
+    return {
+        "rows": rows,
+        "k": k,
+        "probes": probes,
+        "ivf_lists": index._snapshot.ivf.n_lists,
+        "ivf_build_s": round(build_s, 3),
+        f"recall_at_{k}": round(float(recall), 4),
+        "exact_p50_ms": round(exact_lat[len(exact_lat) // 2] * 1000, 3),
+        "exact_p95_ms": round(exact_lat[int(len(exact_lat) * 0.95)] * 1000, 3),
+        "ivf_p50_ms": round(approx_lat[len(approx_lat) // 2] * 1000, 3),
+        "ivf_p95_ms": round(approx_lat[int(len(approx_lat) * 0.95)] * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default="1000,20000,200000")
+    parser.add_argument("--dims", type=int, default=768)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--probes", type=int, default=8)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    results = [run(int(r), args.dims, args.k, args.queries, args.probes, rng) for r in args.rows.split(",")]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for r in results:
+        print(", ".join(f"{key}={value}" for key, value in r.items()))
+
+
+if __name__ == "__main__":
+    main()
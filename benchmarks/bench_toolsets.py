@@ -0,0 +1,192 @@
+"""Tool-call latency of the native in-process toolset against the Toolbox HTTP hop.
+
+Both paths run the same stand-in for the Spanner query (a blocking call that takes
+--spanner-ms), so the difference is what the Toolbox service adds: the MCP handshake
+and manifest load, JSON-RPC over HTTP, and the network between Agent Engine and Cloud
+Run (--rtt-ms, added per request by the stand-in server; 0 measures loopback only) plus
+an optional --cold-start-ms on its first request.
+
+The Toolbox side is the real toolbox_core client talking to a local MCP server that
+serves the tools and parameters from Toolbox/tools.yaml. The native side goes through
+zooka_agent.tools._run_blocking, the executor the native tools use.
+
+    python benchmarks/bench_toolsets.py --calls 200 --spanner-ms 20 --rtt-ms 3
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+import yaml
+from aiohttp import web
+from toolbox_core import ToolboxClient
+from toolbox_core.protocol import Protocol
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Importing the agent would otherwise start warming up clients against the real services
+os.environ.setdefault("AGENT_STARTUP_MODE", "lazy")
+
+PROTOCOL = Protocol.MCP_v20250618
+TOOLSET = "my-toolset"
+# One call per Toolbox tool, as the model would fan them out in one response
+CALLS = {
+    "find-all-diseases-by-symptom": {"symptom": "chest pain on exertion relieved by rest"},
+    "search-diagnostic-by-disease": {"disease": "Stable Angina"},
+    "search-cure-by-disease": {"disease": "Stable Angina"},
+}
+
+
+def spanner_stand_in(spanner_ms, tool, args):
+    time.sleep(spanner_ms / 1000)
+    return [{"tool": tool, "args": args, "row": i} for i in range(5)]
+
+
+def load_tools_yaml():
+    with open(os.path.join(ROOT, "Toolbox", "tools.yaml")) as f:
+        config = yaml.safe_load(f)
+    return [{
+        "name": name,
+        "description": tool["description"],
+        "inputSchema": {
+            "type": "object",
+            "properties": {p["name"]: {"type": p["type"], "description": p["description"]} for p in tool["parameters"]},
+            "required": [p["name"] for p in tool["parameters"]],
+        },
+    } for name, tool in config["tools"].items() if name in config["toolsets"][TOOLSET]]
+
+
+class ToolboxStandIn:
+    """Minimal MCP server with Toolbox's tools, on its own thread and event loop."""
+
+    def __init__(self, spanner_ms, rtt_ms, cold_start_ms):
+        self.spanner_ms = spanner_ms
+        self.rtt_ms = rtt_ms
+        self.cold_start_ms = cold_start_ms
+        self.tools = load_tools_yaml()
+        self.port = None
+        self._cold = True
+
+    async def _wake(self):
+        if self._cold:
+            self._cold = False
+            await asyncio.sleep(self.cold_start_ms / 1000)
+        await asyncio.sleep(self.rtt_ms / 1000)
+
+    async def ping(self, request):
+        await self._wake()
+        return web.Response(text="Hello, World!")
+
+    async def handle(self, request):
+        await self._wake()
+        message = await request.json()
+        if "id" not in message:
+            return web.Response(status=202)
+
+        method = message["method"]
+        if method == "initialize":
+            result = {
+                "protocolVersion": message["params"]["protocolVersion"],
+                "capabilities": {"tools": {"listChanged": False}},
+                "serverInfo": {"name": "toolbox-stand-in", "version": "0.0.0"},
+            }
+        elif method == "tools/list":
+            result = {"tools": self.tools}
+        elif method == "tools/call":
+            params = message["params"]
+            rows = await asyncio.get_running_loop().run_in_executor(
+                None, spanner_stand_in, self.spanner_ms, params["name"], params["arguments"])
+            result = {"content": [{"type": "text", "text": json.dumps(row)} for row in rows]}
+        else:
+            return web.json_response({"jsonrpc": "2.0", "id": message["id"],
+                                      "error": {"code": -32601, "message": f"unknown method {method}"}})
+        return web.json_response({"jsonrpc": "2.0", "id": message["id"], "result": result})
+
+    def start(self):
+        ready = threading.Event()
+
+        async def serve():
+            app = web.Application()
+            app.router.add_get("/", self.ping)
+            app.router.add_post("/mcp/", self.handle)
+            app.router.add_post("/mcp/{toolset}", self.handle)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            self.port = site._server.sockets[0].getsockname()[1]
+            ready.set()
+            await asyncio.Event().wait()
+
+        threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+        ready.wait()
+        return f"http://127.0.0.1:{self.port}"
+
+
+def summarize(latencies):
+    latencies = sorted(latencies)
+    return {
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 2),
+    }
+
+
+async def measure(call_one, calls):
+    single, fanout = [], []
+    for i in range(calls):
+        name, args = list(CALLS.items())[i % len(CALLS)]
+        start = time.perf_counter()
+        await call_one(name, args)
+        single.append(time.perf_counter() - start)
+    for _ in range(calls // len(CALLS)):
+        start = time.perf_counter()
+        await asyncio.gather(*(call_one(name, args) for name, args in CALLS.items()))
+        fanout.append(time.perf_counter() - start)
+    return {"single_call": summarize(single), "three_concurrent_calls": summarize(fanout)}
+
+
+async def run_native(args):
+    from zooka_agent.tools import _run_blocking
+
+    async def call_one(name, tool_args):
+        return await _run_blocking(spanner_stand_in, args.spanner_ms, name, tool_args)
+    return {"toolset": "native", "setup_ms": 0.0, **await measure(call_one, args.calls)}
+
+
+async def run_toolbox(args, url):
+    start = time.perf_counter()
+    client = ToolboxClient(url, protocol=PROTOCOL)
+    tools = {tool.__name__: tool for tool in await client.load_toolset(TOOLSET)}
+    setup_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    async def call_one(name, tool_args):
+        return await tools[name](**tool_args)
+    try:
+        return {"toolset": "toolbox", "setup_ms": setup_ms, **await measure(call_one, args.calls)}
+    finally:
+        await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=150)
+    parser.add_argument("--spanner-ms", type=float, default=20, help="stand-in Spanner query time")
+    parser.add_argument("--rtt-ms", type=float, default=0, help="network round trip to the Toolbox service")
+    parser.add_argument("--cold-start-ms", type=float, default=0, help="Toolbox service cold start, first request only")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    url = ToolboxStandIn(args.spanner_ms, args.rtt_ms, args.cold_start_ms).start()
+    results = [asyncio.run(run_native(args)), asyncio.run(run_toolbox(args, url))]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for r in results:
+        print(", ".join(f"{key}={value}" for key, value in r.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""In-process stand-in for the `agent_engines` remote app used by Zooka_app/main.py.
+
+Timings are configurable so benchmarks can model a real Agent Engine turn without
+deploying anything. A new event loop pays `channel_setup` once, mirroring the
+HTTP/gRPC channels that the real remote app opens per loop. With `capacity` set, a turn
+that starts while that many are already running fails with RESOURCE_EXHAUSTED after its
+first model call, as when a burst exceeds the model's quota.
+"""
+import os
+import sys
+import time
+import uuid
+import asyncio
+import tempfile
+import threading
+import weakref
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Zooka_app")
+
+
+class FakeRemoteApp:
+
+    def __init__(self, chunks=5, first_chunk_delay=0.5, chunk_delay=0.05,
+                 channel_setup=0.2, call_latency=0.02, memory_latency=0.3, capacity=0):
+        self.chunks = chunks
+        self.first_chunk_delay = first_chunk_delay
+        self.chunk_delay = chunk_delay
+        self.channel_setup = channel_setup
+        self.call_latency = call_latency
+        self.memory_latency = memory_latency
+        self.capacity = capacity
+        self.reset()
+
+    def reset(self):
+        self.sessions = {}
+        self.memories = []
+        self.channels_opened = 0
+        self.streams = 0
+        self.max_streams = 0
+        self._channels = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    async def _call(self, latency):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            needs_channel = loop not in self._channels
+            if needs_channel:
+                self._channels[loop] = True
+                self.channels_opened += 1
+        if needs_channel:
+            await asyncio.sleep(self.channel_setup)
+        await asyncio.sleep(latency)
+
+    def _user_sessions(self, user_id):
+        with self._lock:
+            return self.sessions.setdefault(user_id, {})
+
+    async def async_list_sessions(self, user_id):
+        await self._call(self.call_latency)
+        return {'sessions': list(self._user_sessions(user_id).values())}
+
+    async def async_create_session(self, user_id):
+        await self._call(self.call_latency)
+        session = {'id': uuid.uuid4().hex, 'userId': user_id, 'lastUpdateTime': time.time(), 'events': []}
+        self._user_sessions(user_id)[session['id']] = session
+        return session
+
+    async def async_get_session(self, user_id, session_id):
+        await self._call(self.call_latency)
+        session = self._user_sessions(user_id).get(session_id)
+        if session is None:
+            raise LookupError(f"Session {session_id} not found")
+        return session
+
+    async def async_add_session_to_memory(self, session):
+        await self._call(self.memory_latency)
+        with self._lock:
+            self.memories.append(session['id'])
+
+    async def async_delete_session(self, user_id, session_id):
+        await self._call(self.call_latency)
+        self._user_sessions(user_id).pop(session_id, None)
+
+    async def async_stream_query(self, user_id, session_id, message, run_config=None):
+        invocation_id = f"e-{uuid.uuid4()}"
+        with self._lock:
+            self.streams += 1
+            self.max_streams = max(self.max_streams, self.streams)
+            over_quota = self.capacity and self.streams > self.capacity
+        try:
+            await self._call(self.first_chunk_delay)
+            if over_quota:
+                raise RuntimeError("429 RESOURCE_EXHAUSTED: quota exceeded for generate_content")
+            async for event in self._answer(invocation_id, message):
+                yield event
+        finally:
+            with self._lock:
+                self.streams -= 1
+
+    async def _answer(self, invocation_id, message):
+        yield {'author': 'root_agent', 'invocation_id': invocation_id, 'content': {'role': 'model', 'parts': [
+            {'function_call': {'name': 'find-all-diseases-by-symptom', 'args': {'symptom': message}}}]}}
+        yield {'author': 'root_agent', 'invocation_id': invocation_id, 'content': {'role': 'user', 'parts': [
+            {'function_response': {'name': 'find-all-diseases-by-symptom', 'response': {'result': []}}}]}}
+        for i in range(self.chunks):
+            if i:
+                await asyncio.sleep(self.chunk_delay)
+            yield {'author': 'root_agent', 'invocation_id': invocation_id,
+                   'content': {'role': 'model', 'parts': [{'text': f"chunk {i} "}]}}
+        # What zooka_agent/telemetry.py's after_agent_callback reports at the end of a turn
+        yield {'author': 'root_agent', 'invocation_id': invocation_id, 'actions': {'state_delta': {
+            'zooka_turn_timings': {
+                'model': [{'model': 'fake', 'seconds': self.first_chunk_delay, 'prompt_tokens': 100, 'output_tokens': 20}],
+                'tools': [{'name': 'find-all-diseases-by-symptom', 'seconds': 0.01}],
+                'memory_preload': [0.01],
+                'route': {'route': 'diagnostic', 'seconds': 0.2},
+            }}}}
+
+
+class FakeDatabase:
+    """Stands in for Zooka_app/database.Database with an in-memory users table."""
+
+    def __init__(self, query_latency=0.005):
+        self.query_latency = query_latency
+        self.ready = False
+        self.users = {}
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        self.ready = True
+        return True
+
+    def start_warm_up(self):
+        self.warm_up()
+
+    def user_exists(self, username):
+        time.sleep(self.query_latency)
+        return username in self.users
+
+    def password_hash(self, username):
+        time.sleep(self.query_latency)
+        return self.users.get(username)
+
+    def insert_user(self, username, password_hash):
+        time.sleep(self.query_latency)
+        with self._lock:
+            self.users[username] = password_hash
+
+    def summary(self):
+        return {"ready": self.ready, "users": len(self.users)}
+
+
+def load_app(fake, database=None):
+    """Imports Zooka_app/main.py with `agent_engines.get` returning `fake`, a fake users table
+    and a throwaway cleanup queue."""
+    import vertexai
+    from vertexai import agent_engines
+
+    vertexai.init = lambda **kwargs: None
+    agent_engines.get = lambda resource_name: fake
+    # A fresh cleanup queue, so jobs left by an earlier run don't hit this fake
+    os.environ.setdefault("CLEANUP_QUEUE_PATH", os.path.join(tempfile.mkdtemp(prefix="zooka-"), "cleanup-queue.sqlite3"))
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
+
+    import database as app_database
+    database = database or FakeDatabase()
+    app_database.Database = lambda: database
+
+    import main
+    main.remote_app = fake
+    return main
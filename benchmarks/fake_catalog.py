@@ -0,0 +1,229 @@
+"""In-memory stand-in for the Spanner database behind the catalog.
+
+CatalogDatabase keeps the catalog tables in memory and answers the statements the
+setup path and the agent's native tools run against them: Data/loader.py's keyed reads and
+batched writes, Data/embeddings.py's refresh with EMBEDDING_SOURCE=fake, and the catalog
+queries of zooka_agent/graph_cache.py and symptom_index.py. Every query takes `query_ms`
+and every commit `commit_ms`, and both are counted, so benchmarks run the real code paths
+against real or generated catalog content without a database.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime, timezone
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "Data"))
+sys.path.insert(0, ROOT)
+CATALOG_PATH = os.path.join(ROOT, "Data", "data.json")
+
+from loader import TABLES, CatalogLoader
+import embeddings as catalog_embeddings
+
+EMBEDDING_COLUMNS = ("Embedding", "EmbeddingHash", "EmbeddingModel", "EmbeddingUpdatedAt")
+COLUMNS = {table: columns + (EMBEDDING_COLUMNS if table == "symptom" else ())
+           for table, (_, columns) in TABLES.items()}
+
+
+def fake_embeddings(texts):
+    """Same contract as zooka_agent.embeddings.embed_texts, with Data/embeddings.py's fake vectors."""
+    return [catalog_embeddings.fake_embedding(text) for text in texts]
+
+
+def load_catalog(path=CATALOG_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+def content_hash(name, details):
+    # TO_HEX(SHA256(COALESCE(Name, '') || ' ' || COALESCE(Details, '')))
+    return hashlib.sha256(f"{name or ''} {details or ''}".encode()).hexdigest()
+
+
+class _Batch:
+
+    def __init__(self, database):
+        self._database = database
+        self._mutations = []
+
+    def insert_or_update(self, table, columns, values):
+        self._mutations.append(("upsert", table, columns, list(values)))
+
+    def update(self, table, columns, values):
+        self._mutations.append(("update", table, columns, list(values)))
+
+    def delete(self, table, keyset):
+        self._mutations.append(("delete", table, None, [tuple(key) for key in keyset.keys]))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self._database._commit(self._mutations)
+        return False
+
+
+class CatalogDatabase:
+    """The catalog tables in memory; `entries`, if given, are loaded and embedded up front."""
+
+    def __init__(self, entries=(), query_ms=0.0, commit_ms=0.0):
+        self.query_ms = query_ms
+        self.commit_ms = commit_ms
+        self.tables = {table: {} for table in TABLES}
+        self.version = 1
+        self.queries = Counter()
+        self.commits = 0
+        self.mutations = 0
+        self._lock = threading.Lock()
+
+        from zooka_agent import graph_cache, symptom_index
+
+        self._statements = {
+            f"SELECT {', '.join(columns)} FROM {table}": self._select(table, columns)
+            for table, table_columns in TABLES.items() for columns in table_columns
+        }
+        self._statements.update({
+            graph_cache.VERSION_SQL: lambda params: [(self.version,)],
+            graph_cache.DISEASES_SQL: self._select("disease", ("ID", "Name", "Description")),
+            graph_cache.DIAGNOSTICS_SQL: self._diagnostics,
+            graph_cache.TREATMENTS_SQL: self._treatments,
+            graph_cache.INDICATIONS_SQL: self._select("indicate", ("SymptomID", "DiseaseID", "Confidence")),
+            graph_cache.SYMPTOMS_SQL: self._select("symptom", ("ID", "Name")),
+            symptom_index.LOAD_SQL: self._embedded,
+            symptom_index.REFRESH_SQL: self._embedded,
+            symptom_index.IDS_SQL: lambda params: [(row[0],) for row in self._embedded(params)],
+            symptom_index.COUNT_SQL: lambda params: [(len(self._embedded(params)),)],
+            catalog_embeddings.STALE_ROWS_SQL: self._stale,
+            catalog_embeddings.CONTENT_CHUNK_SQL: self._contents,
+        })
+
+        if entries:
+            for table, rows in CatalogLoader(None)._rows(entries).items():
+                self._write(table, TABLES[table][1], rows.values())
+            self.embed_all()
+
+    def __len__(self):
+        return sum(len(rows) for rows in self.tables.values())
+
+    def snapshot(self, **kwargs):
+        return self
+
+    def batch(self):
+        return _Batch(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_sql(self, sql, params=None, param_types=None, **kwargs):
+        if sql not in self._statements:
+            raise NotImplementedError(f"CatalogDatabase can't answer: {' '.join(sql.split())[:80]}")
+        with self._lock:
+            self.queries[sql] += 1
+        time.sleep(self.query_ms / 1000)
+        return iter(self._statements[sql](params or {}))
+
+    def read(self, table, columns, keyset, **kwargs):
+        with self._lock:
+            self.queries[f"READ {table}"] += 1
+        time.sleep(self.query_ms / 1000)
+        positions = [COLUMNS[table].index(column) for column in columns]
+        rows = (self.tables[table].get(tuple(key)) for key in keyset.keys)
+        return iter([tuple(row[p] for p in positions) for row in rows if row is not None])
+
+    @property
+    def total_queries(self):
+        return sum(self.queries.values())
+
+    def embed_all(self, model_version=catalog_embeddings.FAKE_MODEL_VERSION):
+        """Gives every symptom its fake embedding, as update_embeddings with EMBEDDING_SOURCE=fake would."""
+        rows = [(symptom_id, catalog_embeddings.fake_embedding(f"{name or ''} {details or ''}"),
+                 content_hash(name, details), model_version, None)
+                for symptom_id, name, details, *_ in self.tables["symptom"].values()]
+        self._write("symptom", ("ID", *EMBEDDING_COLUMNS), rows)
+
+    # Writes
+
+    def _commit(self, mutations):
+        time.sleep(self.commit_ms / 1000)
+        with self._lock:
+            stamp = datetime.now(timezone.utc)
+            for kind, table, columns, values in mutations:
+                if kind == "delete":
+                    for key in values:
+                        self.tables[table].pop(key, None)
+                else:
+                    values = [tuple(stamp if v is catalog_embeddings.spanner.COMMIT_TIMESTAMP else v for v in row)
+                              for row in values]
+                    self._write(table, columns, values, insert=kind == "upsert")
+                self.mutations += len(values) * len(columns or TABLES[table][0])
+            self.commits += 1
+
+    def _write(self, table, columns, values, insert=True):
+        all_columns = COLUMNS[table]
+        positions = [all_columns.index(column) for column in columns]
+        key_positions = [columns.index(column) for column in TABLES[table][0]]
+        rows = self.tables[table]
+        for value in values:
+            key = tuple(value[p] for p in key_positions)
+            row = rows.get(key)
+            if row is None:
+                if not insert:
+                    raise KeyError(f"{table} row {key} doesn't exist")
+                row = [None] * len(all_columns)
+            else:
+                row = list(row)
+            for position, v in zip(positions, value):
+                row[position] = v
+            rows[key] = tuple(row)
+
+    # Reads
+
+    def _select(self, table, columns):
+        positions = [COLUMNS[table].index(column) for column in columns]
+        return lambda params: [tuple(row[p] for p in positions) for row in self.tables[table].values()]
+
+    def _diagnostics(self, params):
+        diagnostics = self.tables["diagnostic"]
+        return [(disease_id, *diagnostics[(diagnostic_id,)][1:], is_gold)
+                for disease_id, diagnostic_id, is_gold in self.tables["verify"].values()]
+
+    def _treatments(self, params):
+        treatments = self.tables["treatment"]
+        return [(disease_id, *treatments[(treatment_id,)][1:], treatment_type, confidence)
+                for disease_id, treatment_id, treatment_type, confidence in self.tables["cure"].values()]
+
+    def _embedded(self, params):
+        since = params.get("since")
+        return [(symptom_id, name, details, embedding, updated_at)
+                for symptom_id, name, details, embedding, _, _, updated_at in self.tables["symptom"].values()
+                if embedding is not None and (since is None or (updated_at is not None and updated_at > since))]
+
+    def _stale(self, params):
+        return sorted(
+            (symptom_id,) for symptom_id, name, details, embedding, digest, model, _ in self.tables["symptom"].values()
+            if embedding is None or digest != content_hash(name, details) or model != params["model"]
+        )
+
+    def _contents(self, params):
+        symptoms = self.tables["symptom"]
+        rows = (symptoms.get((symptom_id,)) for symptom_id in params["ids"])
+        return [(row[0], f"{row[1] or ''} {row[2] or ''}", content_hash(row[1], row[2])) for row in rows if row]
+
+
+def install(database, embed=fake_embeddings):
+    """Points the agent's graph cache, symptom index and query embeddings at the stand-ins."""
+    from zooka_agent import tools, graph_cache, symptom_index
+
+    graph_cache.get_graph_cache()._database = database
+    graph_cache.get_graph_cache()._embed = embed
+    symptom_index._symptom_index._database = database
+    tools.embed_texts = embed
+    tools.embed_text = lambda text: embed([text])[0]
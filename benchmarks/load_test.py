@@ -0,0 +1,210 @@
+"""End-to-end load test of Zooka_app/main.py against in-process fakes.
+
+Serves the real Flask app on a local threaded server, with the fake agent engine and
+the in-memory users table from fake_agent_engine.py, and drives virtual users through
+signup -> login -> N asks -> end_session at a fixed concurrency. Reports p50/p95/p99
+latency, time to first byte and throughput per route, how long the cleanup queue took
+to store the ended sessions after the last request, and can fail on regressions
+against a previous JSON result:
+
+    python benchmarks/load_test.py --users 200 --concurrency 50 --asks 3 --output results.json
+    python benchmarks/load_test.py --users 200 --concurrency 50 --asks 3 --baseline results.json
+
+Like chat.js, a user told 429 waits for the Retry-After and asks again (up to
+--busy-retries times); refused attempts are counted as `rejected`, not errors, and the
+latency of a question that was retried runs from its first attempt. A stream that ends
+in an error event counts as an error. --agent-capacity makes the fake agent fail turns
+past that many at once, so a burst above the
+app's stream cap (AGENT_MAX_STREAMS) shows what admission control does to the tail;
+--burst logs every user in first and then sends all their questions at once:
+
+    AGENT_MAX_STREAMS=25 python benchmarks/load_test.py --users 200 --burst --agent-capacity 25
+"""
+import sys
+import json
+import time
+import argparse
+import threading
+import http.client
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.serving import make_server
+
+from fake_agent_engine import FakeRemoteApp, FakeDatabase, load_app
+
+# Lower is better for every latency metric; throughput is compared the other way round
+REGRESSION_METRICS = ("p95_s", "p99_s", "ttfb_p95_s")
+
+
+class Recorder:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.rejected = {}
+
+    def add(self, route, latency, ttfb, ok):
+        with self._lock:
+            self.samples.setdefault(route, []).append((latency, ttfb, ok))
+
+    def reject(self, route):
+        with self._lock:
+            self.rejected[route] = self.rejected.get(route, 0) + 1
+
+    def report(self, elapsed):
+        def pct(values, p):
+            return round(values[min(len(values) - 1, int(len(values) * p))], 4) if values else None
+
+        routes = {}
+        for route, samples in sorted(self.samples.items()):
+            latencies = sorted(s[0] for s in samples)
+            ttfbs = sorted(s[1] for s in samples)
+            routes[route] = {
+                "count": len(samples),
+                "errors": sum(1 for s in samples if not s[2]),
+                "rejected": self.rejected.get(route, 0),
+                "throughput_rps": round(len(samples) / elapsed, 2),
+                "p50_s": pct(latencies, 0.50),
+                "p95_s": pct(latencies, 0.95),
+                "p99_s": pct(latencies, 0.99),
+                "ttfb_p50_s": pct(ttfbs, 0.50),
+                "ttfb_p95_s": pct(ttfbs, 0.95),
+                "ttfb_p99_s": pct(ttfbs, 0.99),
+            }
+        return routes
+
+
+class VirtualUser:
+    """One browser: keeps the Flask session cookie and times every request."""
+
+    def __init__(self, port, recorder, name, busy_retries=3):
+        self.port = port
+        self.recorder = recorder
+        self.name = name
+        self.busy_retries = busy_retries
+        self.cookie = None
+
+    def request(self, route, path, body=None, content_type=None, ok_status=(200,)):
+        headers = {"Content-Type": content_type} if content_type else {}
+        start = time.perf_counter()
+        for attempt in range(self.busy_retries + 1):
+            if self.cookie:
+                headers["Cookie"] = self.cookie
+            conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=120)
+            conn.request("POST", path, body=body, headers=headers)
+            response = conn.getresponse()
+            first = response.read(1)
+            ttfb = time.perf_counter() - start
+            content = first + response.read()
+            latency = time.perf_counter() - start
+            conn.close()
+
+            cookie = response.getheader("Set-Cookie")
+            if cookie:
+                self.cookie = cookie.split(";", 1)[0]
+            if response.status != 429 or attempt == self.busy_retries:
+                break
+            self.recorder.reject(route)
+            time.sleep(int(response.getheader("Retry-After") or 1))
+        ok = response.status in ok_status and b'"type": "error"' not in content
+        self.recorder.add(route, latency, ttfb, ok)
+        return response
+
+    def form(self, route, **fields):
+        # A successful login or signup redirects
+        return self.request(route, "/auth", urlencode(fields), "application/x-www-form-urlencoded", (200, 302))
+
+    def run(self, asks, ask_path, burst=None):
+        password = "load-test"
+        self.form("POST /auth signup", action="signup", username=self.name,
+                  password=password, confirm_password=password)
+        self.form("POST /auth login", action="login", username=self.name, password=password)
+        if burst is not None:
+            burst.wait()
+        for i in range(asks):
+            self.request(f"POST {ask_path}", ask_path, json.dumps({"message": f"chest pain {i}"}), "application/json")
+        self.request("POST /api/end_session", "/api/end_session")
+
+
+def compare(results, baseline, max_regression):
+    """Returns a list of metrics that got worse than the baseline by more than max_regression."""
+    regressions = []
+    for route, metrics in results["routes"].items():
+        before = baseline.get("routes", {}).get(route)
+        if not before:
+            continue
+        for metric in REGRESSION_METRICS:
+            if before.get(metric) and metrics.get(metric) and metrics[metric] > before[metric] * (1 + max_regression):
+                regressions.append(f"{route} {metric}: {before[metric]} -> {metrics[metric]}")
+        if before.get("throughput_rps") and metrics["throughput_rps"] < before["throughput_rps"] * (1 - max_regression):
+            regressions.append(f"{route} throughput_rps: {before['throughput_rps']} -> {metrics['throughput_rps']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100, help="virtual users, each runs the full flow once")
+    parser.add_argument("--concurrency", type=int, default=25)
+    parser.add_argument("--asks", type=int, default=3, help="questions per user")
+    parser.add_argument("--ask-path", default="/api/ask/stream", choices=["/api/ask/stream", "/api/ask"])
+    parser.add_argument("--chunks", type=int, default=5)
+    parser.add_argument("--first-chunk-delay", type=float, default=0.5)
+    parser.add_argument("--chunk-delay", type=float, default=0.05)
+    parser.add_argument("--memory-latency", type=float, default=0.3)
+    parser.add_argument("--agent-capacity", type=int, default=0,
+                        help="concurrent turns the fake agent serves at full speed (0 = unlimited)")
+    parser.add_argument("--burst", action="store_true",
+                        help="log all users in, then ask at once (concurrency = users)")
+    parser.add_argument("--busy-retries", type=int, default=3, help="times a user asks again after a 429")
+    parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    parser.add_argument("--baseline", help="previous results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed relative slowdown (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    fake = FakeRemoteApp(chunks=args.chunks, first_chunk_delay=args.first_chunk_delay,
+                         chunk_delay=args.chunk_delay, memory_latency=args.memory_latency,
+                         capacity=args.agent_capacity)
+    app_module = load_app(fake, FakeDatabase())
+
+    server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    recorder = Recorder()
+    users = [VirtualUser(server.server_port, recorder, f"load-user-{i}", args.busy_retries) for i in range(args.users)]
+    burst = threading.Barrier(args.users) if args.burst else None
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users if args.burst else args.concurrency) as pool:
+        list(pool.map(lambda user: user.run(args.asks, args.ask_path, burst), users))
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    drain_start = time.perf_counter()
+    while True:
+        queue = app_module.cleanup_jobs.summary()
+        if not queue["pending"] and not queue["running"] or time.perf_counter() - drain_start > 120:
+            break
+        time.sleep(0.05)
+
+    results = {
+        "config": vars(args),
+        "elapsed_s": round(elapsed, 3),
+        "routes": recorder.report(elapsed),
+        "agent": {"max_concurrent_turns": fake.max_streams},
+        "cleanup": {"drain_s": round(time.perf_counter() - drain_start, 3), "stored": len(fake.memories), **queue},
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        if regressions:
+            print("Performance regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Importing the package defines the agent; don't let it warm up against real services
+os.environ.setdefault("AGENT_STARTUP_MODE", "lazy")
+
+from zooka_agent.coalescing import QueryCoalescer
+
+
+def test_cancelled_waiter_leaves_leader_and_other_waiters_their_result():
+    async def scenario():
+        coalescer = QueryCoalescer(window=0)
+        release = asyncio.Event()
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return {"diseases": ["Unstable Angina"]}
+
+        leader = asyncio.create_task(coalescer.run("tool", {"symptom": "chest pain"}, call))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(coalescer.run("tool", {"symptom": "chest pain"}, call)) for _ in range(3)]
+        await asyncio.sleep(0)
+        waiters[0].cancel()
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(leader, *waiters[1:])
+        assert waiters[0].cancelled()
+        return calls, results, coalescer.stats()
+
+    calls, results, stats = asyncio.run(scenario())
+    assert calls == 1
+    assert results == [{"diseases": ["Unstable Angina"]}] * 3
+    assert stats["executed"] == 1 and stats["coalesced"] == 3 and stats["in_flight"] == 0
+
+
+def test_cancelled_leader_lets_waiters_run_the_tool():
+    async def scenario():
+        coalescer = QueryCoalescer(window=0)
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        leader = asyncio.create_task(coalescer.run("tool", {}, call))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(coalescer.run("tool", {}, call))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await waiter, leader.cancelled()
+
+    assert asyncio.run(scenario()) == (2, True)
@@ -0,0 +1,78 @@
+import os
+import sys
+import json
+import asyncio
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Importing the package defines the agent; don't let it warm up against real services
+os.environ.setdefault("AGENT_STARTUP_MODE", "lazy")
+
+from google.genai import types
+from google.adk.models.llm_request import LlmRequest
+from zooka_agent.compaction import ConversationCompactor, turn_starts, TOOL_OUTPUT_MAX_CHARS
+from zooka_agent.session_memory import MEMORY_CONTEXT
+
+OMITTED = "Omitted to save space; see the conversation summary."
+
+
+def user(text):
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+def call(name, **args):
+    return types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(name=name, args=args))])
+
+
+def response(name, payload):
+    return types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(name=name, response=payload))])
+
+
+def big_response(name, disease):
+    return response(name, {"disease": disease, "diagnostics": [{"details": "x" * TOOL_OUTPUT_MAX_CHARS}]})
+
+
+def tool_continuation(memory):
+    """Three turns, the last one waiting on the model after its tool call."""
+    contents = [
+        user("I have chest pain when climbing stairs"),
+        call("search_diagnostic_by_disease", disease="Stable Angina"),
+        big_response("search_diagnostic_by_disease", "Stable Angina"),
+        user("What about unstable angina?"),
+        call("search_diagnostic_by_disease", disease="Unstable Angina"),
+        big_response("search_diagnostic_by_disease", "Unstable Angina"),
+        user("And pericarditis?"),
+        call("search_diagnostic_by_disease", disease="Acute Pericarditis"),
+        big_response("search_diagnostic_by_disease", "Acute Pericarditis"),
+    ]
+    if memory:
+        # What SessionMemoryTool appends to every model request of a turn
+        contents.append(user(MEMORY_CONTEXT.format(memories="user: I had a stent in 2019")))
+    return contents
+
+
+def compact(contents):
+    compactor = ConversationCompactor(token_budget=100, keep_turns=2, summarizer="extract")
+    request = LlmRequest(contents=contents, config=types.GenerateContentConfig())
+    context = SimpleNamespace(state={})
+    asyncio.run(compactor.before_model_callback(context, request))
+    return request.contents
+
+
+def responses(contents):
+    return [part.function_response.response for content in contents for part in content.parts or []
+            if part.function_response]
+
+
+def test_preloaded_memories_are_not_a_turn():
+    assert turn_starts(tool_continuation(memory=True)) == turn_starts(tool_continuation(memory=False)) == [0, 3, 6]
+
+
+def test_tool_continuation_keeps_the_current_turns_tool_output_with_memory_present():
+    for memory in (False, True):
+        kept = responses(compact(tool_continuation(memory)))
+        # The first turn is folded into the summary, the second one's output trimmed,
+        # and the current turn's output is sent whole
+        assert kept[0] == {"result": OMITTED}
+        assert kept[-1]["disease"] == "Acute Pericarditis"
+        assert json.dumps(kept[-1]).count("x") >= TOOL_OUTPUT_MAX_CHARS
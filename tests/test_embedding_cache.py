@@ -0,0 +1,50 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "Zooka_app"))
+# Importing the package defines the agent; don't let it warm up against real services
+os.environ.setdefault("AGENT_STARTUP_MODE", "lazy")
+
+from prometheus_client import REGISTRY
+from zooka_agent.embedding_cache import EmbeddingCache
+import metrics
+
+
+def lookups(result):
+    return REGISTRY.get_sample_value("zooka_agent_embedding_cache_lookups_total", {"result": result}) or 0.0
+
+
+def test_counters_move_on_a_miss_and_on_a_hit():
+    cache = EmbeddingCache(path=None)
+    assert cache.get("Chest pain on exertion") is None
+    assert (cache.hits, cache.misses) == (0, 1)
+    cache.put("Chest pain on exertion", [0.1, 0.2])
+    assert cache.get("chest pain on exertion.") == [0.1, 0.2]
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.stats()["hit_ratio"] == 0.5
+
+
+def test_persistent_hits_are_counted_separately(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    EmbeddingCache(path=path).put("palpitations", [1.0])
+    cache = EmbeddingCache(path=path)
+    assert cache.get("palpitations") == [1.0]
+    assert cache.get("palpitations") == [1.0]
+    assert (cache.hits, cache.persistent_hits, cache.misses) == (2, 1, 0)
+
+
+def test_counts_reach_the_frontend_metrics_once():
+    cache = EmbeddingCache(path=None)
+    cache.get("fatigue")
+    cache.put("fatigue", [1.0])
+    cache.get("fatigue")
+    cache.get("fatigue")
+    counts = cache.take_counts()
+    assert counts == {"hit": 2, "miss": 1}
+    assert cache.take_counts() == {}
+
+    before = lookups("hit"), lookups("miss")
+    metrics.record_agent_timings({"embedding_cache": counts})
+    assert (lookups("hit"), lookups("miss")) == (before[0] + 2, before[1] + 1)
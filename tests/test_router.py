@@ -0,0 +1,49 @@
+import os
+import sys
+import asyncio
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Importing the package defines the agent; don't let it warm up against real services
+os.environ.setdefault("AGENT_STARTUP_MODE", "lazy")
+
+from google.genai import types
+from google.adk.models.llm_request import LlmRequest
+from zooka_agent import telemetry
+from zooka_agent.router import TurnRouter
+from zooka_agent.session_memory import MEMORY_CONTEXT
+
+
+class CountingRouter(TurnRouter):
+
+    def __init__(self):
+        super().__init__(enabled=True)
+        self.classified = 0
+
+    async def classify(self, contents):
+        self.classified += 1
+        return "diagnostic", ""
+
+
+def test_triages_once_per_turn_even_with_memory_after_a_tool_response(monkeypatch):
+    monkeypatch.setattr(telemetry, "record_route", lambda *args: None)
+    memory = types.Content(role="user", parts=[types.Part(text=MEMORY_CONTEXT.format(memories="user: hi"))])
+    first = [types.Content(role="user", parts=[types.Part(text="I have chest pain")]), memory]
+    after_tool = first[:1] + [
+        types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(name="rank_diseases_by_symptoms"))]),
+        types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(
+            name="rank_diseases_by_symptoms", response={"diseases": []}))]),
+        memory,
+    ]
+    router = CountingRouter()
+    state = {}
+
+    async def turn(invocation_id):
+        context = SimpleNamespace(state=state, invocation_id=invocation_id)
+        for contents in (first, after_tool):
+            assert await router.before_model_callback(context, LlmRequest(contents=contents)) is None
+
+    asyncio.run(turn("e-1"))
+    assert router.classified == 1
+    asyncio.run(turn("e-2"))
+    assert router.classified == 2
@@ -0,0 +1,32 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+sys.path.insert(0, ROOT)
+# Importing the package defines the agent; don't let it warm up against real services
+os.environ.setdefault("AGENT_STARTUP_MODE", "lazy")
+
+from fake_catalog import CatalogDatabase, load_catalog
+from zooka_agent.symptom_index import SymptomIndex, IDS_SQL
+
+
+def test_refresh_lists_ids_only_when_rows_may_have_been_deleted():
+    database = CatalogDatabase(load_catalog()[:5])
+    index = SymptomIndex(database)
+    index.load()
+
+    index.refresh()
+    assert database.queries[IDS_SQL] == 0
+
+    deleted = next(iter(database.tables["symptom"]))
+    database._commit([("delete", "symptom", None, [deleted])])
+    assert index.refresh() == 1
+    assert deleted[0] not in index._snapshot.ids
+    assert database.queries[IDS_SQL] == 1
+
+    database.version += 1
+    index.refresh()
+    assert database.queries[IDS_SQL] == 2
+    index.refresh()
+    assert database.queries[IDS_SQL] == 2
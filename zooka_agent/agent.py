@@ -1,12 +1,40 @@
-from google import adk
 from google.adk.agents.llm_agent import Agent
-from google.adk.tools.toolbox_toolset import ToolboxToolset
 from google.adk.tools.google_search_tool import GoogleSearchTool
-from google.adk.tools.preload_memory_tool import PreloadMemoryTool
 from functools import cached_property
 import os
 from google.adk.models import Gemini
-from google.genai import Client, types
+from google.genai import Client
+from .tools import (
+    find_all_diseases_by_symptom,
+    get_disease_dossier,
+    rank_diseases_by_symptoms,
+    search_cure_by_disease,
+    search_diagnostic_by_disease,
+    warm_up,
+)
+from .genai_client import http_options
+from .coalescing import CoalescingToolset
+from . import compaction, dossier, router, session_memory, startup, telemetry
+
+# "toolbox" calls the Toolbox service (Toolbox/tools.yaml) over HTTP like the original
+# deployment; "native" opts in to running the catalog tools in this process
+AGENT_TOOLSET = os.getenv("AGENT_TOOLSET", "toolbox")
+TOOLBOX_URL = os.getenv("TOOLBOX_URL", "PHTB")
+
+# How the prompt tells the model to look symptoms up with each toolset
+SYMPTOM_LOOKUP = {
+    "native": """call
+rank_diseases_by_symptoms ONCE with the complete list of symptoms. It returns the possible diseases already ranked by how many symptoms
+indicate them and by their aggregated degree of confidence. Only use find_all_diseases_by_symptom to look up a single symptom the user adds later.""",
+    "toolbox": """for each symptom
+find all possible diseases with degree of confidence. """,
+}
+
+# Tool returning a disease's diagnostics and treatments together, with each toolset
+DOSSIER_TOOL = {"native": "get_disease_dossier", "toolbox": "get-disease-dossier"}
+
+if AGENT_TOOLSET not in SYMPTOM_LOOKUP:
+    raise ValueError(f"AGENT_TOOLSET must be one of {', '.join(sorted(SYMPTOM_LOOKUP))}, got {AGENT_TOOLSET!r}")
 
 class Gemini3(Gemini):
 
@@ -21,7 +49,7 @@ class Gemini3(Gemini):
             vertexai=True,
             project=project,
             location=location,
-            http_options=types.HttpOptions(
+            http_options=http_options(
                 headers=self._tracking_headers(),
                 retry_options=self.retry_options,
             )
@@ -37,23 +65,42 @@ IMPORTANT BEHAVIOR RULES:
 - Ask clarifying questions when user requests are unclear
 - Keep responses concise but informative
 - If the user tried to make jokes like "my heart hurts because I am in love, then say "that's a funny joke, please provide real symptoms"
-- ***** IMPORTANT ***** If the user asked if you know or remember something from a previous conversation, use your tool PreloadMemoryTool() to check your memory about the user's history or preferences
+- ***** IMPORTANT ***** If the user asked if you know or remember something from a previous conversation, check the PAST_CONVERSATIONS context for the user's history or preferences
 
 You start by greeting the user and ask about their symptoms. Ask them to be as detailed as possible, including when the symptoms occur, and what makes them feel better or worse.
 If the user asked or texted about something else then politely remind
 the user that you can only help with diagnosing and curing heart diseases. Extract all the symptoms and the associated details or
-conditions for each symptom from the user's response then concatenate the details and the condition with the symptom and for each symptom
-find all possible diseases with degree of confidence. 
+conditions for each symptom from the user's response then concatenate the details and the condition with the symptom and {symptom_lookup}
 Find the top 1 or 2 diseases based on diseases that could be indicated by as many symptoms as possible and based on the degree of confidence. 
 After you compile the list present the diseases and the degree of confidence to the user and ask whether they want to know the diagnostic procedure
-to verify a specific disease. If the user provides a disease name then find all diagnostic procedures related to this disease and present them to the user 
+to verify a specific disease. If the user provides a disease name then call {dossier_tool} ONCE for this disease; it returns the diagnostic procedures
+and the treatments together and they stay available for the rest of the conversation. If a tool returns did_you_mean instead
+of a matched disease, ask the user which of those diseases they mean before going on. Present the diagnostic procedures to the user
 and ask the user to provide the diagnostic results once they have them ready. Use your Google Search tool to confirm or refute the disease. Tell the user 
 whether the diagnostic confirms or refutes the disease and display the reason behind your decision. If the disease is refuted then exclude this disease and 
 show the customer the next top 1-2 diseases based on the symptoms and the degree of confidence. If a disease is confirmed ask the user if they want to see 
-the list of treatments. Find all  treatments of this disease and display them to the user.
-After providing the treatments to the user, ALWAYS remind them that you are not a real doctor and that they should verify the results with an actual doctor"""
+the list of treatments. Take the treatments of this disease from its dossier, only looking them up if you have none, and display them to the user.
+After providing the treatments to the user, ALWAYS remind them that you are not a real doctor and that they should verify the results with an actual doctor""".format(
+    symptom_lookup=SYMPTOM_LOOKUP[AGENT_TOOLSET], dossier_tool=DOSSIER_TOOL[AGENT_TOOLSET])
 
-toolset = ToolboxToolset("PHTB","my-toolset")
+# Identical Toolbox calls running at the same time share one Toolbox call (see coalescing.py);
+# the native tools do the same in tools.py
+if AGENT_TOOLSET == "toolbox":
+    # Declares the tools from the shipped tool_manifest.json instead of asking Toolbox, in
+    # both start-up modes; warm mode also wakes the Toolbox service up
+    from .tool_manifest import ManifestToolset
+    manifest_toolset = ManifestToolset(TOOLBOX_URL,"my-toolset")
+    toolset = [CoalescingToolset(manifest_toolset)]
+else:
+    # All catalog lookups run in-process: symptom search against the symptom vector index,
+    # graph lookups against the in-memory HeartDiseaseGraph snapshot (see tools.py).
+    toolset = [
+        rank_diseases_by_symptoms,
+        find_all_diseases_by_symptom,
+        get_disease_dossier,
+        search_diagnostic_by_disease,
+        search_cure_by_disease,
+    ]
 GEMINI_MODEL="PHGM"
 
 root_agent = Agent(
@@ -61,9 +108,33 @@ root_agent = Agent(
     name='root_agent',
     description='A helpful assistant for user questions.',
     instruction=prompt_root,
-    tools=[toolset,GoogleSearchTool(bypass_multi_tools_limit=True),PreloadMemoryTool()],
+    tools=[*toolset,GoogleSearchTool(bypass_multi_tools_limit=True),session_memory.SessionMemoryTool()],
+    # The first model call waits for the start-up warm-up. The router answers greetings,
+    # off-topic messages and clarifications with the fast model and skips the rest.
+    # Compaction runs before the timer, so the model timer and token counts reflect the
+    # compacted request. Disease dossiers fetched earlier in the session are added after
+    # compaction. Per-turn latency and token counts are reported back to the frontend's
+    # /metrics.
+    before_model_callback=[
+        startup.before_model_callback,
+        session_memory.before_model_callback,
+        router.get_router().before_model_callback,
+        compaction.get_compactor().before_model_callback,
+        dossier.before_model_callback,
+        telemetry.before_model_callback,
+    ],
+    after_model_callback=telemetry.after_model_callback,
+    on_model_error_callback=telemetry.on_model_error_callback,
+    before_tool_callback=telemetry.before_tool_callback,
+    after_tool_callback=[telemetry.after_tool_callback, dossier.after_tool_callback],
+    on_tool_error_callback=telemetry.on_tool_error_callback,
+    after_agent_callback=telemetry.after_agent_callback,
 )
 
 from google.adk.apps.app import App
 
 app = App(root_agent=root_agent, name="zooka_agent")
+
+if startup.STARTUP_MODE == "warm":
+    # The Toolbox service is woken up; the native tools open Spanner and load their caches
+    startup.start(root_agent, catalog=manifest_toolset.warm_up if AGENT_TOOLSET == "toolbox" else warm_up)
@@ -0,0 +1,191 @@
+"""Coalesces identical catalog tool calls made at the same time by different sessions.
+
+At peak many sessions ask about the same few diseases and symptoms at once, and each
+call would otherwise send its own query to Spanner (or Toolbox). Calls are keyed on the
+tool name and their normalized arguments: the first one runs, identical calls arriving
+while it runs wait for it and get a copy of its result, and for WINDOW_SECONDS after it
+finished identical calls are answered from that result. Failures are shared with the
+calls already waiting but never kept in the window.
+
+The native tools coalesce in tools.py; Toolbox tools are wrapped by CoalescingToolset.
+Callers may run on different event loops, so calls wait on concurrent.futures futures.
+"""
+import os
+import copy
+import json
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import Future
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.base_toolset import BaseToolset
+
+ENABLED = os.getenv("TOOL_COALESCING", "1") == "1"
+# How long a finished call's result answers identical calls; 0 only shares in-flight calls
+WINDOW_SECONDS = float(os.getenv("TOOL_COALESCING_WINDOW_SECONDS", "2"))
+# Finished results kept for the window, most recent first
+MAX_RESULTS = int(os.getenv("TOOL_COALESCING_MAX_RESULTS", "1024"))
+STATS_LOG_EVERY = 1000
+
+logger = logging.getLogger(__name__)
+
+# How the current tool call was answered: "executed", "coalesced" or "window"; read by telemetry.py
+outcome = contextvars.ContextVar("tool_call_outcome", default=None)
+
+
+def normalize(value):
+    """Collapses whitespace in every string, recursively. Case is kept: Toolbox matches names exactly."""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {key: normalize(v) for key, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    return value
+
+
+def call_key(tool, args):
+    return tool, json.dumps(normalize(args or {}), sort_keys=True, default=str)
+
+
+class _Abandoned(Exception):
+    """The call being waited on was cancelled with its own caller; waiters run the tool themselves."""
+
+
+class QueryCoalescer:
+    """Runs each distinct (tool, arguments) call once among concurrent callers."""
+
+    def __init__(self, window=WINDOW_SECONDS, max_results=MAX_RESULTS, enabled=ENABLED):
+        self.window = window
+        self.max_results = max_results
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # key -> Future of the call running for it
+        self._in_flight = {}
+        # key -> (finished at, result)
+        self._results = OrderedDict()
+        self.executed = 0
+        self.coalesced = 0
+        self.window_hits = 0
+
+    def _recent(self, key, now):
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        if now - entry[0] >= self.window:
+            del self._results[key]
+            return None
+        return entry
+
+    async def run(self, tool, args, call):
+        """Returns call()'s result, or a copy of the result of an identical call running or just finished.
+
+        `call` is a zero-argument function returning the awaitable that runs the tool.
+        """
+        if not self.enabled:
+            return await call()
+        key = call_key(tool, args)
+        with self._lock:
+            entry = self._recent(key, time.monotonic())
+            if entry is not None:
+                self.window_hits += 1
+                self._maybe_log_stats()
+                outcome.set("window")
+                return copy.deepcopy(entry[1])
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+                # A running future can't be cancelled, so a cancelled waiter doesn't cancel it for the others
+                future.set_running_or_notify_cancel()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+            self._maybe_log_stats()
+
+        outcome.set("executed" if leader else "coalesced")
+        if not leader:
+            try:
+                return copy.deepcopy(await asyncio.wrap_future(future))
+            except _Abandoned:
+                return await self.run(tool, args, call)
+
+        try:
+            result = await call()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            if not future.done():
+                future.set_exception(_Abandoned() if isinstance(e, asyncio.CancelledError) else e)
+            raise
+        with self._lock:
+            del self._in_flight[key]
+            if self.window > 0:
+                self._results[key] = (time.monotonic(), copy.deepcopy(result))
+                self._results.move_to_end(key)
+                while len(self._results) > self.max_results:
+                    self._results.popitem(last=False)
+        if not future.done():
+            future.set_result(result)
+        return result
+
+    def stats(self):
+        calls = self.executed + self.coalesced + self.window_hits
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "window_hits": self.window_hits,
+            "in_flight": len(self._in_flight),
+            "shared_ratio": round((calls - self.executed) / calls, 4) if calls else 0.0,
+        }
+
+    def _maybe_log_stats(self):
+        if (self.executed + self.coalesced + self.window_hits) % STATS_LOG_EVERY == 0:
+            logger.info("Tool coalescing stats: %s", self.stats())
+
+
+class CoalescedTool(BaseTool):
+    """Runs a toolset's tool through the coalescer, declaring it exactly as the tool does."""
+
+    def __init__(self, tool, coalescer):
+        super().__init__(name=tool.name, description=tool.description)
+        self._tool = tool
+        self._coalescer = coalescer
+
+    def _get_declaration(self):
+        return self._tool._get_declaration()
+
+    async def run_async(self, *, args, tool_context):
+        return await self._coalescer.run(self.name, args, lambda: self._tool.run_async(args=args, tool_context=tool_context))
+
+
+class CoalescingToolset(BaseToolset):
+    """Wraps a toolset (ManifestToolset or ToolboxToolset) so identical concurrent calls share one query."""
+
+    def __init__(self, toolset, coalescer=None):
+        super().__init__()
+        self._toolset = toolset
+        self._coalescer = coalescer or get_coalescer()
+        self._wrapped = {}
+
+    async def get_tools(self, readonly_context=None):
+        tools = await self._toolset.get_tools(readonly_context)
+        wrapped = []
+        for tool in tools:
+            # The delegate may rebuild its tools; wrap each tool object once
+            if self._wrapped.get(tool.name, (None,))[0] is not tool:
+                self._wrapped[tool.name] = (tool, CoalescedTool(tool, self._coalescer))
+            wrapped.append(self._wrapped[tool.name][1])
+        return wrapped
+
+    async def close(self):
+        await self._toolset.close()
+
+
+_coalescer = QueryCoalescer()
+
+def get_coalescer():
+    return _coalescer
@@ -0,0 +1,243 @@
+"""Token-budgeted compaction of the conversation sent to Gemini.
+
+Runs as a before_model_callback. Once the history passes COMPACTION_TOKEN_BUDGET, every
+turn except the last COMPACTION_KEEP_TURNS is folded into a structured running summary
+(symptoms, candidate diseases, refuted diseases, diagnostics, treatments) kept in session
+state. Later calls send that summary in the system instruction followed by the recent
+turns verbatim, and only fold again when the un-summarized tail outgrows the budget.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+from google.genai import types
+from .genai_client import get_client
+from .session_memory import is_memory_content
+
+# Estimated prompt tokens of history above which older turns are compacted
+TOKEN_BUDGET = int(os.getenv("COMPACTION_TOKEN_BUDGET", "12000"))
+# User turns (with everything the agent did in answer to them) always sent verbatim
+KEEP_TURNS = int(os.getenv("COMPACTION_KEEP_TURNS", "3"))
+# Tool responses larger than this, from before the current turn, are cut down
+TOOL_OUTPUT_MAX_CHARS = int(os.getenv("COMPACTION_TOOL_OUTPUT_MAX_CHARS", "2000"))
+# "model" asks FAST_GEMINI_MODEL to update the summary; "extract" only reads tool calls
+SUMMARIZER = os.getenv("COMPACTION_SUMMARIZER", "model")
+FAST_GEMINI_MODEL = os.getenv("FAST_GEMINI_MODEL", "gemini-2.5-flash-lite")
+# Rough but stable for English and JSON; only used to decide when to compact
+CHARS_PER_TOKEN = 4
+
+SUMMARY_KEY = "zooka_compaction"
+
+SUMMARY_FIELDS = {
+    "symptoms": "every symptom the user reported, with its details and conditions",
+    "candidate_diseases": "diseases still under consideration, each {name, confidence}",
+    "refuted_diseases": "diseases ruled out, each {name, reason}",
+    "confirmed_disease": "the disease a diagnostic confirmed, or null",
+    "diagnostics_discussed": "diagnostic procedures already presented, with any results the user gave",
+    "treatments_discussed": "treatments already presented",
+    "notes": "anything else the assistant must remember (preferences, open questions)",
+}
+
+SUMMARIZER_PROMPT = """You maintain the running summary of a cardiology assistant's interview with a patient.
+Update the previous summary with the new conversation excerpt and return only JSON with these keys:
+{fields}
+Keep facts from the previous summary unless the excerpt contradicts them. Never invent symptoms or diseases.
+
+Previous summary:
+{previous}
+
+New conversation excerpt:
+{excerpt}"""
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(contents):
+    return sum(len(_part_text(part)) for content in contents for part in (content.parts or [])) // CHARS_PER_TOKEN
+
+
+def _part_text(part):
+    if part.text:
+        return part.text
+    if part.function_call:
+        return f"{part.function_call.name}({json.dumps(part.function_call.args, default=str)})"
+    if part.function_response:
+        return f"{part.function_response.name} -> {json.dumps(part.function_response.response, default=str)}"
+    return ""
+
+
+def _fingerprint(contents):
+    return hashlib.blake2b("\n".join(_part_text(p) for c in contents for p in (c.parts or [])).encode(),
+                           digest_size=8).hexdigest()
+
+
+def turn_starts(contents):
+    """Indexes of the contents that start a user turn (typed text, not a tool response or preloaded memories)."""
+    return [
+        i for i, content in enumerate(contents)
+        if content.role == "user" and any(p.text for p in content.parts or [])
+        and not any(p.function_response for p in content.parts or []) and not is_memory_content(content)
+    ]
+
+
+def _tool(name):
+    # Native tools use underscores, Toolbox tools hyphens
+    return (name or "").replace("-", "_")
+
+
+# Disease lookup tool -> the summary field listing the diseases it was asked about
+DISEASE_FIELDS = {
+    "search_diagnostic_by_disease": "diagnostics_discussed",
+    "search_cure_by_disease": "treatments_discussed",
+    "get_disease_dossier": "diagnostics_discussed",
+}
+
+
+def extract_summary(previous, contents):
+    """Folds what the tool calls in `contents` established into the previous summary."""
+    summary = {field: [] for field in SUMMARY_FIELDS}
+    summary["confirmed_disease"] = None
+    summary.update(previous or {})
+
+    def add(field, value):
+        if not isinstance(summary.get(field), list):
+            summary[field] = [summary[field]] if summary.get(field) else []
+        if value and value not in summary[field]:
+            summary[field].append(value)
+
+    for content in contents:
+        for part in content.parts or []:
+            if part.function_call:
+                name, args = _tool(part.function_call.name), part.function_call.args or {}
+                if name == "rank_diseases_by_symptoms":
+                    for symptom in args.get("symptoms", []):
+                        add("symptoms", symptom)
+                elif name == "find_all_diseases_by_symptom":
+                    add("symptoms", args.get("symptom"))
+                elif name in DISEASE_FIELDS:
+                    add(DISEASE_FIELDS[name], args.get("disease"))
+            elif part.function_response and _tool(part.function_response.name) in DISEASE_FIELDS:
+                # Record the stored name the tool resolved the model's spelling to
+                response = part.function_response.response or {}
+                field = DISEASE_FIELDS[_tool(part.function_response.name)]
+                if response.get("matched_disease") and response.get("disease") in (summary.get(field) or []):
+                    summary[field].remove(response["disease"])
+                    add(field, response["matched_disease"])
+            elif part.function_response and _tool(part.function_response.name) == "rank_diseases_by_symptoms":
+                diseases = (part.function_response.response or {}).get("diseases", [])
+                refuted = {d.get("name") for d in summary.get("refuted_diseases") or [] if isinstance(d, dict)}
+                summary["candidate_diseases"] = [
+                    {"name": d["disease_name"], "confidence": d.get("confidence_score")}
+                    for d in diseases[:5] if d["disease_name"] not in refuted
+                ]
+    return summary
+
+
+def _excerpt(contents):
+    lines = []
+    for content in contents:
+        for part in content.parts or []:
+            text = _part_text(part)
+            if part.function_response:
+                text = text[:TOOL_OUTPUT_MAX_CHARS]
+            if text:
+                lines.append(f"{content.role}: {text}")
+    return "\n".join(lines)
+
+
+def _trim_tool_outputs(contents):
+    """Replaces oversized tool responses with a pointer to the summary, keeping call/response pairs."""
+    trimmed = []
+    for content in contents:
+        parts = []
+        for part in content.parts or []:
+            if part.function_response and len(_part_text(part)) > TOOL_OUTPUT_MAX_CHARS:
+                part = types.Part(function_response=types.FunctionResponse(
+                    id=part.function_response.id,
+                    name=part.function_response.name,
+                    response={"result": "Omitted to save space; see the conversation summary."},
+                ))
+            parts.append(part)
+        trimmed.append(types.Content(role=content.role, parts=parts))
+    return trimmed
+
+
+class ConversationCompactor:
+
+    def __init__(self, token_budget=TOKEN_BUDGET, keep_turns=KEEP_TURNS, summarizer=SUMMARIZER,
+                 model=FAST_GEMINI_MODEL):
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.summarizer = summarizer
+        self.model = model
+
+    async def summarize(self, previous, contents):
+        summary = extract_summary(previous, contents)
+        if self.summarizer != "model":
+            return summary
+        try:
+            response = await get_client().aio.models.generate_content(
+                model=self.model,
+                contents=SUMMARIZER_PROMPT.format(
+                    fields="\n".join(f"- {k}: {v}" for k, v in SUMMARY_FIELDS.items()),
+                    previous=json.dumps(summary),
+                    excerpt=_excerpt(contents),
+                ),
+                config=types.GenerateContentConfig(response_mime_type="application/json", temperature=0),
+            )
+            updated = json.loads(response.text)
+            if not isinstance(updated, dict):
+                raise ValueError(f"expected a JSON object, got {type(updated).__name__}")
+            return updated
+        except Exception as e:
+            # The extracted summary still carries everything the tools established
+            logger.warning("Summarizing with %s failed, using extracted summary: %s", self.model, e)
+            return summary
+
+    async def before_model_callback(self, callback_context, llm_request):
+        contents = llm_request.contents
+        state = callback_context.state.get(SUMMARY_KEY)
+
+        through = 0
+        summary = None
+        # Only trust the stored summary if the history it covers is unchanged
+        if state and state["through"] <= len(contents) and state["fingerprint"] == _fingerprint(contents[:state["through"]]):
+            through, summary = state["through"], state["summary"]
+
+        tail = contents[through:]
+        if estimate_tokens(tail) > self.token_budget:
+            starts = turn_starts(tail)
+            if len(starts) > self.keep_turns:
+                fold = starts[-self.keep_turns]
+                start = time.perf_counter()
+                summary = await self.summarize(summary, tail[:fold])
+                through += fold
+                callback_context.state[SUMMARY_KEY] = {
+                    "through": through,
+                    "fingerprint": _fingerprint(contents[:through]),
+                    "summary": summary,
+                }
+                logger.info("Compacted %d contents into the summary in %.2fs", through, time.perf_counter() - start)
+
+        if summary is None:
+            return None
+
+        recent = contents[through:]
+        current = turn_starts(recent)
+        # Bulky tool outputs of the kept earlier turns are reduced to what the summary extracts
+        # from them; the current turn's tool outputs stay whole
+        cut = current[-1] if current else 0
+        summary = extract_summary(summary, recent[:cut])
+        llm_request.contents = _trim_tool_outputs(recent[:cut]) + recent[cut:]
+        llm_request.append_instructions([
+            "Summary of the earlier part of this conversation, which is no longer shown. "
+            "Treat it as already established:\n" + json.dumps(summary, indent=1)
+        ])
+        return None
+
+
+_compactor = ConversationCompactor()
+
+def get_compactor():
+    return _compactor
@@ -30,6 +30,7 @@ gcloud services enable \
 echo "installing packages"
 python3 -m pip install google-adk
 python3 -m pip install toolbox-core
+python3 -m pip install google-cloud-spanner numpy
 
 echo "setting toolbox URL and Gemini Model in agent definition"
 export TOOLBOX_URL=$(gcloud run services describe toolbox --region $REGION_ID --format 'value(status.url)')
@@ -39,12 +40,20 @@ sed -i "s|PHGM|$GEMINI_MODEL|g" "$BASE_DIR/zooka/zooka_agent/agent.py"
 echo "setting PROJECT_ID and region in .env"
 sed -i "s|PHPI|$PROJECT_ID|g" "$BASE_DIR/zooka/zooka_agent/.env"
 sed -i "s|PHRI|$REGION_ID|g" "$BASE_DIR/zooka/zooka_agent/.env"
+sed -i "s|PHSI|$SPANNER_INSTANCE_NAME|g" "$BASE_DIR/zooka/zooka_agent/.env"
+sed -i "s|PHSD|$SPANNER_DATABASE_NAME|g" "$BASE_DIR/zooka/zooka_agent/.env"
+sed -i "s|PHFM|$FAST_GEMINI_MODEL|g" "$BASE_DIR/zooka/zooka_agent/.env"
+sed -i "s|PHTS|${AGENT_TOOLSET:-toolbox}|g" "$BASE_DIR/zooka/zooka_agent/.env"
+sed -i "s|PHSM|${AGENT_STARTUP_MODE:-warm}|g" "$BASE_DIR/zooka/zooka_agent/.env"
+
+echo "caching the Toolbox tool manifest"
+(cd "$BASE_DIR/zooka" && python3 zooka_agent/tool_manifest.py Toolbox/tools.yaml)
 
 (
     cd "${BASE_DIR}/zooka"
     echo "Enhancing project for deployment"
     uvx agent-starter-pack enhance --adk -d agent_engine -n zooka -dir zooka_agent --cicd-runner google_cloud_build --region $REGION_ID -y
-    uv add toolbox_core
+    uv add toolbox_core google-cloud-spanner numpy
     echo "Deploying agent to Vertex AI Agent Engine"
     make backend
 )
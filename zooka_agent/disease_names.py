@@ -0,0 +1,252 @@
+"""Resolves the disease names the model passes to tools to the names stored in disease.Name.
+
+The catalog stores long ICD-style names such as "Essential (Primary) Hypertension" or
+"Pulmonary Embolism (PE)", while the model asks for "Hypertension" or "PE"; an exact
+`d.Name = @disease` lookup comes back empty and the model spends a turn retrying with
+other spellings. A name is resolved, in order, by:
+
+1. its folded form (case, accents, punctuation and possessives ignored) against every
+   stored name, the name without its parenthesised part, the parenthesised abbreviation
+   or alternative name, and the common clinical aliases in ALIASES;
+2. fuzzy matching: character trigram similarity between names whose words start alike,
+   or how much of a stored name the query covers when every word of the query, plural or
+   possessive s aside, appears in it ("Hypertension" covers half of "Essential Hypertension");
+3. with embeddings enabled, cosine similarity between the name's embedding and the
+   stored names' embeddings, computed once per index on the first query that needs it.
+
+Each match has a score between 0 and 1; below MIN_SCORE a name doesn't resolve. Nor does
+a name that several stored names match about equally well ("Cardiomyopathy"), or a
+generic name in GENERIC_NAMES ("Stroke"): the candidates go back to the model so it asks
+the user which one they mean.
+"""
+import os
+import re
+import logging
+import threading
+import unicodedata
+from collections import Counter
+import numpy as np
+
+MIN_SCORE = float(os.getenv("DISEASE_MATCH_MIN_SCORE", "0.45"))
+# Fall back to embedding similarity when folding and fuzzy matching find nothing
+USE_EMBEDDINGS = os.getenv("DISEASE_MATCH_EMBEDDINGS", "1") == "1"
+EMBEDDING_MIN_SIMILARITY = float(os.getenv("DISEASE_MATCH_EMBEDDING_MIN_SIMILARITY", "0.8"))
+# A fuzzy or embedding match resolves only when no other name scores within this margin of it
+AMBIGUITY_MARGIN = float(os.getenv("DISEASE_MATCH_AMBIGUITY_MARGIN", "0.05"))
+
+# Parenthesised parts that qualify a name rather than name the disease on their own
+QUALIFIERS = {"primary", "type a", "vascular type", "non small cell"}
+
+# Names covering several kinds of disease; matched by folding or fuzzy matching they never
+# resolve on their own, even with one candidate in the catalog ("Stroke" isn't "Hemorrhagic Stroke")
+GENERIC_NAMES = {
+    "stroke", "heart attack", "myocardial infarction", "mi", "cardiomyopathy", "angina", "arrhythmia",
+    "tachycardia", "heart block", "av block", "heart failure", "heart disease", "valve disease",
+    "aneurysm", "arteritis", "hemorrhage", "embolism", "thrombosis", "hypertension", "cancer",
+}
+
+# Common names and abbreviations -> the stored name they mean; used only for names in the catalog
+ALIASES = {
+    "high blood pressure": "Essential (Primary) Hypertension",
+    "htn": "Essential (Primary) Hypertension",
+    "afib": "Atrial Fibrillation",
+    "a fib": "Atrial Fibrillation",
+    "af": "Atrial Fibrillation",
+    "aflutter": "Atrial Flutter",
+    "a flutter": "Atrial Flutter",
+    "blood clot in the lung": "Pulmonary Embolism (PE)",
+    "blood clot in the leg": "Deep Vein Thrombosis (DVT)",
+    "svt": "Paroxysmal Supraventricular Tachycardia (PSVT)",
+    "supraventricular tachycardia": "Paroxysmal Supraventricular Tachycardia (PSVT)",
+    "vtach": "Ventricular Tachycardia (VT)",
+    "v tach": "Ventricular Tachycardia (VT)",
+    "pvc": "Premature Ventricular Contractions (PVCs)",
+    "complete heart block": "Third-Degree Atrioventricular Block",
+    "third degree heart block": "Third-Degree Atrioventricular Block",
+    "third degree av block": "Third-Degree Atrioventricular Block",
+    "3rd degree av block": "Third-Degree Atrioventricular Block",
+    "chb": "Third-Degree Atrioventricular Block",
+    "broken heart syndrome": "Takotsubo Cardiomyopathy",
+    "stress cardiomyopathy": "Takotsubo Cardiomyopathy",
+    "hocm": "Hypertrophic Cardiomyopathy (HCM)",
+    "dcm": "Dilated Cardiomyopathy",
+    "mitral stenosis": "Mitral Valve Stenosis",
+    "pericarditis": "Acute Pericarditis",
+    "myocarditis": "Acute Myocarditis",
+    "mini stroke": "Transient Ischemic Attack (TIA)",
+    "lou gehrigs disease": "Amyotrophic Lateral Sclerosis (ALS)",
+    "pneumonia": "Community-Acquired Pneumonia",
+    "sleep apnea": "Obstructive Sleep Apnea (OSA)",
+    "aortic aneurysm": "Abdominal Aortic Aneurysm (AAA)",
+}
+
+logger = logging.getLogger(__name__)
+
+_PARENTHESISED = re.compile(r"\(([^)]*)\)")
+
+
+def fold(name):
+    """Lower-cases name and drops accents, possessives and punctuation: "Buerger's" -> "buerger"."""
+    name = unicodedata.normalize("NFKD", name or "")
+    name = "".join(c for c in name if not unicodedata.combining(c)).casefold()
+    name = re.sub(r"['’]s\b|['’]", "", name)
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", name).split())
+
+
+def variants(name):
+    """Folded forms a stored name answers to: itself, without its brackets, and what the brackets say."""
+    forms = [fold(name)]
+    base = fold(_PARENTHESISED.sub(" ", name))
+    if base:
+        forms.append(base)
+    for inner in _PARENTHESISED.findall(name):
+        inner = fold(inner)
+        if inner and inner not in QUALIFIERS:
+            forms.append(inner)
+    return list(dict.fromkeys(forms))
+
+
+def stem(word):
+    """Drops a plural or possessive s, so "Raynauds" and "Raynaud" share a word."""
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")) else word
+
+
+def trigrams(folded):
+    padded = f"  {folded} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class DiseaseNameIndex:
+    """Alias-aware lookup from whatever the model calls a disease to its stored name.
+
+    Built once per catalog snapshot and never mutated, apart from the stored names'
+    embeddings, which are computed on first use.
+    """
+
+    def __init__(self, names, embed=None, min_score=MIN_SCORE):
+        self.names = list(dict.fromkeys(names))
+        self.min_score = min_score
+        self._embed = embed if USE_EMBEDDINGS else None
+        self._vectors = None
+        self._lock = threading.Lock()
+
+        # folded form -> name, or None when two names share the form
+        self._exact = {}
+        # (name position, folded form) per variant, with trigram and word postings over them
+        self._variants = []
+        self._variant_trigrams = []
+        self._by_trigram = {}
+        self._by_word = {}
+        for position, name in enumerate(self.names):
+            for form in variants(name):
+                self._add_exact(form, position)
+                variant = len(self._variants)
+                self._variants.append((position, form))
+                grams = trigrams(form)
+                self._variant_trigrams.append(len(grams))
+                for gram in grams:
+                    self._by_trigram.setdefault(gram, []).append(variant)
+                for word in {stem(w) for w in form.split()}:
+                    self._by_word.setdefault(word, set()).add(variant)
+
+        self._positions = {name: i for i, name in enumerate(self.names)}
+        self._aliases = {alias: self._positions[name] for alias, name in ALIASES.items() if name in self._positions}
+
+    def _add_exact(self, form, position):
+        if form not in self._exact:
+            self._exact[form] = position
+        elif self._exact[form] != position:
+            self._exact[form] = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def _fuzzy(self, folded):
+        """Best score per name position from trigram similarity and word containment."""
+        scores = {}
+
+        def offer(position, score):
+            if score > scores.get(position, 0.0):
+                scores[position] = score
+
+        words = {stem(w) for w in folded.split()}
+        grams = trigrams(folded)
+        shared = Counter(variant for gram in grams for variant in self._by_trigram.get(gram, ()))
+        for variant, count in shared.items():
+            position, form = self._variants[variant]
+            # Typos rarely touch the start of a word; this keeps "Stable Angina" off "Unstable Angina"
+            starts = {w[:2] for w in form.split()}
+            if all(w[:2] in starts for w in words):
+                offer(position, count / (len(grams) + self._variant_trigrams[variant] - count))
+
+        postings = [self._by_word.get(word) for word in words]
+        if words and all(postings):
+            for variant in set.intersection(*postings):
+                position, form = self._variants[variant]
+                offer(position, 0.5 + 0.5 * len(words) / len(form.split()))
+        return scores
+
+    def _embedding_scores(self, name):
+        with self._lock:
+            if self._vectors is None:
+                vectors = self._embed(self.names)
+                dims = len(next((v for v in vectors if v), []))
+                matrix = np.array([v if v else [0.0] * dims for v in vectors], dtype=np.float32).reshape(len(vectors), dims)
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                norms[norms == 0] = 1.0
+                self._vectors = matrix / norms
+        vector = self._embed([name])[0]
+        if not vector or not self._vectors.size:
+            return {}
+        query = np.asarray(vector, dtype=np.float32)
+        similarities = self._vectors @ (query / (np.linalg.norm(query) or 1.0))
+        return {i: float(s) for i, s in enumerate(similarities) if s >= EMBEDDING_MIN_SIMILARITY}
+
+    def resolve(self, name, limit=3):
+        """The stored names name may refer to, best first, each with its score and how it matched.
+
+        When the first entry's score reaches min_score, the others are the names scoring
+        within AMBIGUITY_MARGIN of it; otherwise they are suggestions.
+        """
+        folded = fold(name)
+        if not folded:
+            return []
+        position = self._positions.get(name)
+        if position is None:
+            position = self._exact.get(folded)
+        if position is not None:
+            return [self._match(position, 1.0, "exact")]
+        if folded in self._aliases:
+            return [self._match(self._aliases[folded], 1.0, "alias")]
+
+        scores, method = self._fuzzy(folded), "fuzzy"
+        if self._embed and max(scores.values(), default=0.0) < self.min_score:
+            try:
+                embedded = self._embedding_scores(name)
+            except Exception as e:
+                logger.warning("Disease name embedding lookup failed: %s", e)
+                embedded = {}
+            if embedded:
+                scores, method = embedded, "embedding"
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], len(self.names[item[0]])))[:limit]
+        if ranked and ranked[0][1] >= self.min_score:
+            best = ranked[0][1]
+            ranked = [(p, s) for p, s in ranked if s >= best - AMBIGUITY_MARGIN]
+        return [self._match(position, score, method) for position, score in ranked]
+
+    def match(self, name):
+        """(match or None, candidates): the match when one name clearly leads, else what to ask the user about.
+
+        Candidates are the names tied with the best one when name is ambiguous, and
+        suggestions when nothing matched.
+        """
+        matches = self.resolve(name)
+        if matches and matches[0]["match_score"] >= self.min_score:
+            if matches[0]["match_method"] in ("exact", "alias") or (len(matches) == 1 and fold(name) not in GENERIC_NAMES):
+                return matches[0], []
+            return None, matches
+        return None, [m for m in matches if m["match_score"] >= self.min_score / 2]
+
+    def _match(self, position, score, method):
+        return {"disease_name": self.names[position], "match_score": round(score, 4), "match_method": method}
@@ -0,0 +1,67 @@
+"""Disease dossiers fetched in a session, kept in session state for the later steps of the interview.
+
+get_disease_dossier (get-disease-dossier on Toolbox) returns a disease's symptoms,
+diagnostics and treatments in one call. after_tool_callback keeps each dossier in session
+state and before_model_callback adds the ones fetched so far to the system instruction,
+so the agent can present the treatments once the diagnostic results are in without
+another tool call, even after compaction trimmed the original tool response.
+"""
+import os
+import json
+
+DOSSIER_TOOLS = {"get_disease_dossier", "get-disease-dossier"}
+DOSSIER_KEY = "zooka_dossiers"
+# Most recently fetched dossiers kept per session
+MAX_DOSSIERS = int(os.getenv("DOSSIER_MAX_PER_SESSION", "3"))
+
+DOSSIER_INSTRUCTION = """Disease dossiers already fetched in this conversation. Answer questions about the
+symptoms, diagnostic procedures and treatments of these diseases from them, without calling a tool:
+{dossiers}"""
+
+# Toolbox column -> dossier field
+TOOLBOX_COLUMNS = {
+    "DiseaseDescription": "description",
+    "Symptoms": "symptoms",
+    "Diagnostics": "diagnostics",
+    "Treatments": "treatments",
+}
+
+
+def _json(value):
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return None
+    return value
+
+
+def parse(tool_response):
+    """(stored disease name, dossier) from the native tool's dict or Toolbox's rows; (None, None) if empty."""
+    response = _json(tool_response)
+    if isinstance(response, dict) and set(response) == {"result"}:
+        response = _json(response["result"])
+    if isinstance(response, list):
+        row = response[0] if response and isinstance(response[0], dict) else {}
+        return row.get("DiseaseName"), {field: _json(row.get(column)) for column, field in TOOLBOX_COLUMNS.items()}
+    if isinstance(response, dict) and response.get("matched_disease"):
+        return response["matched_disease"], {field: response.get(field) for field in TOOLBOX_COLUMNS.values()}
+    return None, None
+
+
+def after_tool_callback(tool, args, tool_context, tool_response):
+    if tool.name not in DOSSIER_TOOLS:
+        return None
+    name, dossier = parse(tool_response)
+    if name:
+        dossiers = {k: v for k, v in (tool_context.state.get(DOSSIER_KEY) or {}).items() if k != name}
+        dossiers[name] = dossier
+        tool_context.state[DOSSIER_KEY] = dict(list(dossiers.items())[-MAX_DOSSIERS:])
+    return None
+
+
+def before_model_callback(callback_context, llm_request):
+    dossiers = callback_context.state.get(DOSSIER_KEY)
+    if dossiers:
+        llm_request.append_instructions([DOSSIER_INSTRUCTION.format(dossiers=json.dumps(dossiers, indent=1))])
+    return None
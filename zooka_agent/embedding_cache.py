@@ -0,0 +1,154 @@
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+
+# Entries are only valid for the model that produced them; bump this when TextEmbeddingModel changes
+EMBEDDING_MODEL_VERSION = os.getenv("EMBEDDING_MODEL_VERSION", "text-embedding-004")
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_CACHE_TTL_SECONDS = float(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Optional SQLite file backing the in-memory LRU, so hits survive restarts
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH")
+EMBEDDING_CACHE_PERSISTENT_SIZE = int(os.getenv("EMBEDDING_CACHE_PERSISTENT_SIZE", "100000"))
+STATS_LOG_EVERY = 1000
+
+logger = logging.getLogger(__name__)
+
+def normalize_text(text):
+    """Folds case, whitespace and trailing punctuation so equivalent phrases share an entry."""
+    text = re.sub(r"\s+", " ", text.lower()).strip()
+    return text.strip(" .,;:!?")
+
+
+class EmbeddingCache:
+    """LRU cache of query embeddings keyed on normalized text, with an optional SQLite tier."""
+
+    def __init__(self, maxsize=EMBEDDING_CACHE_SIZE, ttl=EMBEDDING_CACHE_TTL_SECONDS,
+                 model_version=EMBEDDING_MODEL_VERSION, path=EMBEDDING_CACHE_PATH,
+                 persistent_size=EMBEDDING_CACHE_PERSISTENT_SIZE):
+        self.maxsize = maxsize
+        self.persistent_size = persistent_size
+        self.ttl = ttl
+        self.model_version = model_version
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Lookup counts already handed to take_counts
+        self._reported = {"hit": 0, "persistent_hit": 0, "miss": 0}
+        self._writes = 0
+        self._db = self._open(path) if path else None
+
+    def _open(self, path):
+        db = sqlite3.connect(path, check_same_thread=False)
+        db.execute("""CREATE TABLE IF NOT EXISTS embeddings (
+            text TEXT PRIMARY KEY,
+            model_version TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            vector BLOB NOT NULL
+        )""")
+        # Vectors from another model version are not comparable with the stored symptom vectors
+        db.execute("DELETE FROM embeddings WHERE model_version != ? OR created_at < ?",
+                   (self.model_version, time.time() - self.ttl))
+        db.commit()
+        return db
+
+    def get(self, text):
+        key = normalize_text(text)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._maybe_log_stats()
+                return entry[1]
+            if entry:
+                del self._entries[key]
+
+            vector = self._get_persistent(key, now)
+            if vector is not None:
+                self.hits += 1
+                self.persistent_hits += 1
+            else:
+                self.misses += 1
+            self._maybe_log_stats()
+            return vector
+
+    def _get_persistent(self, key, now):
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT created_at, vector FROM embeddings WHERE text = ? AND model_version = ?",
+            (key, self.model_version),
+        ).fetchone()
+        if not row or now - row[0] >= self.ttl:
+            return None
+        vector = list(array("f", row[1]))
+        self._remember(key, row[0], vector)
+        return vector
+
+    def put(self, text, vector):
+        key = normalize_text(text)
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, vector)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings (text, model_version, created_at, vector) VALUES (?, ?, ?, ?)",
+                    (key, self.model_version, now, array("f", vector).tobytes()),
+                )
+                self._writes += 1
+                if self._writes % 100 == 0:
+                    # Keep only the newest persistent_size entries on disk
+                    self._db.execute(
+                        "DELETE FROM embeddings WHERE text IN "
+                        "(SELECT text FROM embeddings ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                        (self.persistent_size,),
+                    )
+                self._db.commit()
+
+    def _remember(self, key, created_at, vector):
+        self._entries[key] = (created_at, vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def take_counts(self):
+        """Lookups since the previous call, by result: memory hits, persistent hits and misses.
+
+        telemetry.py reports them with each turn's timings, for the frontend's /metrics.
+        """
+        with self._lock:
+            totals = {"hit": self.hits - self.persistent_hits, "persistent_hit": self.persistent_hits, "miss": self.misses}
+            counts = {result: totals[result] - self._reported[result] for result in totals}
+            self._reported = totals
+        return {result: count for result, count in counts.items() if count}
+
+    def _maybe_log_stats(self):
+        if (self.hits + self.misses) % STATS_LOG_EVERY == 0:
+            logger.info("Embedding cache stats: %s", self.stats())
+
+
+_embedding_cache = EmbeddingCache()
+
+def get_embedding_cache():
+    return _embedding_cache
@@ -0,0 +1,66 @@
+from .spanner_db import get_database
+from .embedding_cache import get_embedding_cache
+
+# Same remote model (text-embedding-004) that embedded symptom.Embedding, so vectors are comparable
+EMBED_SQL = """
+    SELECT embeddings.values
+    FROM ML.PREDICT(
+        MODEL TextEmbeddingModel,
+        (SELECT @content AS content)
+    )
+"""
+
+BATCH_EMBED_SQL = """
+    SELECT content, embeddings.values
+    FROM ML.PREDICT(
+        MODEL TextEmbeddingModel,
+        (SELECT content FROM UNNEST(@contents) AS content)
+    )
+"""
+
+def embed_text(text):
+    """Embeds one piece of text, skipping the remote model call when the phrase is cached."""
+    cache = get_embedding_cache()
+    vector = cache.get(text)
+    if vector is None:
+        vector = predict_embedding(text)
+        if vector:
+            cache.put(text, vector)
+    return vector
+
+def embed_texts(texts):
+    """Embeds several texts, sending all cache misses to the model in one query."""
+    cache = get_embedding_cache()
+    vectors = [cache.get(text) for text in texts]
+    missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+    if missing:
+        predicted = predict_embeddings(missing)
+        for text, vector in predicted.items():
+            cache.put(text, vector)
+        vectors = [vector if vector is not None else predicted.get(text) for text, vector in zip(texts, vectors)]
+    return vectors
+
+def predict_embedding(text):
+    """Embeds one piece of text with the database's TextEmbeddingModel."""
+    from google.cloud import spanner
+
+    with get_database().snapshot() as snapshot:
+        results = snapshot.execute_sql(
+            EMBED_SQL,
+            params={"content": text},
+            param_types={"content": spanner.param_types.STRING},
+        )
+        row = next(iter(results), None)
+    return list(row[0]) if row else None
+
+def predict_embeddings(texts):
+    """Embeds a batch of texts with one TextEmbeddingModel call; returns {text: vector}."""
+    from google.cloud import spanner
+
+    with get_database().snapshot() as snapshot:
+        results = snapshot.execute_sql(
+            BATCH_EMBED_SQL,
+            params={"contents": list(texts)},
+            param_types={"contents": spanner.param_types.Array(spanner.param_types.STRING)},
+        )
+        return {row[0]: list(row[1]) for row in results}
@@ -0,0 +1,31 @@
+import os
+import threading
+import httpx
+from google.genai import Client, types
+
+PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT")
+# Gemini 3 previews are only served from the global endpoint
+LOCATION = "global"
+
+# Idle connections are kept this long, so a burst after a quiet spell skips the TLS handshake
+KEEPALIVE_SECONDS = float(os.getenv("GENAI_KEEPALIVE_SECONDS", "120"))
+KEEPALIVE_CONNECTIONS = int(os.getenv("GENAI_KEEPALIVE_CONNECTIONS", "32"))
+
+_client = None
+_client_lock = threading.Lock()
+
+def http_options(**options):
+    """HttpOptions with a keep-alive connection pool, for every GenAI client the agent builds."""
+    limits = httpx.Limits(max_keepalive_connections=KEEPALIVE_CONNECTIONS, keepalive_expiry=KEEPALIVE_SECONDS)
+    return types.HttpOptions(client_args={"limits": limits}, async_client_args={"limits": limits}, **options)
+
+def get_client():
+    """Returns the process-wide GenAI client used for calls outside root_agent's model."""
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = Client(vertexai=True, project=PROJECT_ID, location=LOCATION, http_options=http_options())
+
+    return _client
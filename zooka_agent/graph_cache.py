@@ -0,0 +1,266 @@
+import os
+import sys
+import time
+import logging
+import threading
+from .spanner_db import get_database
+from .embeddings import embed_texts
+from .disease_names import DiseaseNameIndex
+
+# How often a lookup may check data_version for a new catalog load
+VERSION_CHECK_SECONDS = float(os.getenv("GRAPH_CACHE_VERSION_CHECK_SECONDS", "30"))
+
+VERSION_SQL = "SELECT Version FROM data_version WHERE Name = 'catalog'"
+
+DISEASES_SQL = "SELECT ID, Name, Description FROM disease"
+
+DIAGNOSTICS_SQL = """
+    SELECT v.DiseaseID, diag.Name, diag.Purpose, v.IsGoldStandard
+    FROM verify v
+    JOIN diagnostic diag ON diag.ID = v.DiagnosticID
+"""
+
+TREATMENTS_SQL = """
+    SELECT c.DiseaseID, t.Name, t.Details, c.TreatmentType, c.Confidence
+    FROM cure c
+    JOIN treatment t ON t.ID = c.TreatmentID
+"""
+
+INDICATIONS_SQL = "SELECT SymptomID, DiseaseID, Confidence FROM indicate"
+
+SYMPTOMS_SQL = "SELECT ID, Name FROM symptom"
+
+# Same graph queries as Toolbox/tools.yaml, used when the cache has no entry for a disease
+DIAGNOSTICS_BY_DISEASE_GQL = """
+    GRAPH HeartDiseaseGraph
+    MATCH (d:disease)-[e:VerifiedBy]->(diag:diagnostic)
+    WHERE d.Name = @disease
+    RETURN
+    diag.Name AS DiagnosticName,
+    diag.Purpose AS DiagnosticPurpose,
+    e.IsGoldStandard AS IsGoldStandard
+"""
+
+TREATMENTS_BY_DISEASE_GQL = """
+    GRAPH HeartDiseaseGraph
+    MATCH (d:disease)-[e:CuredBy]->(t:treatment)
+    WHERE d.Name = @disease
+    RETURN
+      t.Name AS TreatmentName,
+      t.details AS TreatmentDetails,
+      e.treatmenttype AS treatmenttype,
+      e.confidence as Confidence
+"""
+
+# Same statement as get-disease-dossier in Toolbox/tools.yaml: the disease with its symptoms,
+# diagnostics and treatments, in one round trip
+DOSSIER_BY_DISEASE_SQL = """
+    SELECT
+      d.Name AS DiseaseName,
+      d.Description AS DiseaseDescription,
+      TO_JSON(ARRAY(
+        SELECT AS STRUCT s.Name AS SymptomName, i.Confidence AS Confidence
+        FROM indicate i JOIN symptom s ON s.ID = i.SymptomID
+        WHERE i.DiseaseID = d.ID)) AS Symptoms,
+      TO_JSON(ARRAY(
+        SELECT AS STRUCT diag.Name AS DiagnosticName, diag.Purpose AS DiagnosticPurpose, v.IsGoldStandard AS IsGoldStandard
+        FROM verify v JOIN diagnostic diag ON diag.ID = v.DiagnosticID
+        WHERE v.DiseaseID = d.ID)) AS Diagnostics,
+      TO_JSON(ARRAY(
+        SELECT AS STRUCT t.Name AS TreatmentName, t.Details AS TreatmentDetails,
+          c.TreatmentType AS treatmenttype, c.Confidence AS Confidence
+        FROM cure c JOIN treatment t ON t.ID = c.TreatmentID
+        WHERE c.DiseaseID = d.ID)) AS Treatments
+    FROM disease d
+    WHERE d.Name = @disease
+"""
+
+logger = logging.getLogger(__name__)
+
+def _text(value):
+    # Names and labels repeat across many edges; interning keeps one copy of each
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class _Graph:
+    """Adjacency maps of HeartDiseaseGraph, built once per data version and never mutated."""
+
+    def __init__(self, version, diseases, diagnostics, treatments, indications, symptoms=(), embed=None):
+        self.version = version
+        # disease name -> (disease id, description)
+        self.diseases = {_text(name): (disease_id, description) for disease_id, name, description in diseases}
+        # what the model calls a disease -> its name above
+        self.names = DiseaseNameIndex(self.diseases, embed=embed)
+        names = {disease_id: name for name, (disease_id, _) in self.diseases.items()}
+
+        # disease id -> ((name, purpose, is gold standard), ...)
+        self.diagnostics = self._group((row[0], tuple(_text(v) for v in row[1:])) for row in diagnostics)
+        # disease id -> ((name, details, type, confidence), ...)
+        self.treatments = self._group((row[0], tuple(_text(v) for v in row[1:])) for row in treatments)
+        # symptom id -> ((disease name, confidence), ...)
+        indications = [row for row in indications if row[1] in names]
+        self.indications = self._group(
+            (symptom_id, (names[disease_id], _text(confidence))) for symptom_id, disease_id, confidence in indications
+        )
+        # disease id -> ((symptom name, confidence), ...)
+        symptom_names = {symptom_id: _text(name) for symptom_id, name in symptoms}
+        self.symptoms = self._group(
+            (disease_id, (symptom_names[symptom_id], _text(confidence)))
+            for symptom_id, disease_id, confidence in indications if symptom_id in symptom_names
+        )
+
+    @staticmethod
+    def _group(pairs):
+        grouped = {}
+        for key, value in pairs:
+            grouped.setdefault(key, []).append(value)
+        return {key: tuple(values) for key, values in grouped.items()}
+
+
+class KnowledgeGraphCache:
+    """Read-through in-memory snapshot of HeartDiseaseGraph.
+
+    The whole graph is loaded in one read-only snapshot and reused until the data_version
+    stamp written by Data/setup-env.py changes. Unknown diseases fall through to Spanner.
+    """
+
+    def __init__(self, database=None, version_check_seconds=VERSION_CHECK_SECONDS, embed=embed_texts):
+        self._database = database
+        self.version_check_seconds = version_check_seconds
+        self._embed = embed
+        self._lock = threading.Lock()
+        self._graph = None
+        self._checked_at = 0.0
+
+    @property
+    def database(self):
+        return self._database or get_database()
+
+    def _read_version(self, snapshot):
+        try:
+            row = next(iter(snapshot.execute_sql(VERSION_SQL)), None)
+        except Exception as e:
+            # Databases loaded before data_version existed never bump; treat them as version 0
+            logger.warning("Could not read data_version: %s", e)
+            return 0
+        return row[0] if row else 0
+
+    def load(self):
+        with self._lock:
+            with self.database.snapshot(multi_use=True) as snapshot:
+                version = self._read_version(snapshot)
+                self._graph = _Graph(
+                    version,
+                    list(snapshot.execute_sql(DISEASES_SQL)),
+                    list(snapshot.execute_sql(DIAGNOSTICS_SQL)),
+                    list(snapshot.execute_sql(TREATMENTS_SQL)),
+                    list(snapshot.execute_sql(INDICATIONS_SQL)),
+                    list(snapshot.execute_sql(SYMPTOMS_SQL)),
+                    embed=self._embed,
+                )
+            self._checked_at = time.monotonic()
+            logger.info("Loaded HeartDiseaseGraph version %s (%d diseases)", version, len(self._graph.diseases))
+
+    def graph(self):
+        """Returns the current graph, reloading it if the data version was bumped."""
+        if self._graph is None:
+            self.load()
+        elif time.monotonic() - self._checked_at >= self.version_check_seconds:
+            self._checked_at = time.monotonic()
+            with self.database.snapshot() as snapshot:
+                version = self._read_version(snapshot)
+            if version != self._graph.version:
+                self.load()
+        return self._graph
+
+    def _query(self, gql, disease):
+        from google.cloud import spanner
+
+        with self.database.snapshot() as snapshot:
+            results = snapshot.execute_sql(
+                gql,
+                params={"disease": disease},
+                param_types={"disease": spanner.param_types.STRING},
+            )
+            columns = None
+            rows = []
+            for row in results:
+                columns = columns or [field.name for field in results.fields]
+                rows.append(dict(zip(columns, row)))
+            return rows
+
+    def match_disease(self, disease):
+        """(best match or None, other candidates) for a disease name as the model wrote it."""
+        return self.graph().names.match(disease)
+
+    def diagnostics(self, disease):
+        graph = self.graph()
+        entry = graph.diseases.get(disease)
+        if entry is None:
+            return self._query(DIAGNOSTICS_BY_DISEASE_GQL, disease)
+        return [
+            {"DiagnosticName": name, "DiagnosticPurpose": purpose, "IsGoldStandard": is_gold}
+            for name, purpose, is_gold in graph.diagnostics.get(entry[0], ())
+        ]
+
+    def treatments(self, disease):
+        graph = self.graph()
+        entry = graph.diseases.get(disease)
+        if entry is None:
+            return self._query(TREATMENTS_BY_DISEASE_GQL, disease)
+        return [
+            {"TreatmentName": name, "TreatmentDetails": details, "treatmenttype": treatment_type, "Confidence": confidence}
+            for name, details, treatment_type, confidence in graph.treatments.get(entry[0], ())
+        ]
+
+    def dossier(self, disease):
+        """The disease's description, symptoms, diagnostics and treatments, or None if it isn't stored."""
+        graph = self.graph()
+        entry = graph.diseases.get(disease)
+        if entry is None:
+            return self._query_dossier(disease)
+        disease_id, description = entry
+        return {
+            "description": description,
+            "symptoms": [{"SymptomName": name, "Confidence": confidence}
+                         for name, confidence in graph.symptoms.get(disease_id, ())],
+            "diagnostics": self.diagnostics(disease),
+            "treatments": self.treatments(disease),
+        }
+
+    def _query_dossier(self, disease):
+        from google.cloud import spanner
+
+        with self.database.snapshot() as snapshot:
+            results = snapshot.execute_sql(
+                DOSSIER_BY_DISEASE_SQL,
+                params={"disease": disease},
+                param_types={"disease": spanner.param_types.STRING},
+            )
+            row = next(iter(results), None)
+        if row is None:
+            return None
+        _, description, symptoms, diagnostics, treatments = row
+        return {"description": description, "symptoms": list(symptoms or []),
+                "diagnostics": list(diagnostics or []), "treatments": list(treatments or [])}
+
+    def diseases_by_symptom_ids(self, symptom_ids):
+        """Maps each symptom ID to the diseases it indicates, or None for IDs the snapshot doesn't know."""
+        graph = self.graph()
+        found = {}
+        for symptom_id in symptom_ids:
+            indications = graph.indications.get(symptom_id)
+            if indications is None:
+                found[symptom_id] = None
+                continue
+            found[symptom_id] = [
+                {"disease_name": name, "confidence": confidence, "disease_description": graph.diseases[name][1]}
+                for name, confidence in indications
+            ]
+        return found
+
+
+_graph_cache = KnowledgeGraphCache()
+
+def get_graph_cache():
+    return _graph_cache
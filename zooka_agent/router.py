@@ -0,0 +1,112 @@
+"""Tiered model routing: FAST_GEMINI_MODEL triages each turn, the pro model reasons.
+
+Runs as a before_model_callback on the first model call of every turn. The fast model
+classifies the user's message as greeting, off_topic, clarification or diagnostic and
+answers the first three itself; returning that answer from the callback skips the pro
+model entirely. Diagnostic turns (symptoms, diseases, diagnostics and their results,
+treatments, past conversations) and any failure escalate to root_agent's model.
+"""
+import os
+import json
+import time
+import logging
+from google.genai import types
+from google.adk.models.llm_response import LlmResponse
+from .genai_client import get_client
+from . import telemetry
+from .session_memory import is_memory_content
+
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "1") == "1"
+ROUTER_MODEL = os.getenv("FAST_GEMINI_MODEL", "gemini-2.5-flash-lite")
+# Earlier contents shown to the router so it can tell a clarification from a new topic
+ROUTER_HISTORY_CONTENTS = int(os.getenv("ROUTER_HISTORY_CONTENTS", "6"))
+
+ROUTES = ("greeting", "off_topic", "clarification", "diagnostic")
+
+ROUTER_PROMPT = """You triage messages for Zooka, a cardiologist assistant that helps identify heart diseases
+from symptoms, suggests diagnostic procedures and provides treatments. Classify the user's LAST message:
+- greeting: hello, thanks, goodbye, small talk. Reply by greeting the user and asking them to describe their
+  symptoms in as much detail as possible, including when they occur and what makes them better or worse.
+- off_topic: anything unrelated to heart diseases. Politely remind the user that you can only help with
+  diagnosing and curing heart diseases. If it is a joke like "my heart hurts because I am in love", reply
+  exactly: "That's a funny joke, please provide real symptoms."
+- clarification: a question about the meaning of a word or about something already said in the conversation,
+  answerable in a few sentences without new medical facts about the user.
+- diagnostic: everything else, including any symptom, disease, diagnostic procedure or result, treatment, or
+  question about earlier conversations. Do not reply.
+When unsure, choose diagnostic. Return JSON: {"route": "<route>", "reply": "<reply, empty for diagnostic>"}"""
+
+logger = logging.getLogger(__name__)
+
+
+def _text(content):
+    return " ".join(part.text for part in content.parts or [] if part.text)
+
+
+# Invocation whose first model call was triaged; temp: state lasts for the invocation only
+ROUTED_KEY = "temp:zooka_routed_invocation"
+
+
+def _is_new_turn(callback_context):
+    """True on a turn's first model call; the later ones follow the turn's tool calls.
+
+    Decided from state rather than from the request: preloaded memories make a request
+    after a tool call end with user text too.
+    """
+    return callback_context.state.get(ROUTED_KEY) != callback_context.invocation_id
+
+
+class TurnRouter:
+
+    def __init__(self, model=ROUTER_MODEL, history_contents=ROUTER_HISTORY_CONTENTS, enabled=ROUTER_ENABLED):
+        self.model = model
+        self.history_contents = history_contents
+        self.enabled = enabled
+
+    async def classify(self, contents):
+        """Returns (route, reply); reply is empty unless the route can be answered cheaply."""
+        transcript = "\n".join(
+            f"{content.role}: {text}"
+            for content in contents[-(self.history_contents + 1):]
+            # Preloaded memories are long and irrelevant to triage
+            if (text := _text(content)) and not is_memory_content(content)
+        )
+        response = await get_client().aio.models.generate_content(
+            model=self.model,
+            contents=transcript,
+            config=types.GenerateContentConfig(
+                system_instruction=ROUTER_PROMPT,
+                response_mime_type="application/json",
+                temperature=0,
+                max_output_tokens=512,
+            ),
+        )
+        decision = json.loads(response.text)
+        route = decision.get("route")
+        if route not in ROUTES or route == "diagnostic":
+            return "diagnostic", ""
+        return route, (decision.get("reply") or "").strip()
+
+    async def before_model_callback(self, callback_context, llm_request):
+        if not self.enabled or not _is_new_turn(callback_context):
+            return None
+        callback_context.state[ROUTED_KEY] = callback_context.invocation_id
+
+        start = time.perf_counter()
+        try:
+            route, reply = await self.classify(llm_request.contents)
+        except Exception as e:
+            logger.warning("Routing with %s failed, escalating: %s", self.model, e)
+            route, reply = "diagnostic", ""
+        answered = bool(reply)
+        telemetry.record_route(callback_context, route if answered else "diagnostic", time.perf_counter() - start)
+
+        if not answered:
+            return None
+        return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=reply)]))
+
+
+_router = TurnRouter()
+
+def get_router():
+    return _router
@@ -0,0 +1,115 @@
+"""Long-term memory loaded once per session instead of before every model request.
+
+PreloadMemoryTool searches Agent Engine memory before each model call. A user's past
+conversations don't change while a session is open, so SessionMemoryTool searches on the
+first turn, keeps the result in session state and reuses it. It searches again only
+when the user asks about earlier conversations.
+"""
+import os
+import re
+import time
+import logging
+from google.genai import types
+from google.adk.tools import _memory_entry_utils
+from google.adk.tools.preload_memory_tool import PreloadMemoryTool
+from . import telemetry
+from .turn_state import InvocationMap
+
+# Added to every search: the first turn is often just a greeting, and a refresh should
+# still bring back the whole history alongside what the user asked about
+STANDING_QUERY = os.getenv(
+    "MEMORY_STANDING_QUERY",
+    "the user's heart symptoms, suspected and confirmed diseases, diagnostic results, treatments and preferences",
+)
+
+# The user asking about earlier conversations triggers a fresh search for that turn
+REFRESH_PATTERN = re.compile(
+    r"\b(remember|recall|last time|last visit|previous(ly)?|earlier conversation|we (talked|spoke|discussed)"
+    r"|you (told|said)|my history|forg[eo]t)\b",
+    re.IGNORECASE,
+)
+
+MEMORY_KEY = "zooka_memory"
+
+# Wraps preloaded memories here and in ADK's PreloadMemoryTool
+MEMORY_TAG = "<PAST_CONVERSATIONS>"
+
+MEMORY_CONTEXT = """The following content is from your previous conversations with the user.
+They may be useful for answering the user's current query.
+<PAST_CONVERSATIONS>
+{memories}
+</PAST_CONVERSATIONS>
+"""
+
+logger = logging.getLogger(__name__)
+
+# invocation_id -> search result waiting for before_model_callback to store it. State set in
+# process_llm_request is not attached to any event, so it would be lost after the turn.
+# Expires when the turn aborted before its model call.
+_pending = InvocationMap()
+
+
+def is_memory_content(content):
+    """True for the transient user content carrying preloaded memories, which isn't a user turn.
+
+    It is appended to every model request of a turn, including the ones after a tool call.
+    """
+    return any(part.text and MEMORY_TAG in part.text for part in content.parts or [])
+
+
+def _format(memories):
+    lines = []
+    for memory in memories:
+        if memory.timestamp:
+            lines.append(f"Time: {memory.timestamp}")
+        if text := _memory_entry_utils.extract_text(memory):
+            lines.append(f"{memory.author}: {text}" if memory.author else text)
+    return "\n".join(lines)
+
+
+class SessionMemoryTool(PreloadMemoryTool):
+
+    async def _search(self, tool_context, query):
+        start = time.perf_counter()
+        try:
+            response = await tool_context.search_memory(query)
+        except Exception as e:
+            logger.warning("Failed to load memory (query length: %d): %s", len(query), e)
+            return None
+        finally:
+            telemetry.record_memory_preload(tool_context, time.perf_counter() - start, cached=False)
+        return _format(response.memories)
+
+    async def process_llm_request(self, *, tool_context, llm_request):
+        user_content = tool_context.user_content
+        parts = user_content.parts if user_content and user_content.parts else []
+        user_query = " ".join(part.text for part in parts if part.text)
+        if not user_query:
+            return
+
+        cached = _pending.get(tool_context.invocation_id) or tool_context.state.get(MEMORY_KEY)
+        # Runs before every model call of a turn; search at most once per turn
+        searched_this_turn = cached is not None and cached["invocation_id"] == tool_context.invocation_id
+        if cached is None or (not searched_this_turn and REFRESH_PATTERN.search(user_query)):
+            memories = await self._search(tool_context, f"{user_query}\n{STANDING_QUERY}")
+            if memories is None:
+                # Leave the cache as it was, so the next turn tries again if it was empty
+                memories = cached["memories"] if cached else ""
+            else:
+                _pending.set(tool_context.invocation_id, {"memories": memories, "invocation_id": tool_context.invocation_id})
+        else:
+            memories = cached["memories"]
+            telemetry.record_memory_preload(tool_context, 0.0, cached=True)
+
+        if memories:
+            llm_request._insert_transient_user_content([
+                types.Content(role="user", parts=[types.Part.from_text(text=MEMORY_CONTEXT.format(memories=memories))])
+            ])
+
+
+def before_model_callback(callback_context, llm_request):
+    """Persists a fresh memory search in session state with the upcoming model response."""
+    entry = _pending.pop(callback_context.invocation_id, None)
+    if entry is not None:
+        callback_context.state[MEMORY_KEY] = entry
+    return None
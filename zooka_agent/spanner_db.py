@@ -0,0 +1,33 @@
+import os
+import threading
+
+PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT")
+INSTANCE_NAME = os.getenv("SPANNER_INSTANCE_NAME")
+DATABASE_NAME = os.getenv("SPANNER_DATABASE_NAME")
+
+# Sessions are created up front; tools.py runs at most this many lookups at once, so a
+# tool call never waits for a session
+POOL_SIZE = int(os.getenv("SPANNER_POOL_SIZE", "16"))
+POOL_TIMEOUT = float(os.getenv("SPANNER_POOL_TIMEOUT", "10"))
+
+_database = None
+_database_lock = threading.Lock()
+
+def get_database():
+    """Returns the process-wide Spanner database handle used by the in-process tools."""
+    global _database
+
+    if _database is None:
+        with _database_lock:
+            if _database is None:
+                # Imported here: the Spanner client takes about half a second to import, which
+                # the agent shouldn't pay before it can serve
+                from google.cloud import spanner
+                from google.cloud.spanner_v1.pool import FixedSizePool
+
+                spanner_client = spanner.Client(project=PROJECT_ID)
+                instance = spanner_client.instance(INSTANCE_NAME)
+                pool = FixedSizePool(size=POOL_SIZE, default_timeout=POOL_TIMEOUT)
+                _database = instance.database(DATABASE_NAME, pool=pool)
+
+    return _database
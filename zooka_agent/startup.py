@@ -0,0 +1,86 @@
+"""What a new Agent Engine instance prepares before its first turn.
+
+With AGENT_STARTUP_MODE=warm (the default) the agent builds its GenAI clients, the Spanner
+session pool and the catalog snapshots on a background thread as soon as it is defined,
+and sends each model one tiny request so credentials, access tokens and DNS are resolved
+and the endpoints are warm. The first model call waits for that warm-up instead of racing
+it to build the same clients. AGENT_STARTUP_MODE=lazy builds everything on first use.
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from google.genai import types
+from .genai_client import get_client
+from . import router
+
+STARTUP_MODE = os.getenv("AGENT_STARTUP_MODE", "warm")
+# The first model call waits at most this long for the warm-up to finish
+WARMUP_WAIT_SECONDS = float(os.getenv("AGENT_WARMUP_WAIT_SECONDS", "20"))
+WARMUP_PROMPT = "Reply with OK."
+
+logger = logging.getLogger(__name__)
+
+_started = threading.Event()
+_ready = threading.Event()
+# step -> seconds it took, or the error it failed with
+timings = {}
+
+
+def _ping(client, model):
+    client.models.generate_content(
+        model=model,
+        contents=WARMUP_PROMPT,
+        config=types.GenerateContentConfig(max_output_tokens=16),
+    )
+
+
+def _step(name, func):
+    start = time.perf_counter()
+    try:
+        func()
+        timings[name] = round(time.perf_counter() - start, 4)
+    except Exception as e:
+        # A failed step only means the first turn builds that piece itself
+        logger.warning("Warm-up step %s failed: %s", name, e)
+        timings[name] = type(e).__name__
+
+
+def warm_up(agent, catalog):
+    """Runs every warm-up step concurrently and marks the agent ready when all are done."""
+    steps = {
+        "model": lambda: _ping(agent.model.api_client, agent.model.model),
+        "catalog": catalog,
+    }
+    if router.ROUTER_ENABLED:
+        steps["router_model"] = lambda: _ping(get_client(), router.ROUTER_MODEL)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(steps), thread_name_prefix="zooka-warm-up") as executor:
+        for name, func in steps.items():
+            executor.submit(_step, name, func)
+    timings["total"] = round(time.perf_counter() - start, 4)
+    logger.info(json.dumps({"event": "warm_up", **timings}))
+    _ready.set()
+
+
+def start(agent, catalog):
+    """Starts the warm-up in the background; catalog opens whatever the tools read from."""
+    if _started.is_set():
+        return
+    _started.set()
+    threading.Thread(target=warm_up, args=(agent, catalog), name="zooka-warm-up", daemon=True).start()
+
+
+def wait(timeout=None):
+    """Blocks until the warm-up finished; True at once when none was started."""
+    return not _started.is_set() or _ready.wait(timeout)
+
+
+async def before_model_callback(callback_context, llm_request):
+    if _started.is_set() and not _ready.is_set():
+        await asyncio.to_thread(_ready.wait, WARMUP_WAIT_SECONDS)
+    return None
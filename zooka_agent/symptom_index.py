@@ -0,0 +1,321 @@
+import os
+import copy
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+import numpy as np
+from .spanner_db import get_database
+from .graph_cache import VERSION_SQL
+
+# Exact (brute-force) search is used below this many rows, an IVF index above it
+IVF_MIN_ROWS = int(os.getenv("SYMPTOM_IVF_MIN_ROWS", "20000"))
+# Number of IVF lists scanned per query; higher is slower but closer to exact
+IVF_PROBES = int(os.getenv("SYMPTOM_IVF_PROBES", "8"))
+# How often a search may check Spanner for vectors written since the last load
+REFRESH_SECONDS = float(os.getenv("SYMPTOM_INDEX_REFRESH_SECONDS", "60"))
+
+LOAD_SQL = """
+    SELECT ID, Name, Details, Embedding, EmbeddingUpdatedAt
+    FROM symptom
+    WHERE Embedding IS NOT NULL
+"""
+
+REFRESH_SQL = LOAD_SQL + " AND EmbeddingUpdatedAt > @since"
+
+# Every row the index should hold; rows missing from it were deleted or lost their Embedding
+IDS_SQL = "SELECT ID FROM symptom WHERE Embedding IS NOT NULL"
+
+# Read on every refresh; IDS_SQL only runs when this or data_version says rows may be gone
+COUNT_SQL = "SELECT COUNT(*) FROM symptom WHERE Embedding IS NOT NULL"
+
+# Rows embedded before EmbeddingUpdatedAt existed have no stamp; anything stamped is newer
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+logger = logging.getLogger(__name__)
+
+def normalize_rows(matrix):
+    """Scales each row to unit length so a dot product is the cosine similarity."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+def top_k(scores, k):
+    """Indices of the k highest scores, best first."""
+    k = min(k, len(scores))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best])]
+
+
+class IVFIndex:
+    """Approximate index: k-means centroids, each owning the rows closest to it.
+
+    A query only scores the rows of the `probes` lists whose centroids are nearest to it.
+    """
+
+    def __init__(self, matrix, n_lists=None, iterations=10, seed=0):
+        rows = matrix.shape[0]
+        self.n_lists = n_lists or max(1, int(np.sqrt(rows)))
+        self.trained_rows = rows
+
+        rng = np.random.default_rng(seed)
+        sample = matrix[rng.choice(rows, size=min(rows, self.n_lists * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=self.n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            counts = np.bincount(assignments, minlength=self.n_lists)
+            # Empty lists keep their previous centroid
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+            centroids = normalize_rows(centroids)
+        self.centroids = centroids
+        self.assignments = self.assign(matrix)
+        self._build_lists()
+
+    def assign(self, rows):
+        return np.argmax(rows @ self.centroids.T, axis=1)
+
+    def _build_lists(self):
+        self.order = np.argsort(self.assignments, kind="stable")
+        self.bounds = np.searchsorted(self.assignments[self.order], np.arange(self.n_lists + 1))
+
+    def removed(self, keep):
+        """Returns a copy without the rows where the boolean mask `keep` is False."""
+        index = copy.copy(self)
+        index.assignments = self.assignments[keep]
+        index._build_lists()
+        return index
+
+    def updated(self, row_positions, rows):
+        """Returns a copy with changed or appended rows re-assigned, without retraining the centroids."""
+        index = copy.copy(self)
+        index.assignments = np.resize(self.assignments, max(len(self.assignments), int(row_positions.max()) + 1))
+        index.assignments[row_positions] = index.assign(rows)
+        index._build_lists()
+        return index
+
+    def candidates(self, query, probes):
+        nearest_lists = top_k(self.centroids @ query, probes)
+        return np.concatenate([self.order[self.bounds[c]:self.bounds[c + 1]] for c in nearest_lists])
+
+
+class _Snapshot:
+    """Immutable view of the index, swapped atomically on refresh so searches never lock."""
+
+    def __init__(self, ids, names, details, matrix, ivf):
+        self.ids = ids
+        self.names = names
+        self.details = details
+        self.matrix = matrix
+        self.ivf = ivf
+        self.positions = {symptom_id: i for i, symptom_id in enumerate(ids)}
+
+
+class SymptomIndex:
+    """In-memory top-k cosine search over symptom.Embedding.
+
+    Loads every vector once into a contiguous float32 matrix, then picks up rows whose
+    EmbeddingUpdatedAt moved past the last seen commit timestamp (written by update_embeddings)
+    and drops rows whose ID no longer has an Embedding (deleted by the loader, or set to NULL).
+    The IDs are only listed when data_version moved or the embedded row count no longer
+    matches the index.
+    """
+
+    def __init__(self, database=None, ivf_min_rows=IVF_MIN_ROWS, probes=IVF_PROBES, refresh_seconds=REFRESH_SECONDS):
+        self._database = database
+        self.ivf_min_rows = ivf_min_rows
+        self.probes = probes
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._watermark = None
+        self._version = None
+        self._checked_at = 0.0
+
+    @property
+    def database(self):
+        return self._database or get_database()
+
+    def __len__(self):
+        return len(self._snapshot.ids) if self._snapshot else 0
+
+    def _fetch(self, sql, params=None, param_types=None):
+        with self.database.snapshot() as snapshot:
+            return list(snapshot.execute_sql(sql, params=params, param_types=param_types))
+
+    def _read_version(self):
+        try:
+            rows = self._fetch(VERSION_SQL)
+        except Exception as e:
+            # Databases loaded before data_version existed never bump; treat them as version 0
+            logger.warning("Could not read data_version: %s", e)
+            return 0
+        return rows[0][0] if rows else 0
+
+    def _advance_watermark(self, rows):
+        stamps = [row[4] for row in rows if row[4] is not None]
+        if stamps and max(stamps) > self._watermark:
+            self._watermark = max(stamps)
+
+    def _build_ivf(self, matrix):
+        return IVFIndex(matrix) if len(matrix) >= self.ivf_min_rows else None
+
+    def load(self):
+        """(Re)builds the whole index from Spanner."""
+        with self._lock:
+            # Read first, so a load committed meanwhile is checked for deletions on the next refresh
+            self._version = self._read_version()
+            rows = self._fetch(LOAD_SQL)
+            self._watermark = EPOCH
+            self._advance_watermark(rows)
+            self.build([row[0] for row in rows], [row[1] for row in rows],
+                       [row[2] for row in rows], [row[3] for row in rows])
+            self._checked_at = time.monotonic()
+
+    def build(self, ids, names, details, vectors):
+        """Builds the index from in-memory rows (also used by benchmarks)."""
+        if not ids:
+            self._snapshot = _Snapshot([], [], [], np.empty((0, 0), dtype=np.float32), None)
+            return
+        matrix = normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1))
+        self._snapshot = _Snapshot(list(ids), list(names), list(details), matrix, self._build_ivf(matrix))
+
+    def refresh(self):
+        """Applies vectors written and rows removed since the last load or refresh; returns how many rows changed."""
+        if self._snapshot is None:
+            self.load()
+            return len(self)
+
+        from google.cloud import spanner
+
+        with self._lock:
+            self._checked_at = time.monotonic()
+            rows = self._fetch(
+                REFRESH_SQL,
+                params={"since": self._watermark},
+                param_types={"since": spanner.param_types.TIMESTAMP},
+            )
+            version = self._read_version()
+            count = self._fetch(COUNT_SQL)[0][0]
+            if rows:
+                self._advance_watermark(rows)
+                self.apply([row[0] for row in rows], [row[1] for row in rows],
+                           [row[2] for row in rows], [row[3] for row in rows])
+            removed = []
+            # A deletion either came with a catalog load, which bumps data_version, or left
+            # fewer embedded rows than the index holds
+            if version != self._version or count != len(self):
+                live = {row[0] for row in self._fetch(IDS_SQL)}
+                removed = [symptom_id for symptom_id in self._snapshot.ids if symptom_id not in live]
+                if removed:
+                    self.remove(removed)
+            self._version = version
+            return len(rows) + len(removed)
+
+    def apply(self, ids, names, details, vectors):
+        """Overwrites existing rows and appends new ones in a fresh snapshot."""
+        current = self._snapshot
+        if not current.ids:
+            self.build(ids, names, details, vectors)
+            return
+        new_ids, new_names, new_details = list(current.ids), list(current.names), list(current.details)
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1))
+
+        positions = []
+        for symptom_id, name, detail in zip(ids, names, details):
+            position = current.positions.get(symptom_id)
+            if position is None:
+                position = len(new_ids)
+                new_ids.append(symptom_id)
+                new_names.append(name)
+                new_details.append(detail)
+            else:
+                new_names[position] = name
+                new_details[position] = detail
+            positions.append(position)
+        positions = np.asarray(positions)
+
+        matrix = np.empty((len(new_ids), vectors.shape[1]), dtype=np.float32)
+        matrix[:len(current.ids)] = current.matrix
+        matrix[positions] = vectors
+
+        ivf = current.ivf
+        if ivf is None or len(new_ids) > 2 * ivf.trained_rows:
+            ivf = self._build_ivf(matrix)
+        else:
+            ivf = ivf.updated(positions, vectors)
+        self._snapshot = _Snapshot(new_ids, new_names, new_details, matrix, ivf)
+
+    def remove(self, ids):
+        """Drops the given rows in a fresh snapshot; IDs the index doesn't hold are ignored."""
+        current = self._snapshot
+        ids = set(ids)
+        keep = np.array([symptom_id not in ids for symptom_id in current.ids], dtype=bool)
+        if keep.all():
+            return
+        if not keep.any():
+            self.build([], [], [], [])
+            return
+        new_ids = [symptom_id for symptom_id, kept in zip(current.ids, keep) if kept]
+        new_names = [name for name, kept in zip(current.names, keep) if kept]
+        new_details = [detail for detail, kept in zip(current.details, keep) if kept]
+        matrix = current.matrix[keep]
+        ivf = current.ivf
+        if ivf is not None:
+            ivf = ivf.removed(keep) if len(new_ids) >= self.ivf_min_rows else None
+        self._snapshot = _Snapshot(new_ids, new_names, new_details, matrix, ivf)
+
+    def maybe_refresh(self):
+        if self._snapshot is None:
+            self.load()
+        elif time.monotonic() - self._checked_at >= self.refresh_seconds:
+            self.refresh()
+
+    def search_many(self, vectors, k=5, exact=False):
+        """Returns, for each query vector, its k nearest symptoms with cosine distances."""
+        snapshot = self._snapshot
+        if not snapshot.ids:
+            return [[] for _ in vectors]
+        queries = normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1))
+        results = []
+
+        if snapshot.ivf is None or exact:
+            scores = queries @ snapshot.matrix.T
+            for row_scores in scores:
+                best = top_k(row_scores, k)
+                results.append(self._describe(snapshot, best, row_scores[best]))
+            return results
+
+        for query in queries:
+            candidates = snapshot.ivf.candidates(query, self.probes)
+            candidate_scores = snapshot.matrix[candidates] @ query
+            best = top_k(candidate_scores, k)
+            results.append(self._describe(snapshot, candidates[best], candidate_scores[best]))
+        return results
+
+    def search(self, vector, k=5, exact=False):
+        return self.search_many([vector], k, exact)[0]
+
+    @staticmethod
+    def _describe(snapshot, positions, scores):
+        return [
+            {
+                "symptom_id": snapshot.ids[p],
+                "symptom_name": snapshot.names[p],
+                "symptom_details": snapshot.details[p],
+                "distance": round(max(0.0, float(1.0 - score)), 6),
+            }
+            for p, score in zip(positions, scores)
+        ]
+
+
+_symptom_index = SymptomIndex()
+
+def get_symptom_index():
+    """Returns the shared index, loading it on first use and refreshing it periodically."""
+    _symptom_index.maybe_refresh()
+    return _symptom_index
@@ -0,0 +1,133 @@
+"""Per-turn latency of model calls, tool calls and memory preload, and query embedding cache lookups.
+
+Each observation is logged as one JSON line carrying the invocation ID and, when the
+frontend passes it in run_config.custom_metadata, its request ID. At the end of the turn
+the collected timings are written to session state under TURN_TIMINGS_KEY, so they reach
+the frontend in the event's state_delta and are exported on its /metrics endpoint.
+"""
+import json
+import time
+import logging
+from . import coalescing
+from .embedding_cache import get_embedding_cache
+from .turn_state import InvocationMap
+
+# Must match TURN_TIMINGS_KEY in Zooka_app/metrics.py
+TURN_TIMINGS_KEY = "zooka_turn_timings"
+
+logger = logging.getLogger(__name__)
+
+# invocation_id -> timings collected so far; popped by after_agent_callback, or expired
+# when the turn aborted before it
+_turns = InvocationMap()
+
+
+def _turn(context):
+    return _turns.get_or_create(context.invocation_id, lambda: {"model": [], "tools": [], "memory_preload": [], "started": {}})
+
+
+def _log(context, event, **fields):
+    metadata = (context.run_config.custom_metadata if context.run_config else None) or {}
+    logger.info(json.dumps({
+        "event": event,
+        "invocation_id": context.invocation_id,
+        "session_id": context.session.id,
+        "request_id": metadata.get("request_id"),
+        **fields,
+    }, default=str))
+
+
+def before_model_callback(callback_context, llm_request):
+    _turn(callback_context)["started"]["model"] = (time.perf_counter(), llm_request.model)
+    return None
+
+
+def _record_model_call(callback_context, usage=None, error=None):
+    started = _turn(callback_context)["started"].pop("model", None)
+    if started is None:
+        return
+    start, model = started
+    call = {"model": model, "seconds": round(time.perf_counter() - start, 4)}
+    if usage is not None:
+        call.update({
+            "prompt_tokens": usage.prompt_token_count or 0,
+            "output_tokens": usage.candidates_token_count or 0,
+            "thoughts_tokens": usage.thoughts_token_count or 0,
+            "cached_tokens": usage.cached_content_token_count or 0,
+        })
+    if error is not None:
+        call["error"] = type(error).__name__
+    _turn(callback_context)["model"].append(call)
+    _log(callback_context, "model_call", **call)
+
+
+def after_model_callback(callback_context, llm_response):
+    # Partial chunks of a streamed response share the final chunk's timing
+    if not llm_response.partial:
+        _record_model_call(callback_context, usage=llm_response.usage_metadata)
+    return None
+
+
+def on_model_error_callback(callback_context, llm_request, error):
+    _record_model_call(callback_context, error=error)
+    return None
+
+
+def before_tool_callback(tool, args, tool_context):
+    # Keyed by call ID: parallel calls of the same tool are timed separately
+    _turn(tool_context)["started"][tool_context.function_call_id] = time.perf_counter()
+    coalescing.outcome.set(None)
+    return None
+
+
+def _record_tool_call(tool, tool_context, error=None):
+    start = _turn(tool_context)["started"].pop(tool_context.function_call_id, None)
+    if start is None:
+        return
+    call = {"name": tool.name, "seconds": round(time.perf_counter() - start, 4)}
+    # Catalog tools report whether they queried the backend or shared an identical call's result
+    if coalescing.outcome.get():
+        call["outcome"] = coalescing.outcome.get()
+    if error is not None:
+        call["error"] = type(error).__name__
+    _turn(tool_context)["tools"].append(call)
+    _log(tool_context, "tool_call", **call)
+
+
+def after_tool_callback(tool, args, tool_context, tool_response):
+    _record_tool_call(tool, tool_context)
+    return None
+
+
+def on_tool_error_callback(tool, args, tool_context, error):
+    _record_tool_call(tool, tool_context, error=error)
+    return None
+
+
+def after_agent_callback(callback_context):
+    turn = _turns.pop(callback_context.invocation_id, None)
+    if turn:
+        turn.pop("started")
+        # The cache is shared by every session in this process: a turn carries the lookups made
+        # since the previous turn ended, so the frontend's counters add up to the process's lookups
+        embedding_cache = get_embedding_cache().take_counts()
+        if embedding_cache:
+            turn["embedding_cache"] = embedding_cache
+        callback_context.state[TURN_TIMINGS_KEY] = turn
+    return None
+
+
+def record_route(callback_context, route, seconds):
+    """Records which tier answered the turn and how long triage took."""
+    route = {"route": route, "seconds": round(seconds, 4)}
+    _turn(callback_context)["route"] = route
+    _log(callback_context, "route", **route)
+
+
+def record_memory_preload(tool_context, seconds, cached):
+    """Memory is preloaded while the LLM request is built, before any callback, so the
+    preloading tool reports it here. Only remote searches count towards the turn's timings."""
+    seconds = round(seconds, 4)
+    if not cached:
+        _turn(tool_context)["memory_preload"].append(seconds)
+    _log(tool_context, "memory_preload", seconds=seconds, cached=cached)
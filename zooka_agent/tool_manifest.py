@@ -0,0 +1,146 @@
+"""Toolbox tools declared from a manifest shipped with the agent.
+
+ToolboxToolset asks the Toolbox service for its tool manifest (an MCP initialize and a
+tools/list round trip) whenever the agent builds a model request, so the first turn of a
+new instance waits on the Toolbox service, which may itself be cold. ManifestToolset
+declares the tools from tool_manifest.json, generated from Toolbox/tools.yaml at deploy
+time:
+
+    python3 zooka_agent/tool_manifest.py Toolbox/tools.yaml
+
+and only connects to Toolbox when a tool is called. If the live manifest no longer
+matches the shipped one, the mismatch is logged.
+"""
+import os
+import sys
+import json
+import asyncio
+import logging
+import urllib.error
+import urllib.request
+from google.genai import types
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.base_toolset import BaseToolset
+
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tool_manifest.json")
+TOOLSET = "my-toolset"
+# Toolbox parameter types that JSON schema spells differently
+JSON_TYPES = {"float": "number"}
+
+logger = logging.getLogger(__name__)
+
+
+def build_manifest(tools_yaml, toolset=TOOLSET):
+    """The MCP tools/list result Toolbox serves for toolset, from its tools.yaml."""
+    import yaml
+
+    with open(tools_yaml) as f:
+        config = yaml.safe_load(f)
+    return {
+        "toolset": toolset,
+        "tools": [{
+            "name": name,
+            "description": " ".join(tool["description"].split()),
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    p["name"]: {"type": JSON_TYPES.get(p["type"], p["type"]), "description": p["description"].strip()}
+                    for p in tool.get("parameters", [])
+                },
+                "required": [p["name"] for p in tool.get("parameters", []) if p.get("required", True)],
+            },
+        } for name in config["toolsets"][toolset] for tool in [config["tools"][name]]],
+    }
+
+
+def load_manifest(path=MANIFEST_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _schema(json_schema):
+    return types.Schema(
+        type=json_schema["type"].upper(),
+        description=json_schema.get("description"),
+        properties={name: _schema(p) for name, p in json_schema.get("properties", {}).items()} or None,
+        required=json_schema.get("required") or None,
+        items=_schema(json_schema["items"]) if "items" in json_schema else None,
+    )
+
+
+class ManifestTool(BaseTool):
+
+    def __init__(self, toolset, spec):
+        super().__init__(name=spec["name"], description=spec["description"])
+        self._toolset = toolset
+        self._declaration = types.FunctionDeclaration(
+            name=spec["name"],
+            description=spec["description"],
+            parameters=_schema(spec["inputSchema"]),
+        )
+
+    def _get_declaration(self):
+        return self._declaration
+
+    async def run_async(self, *, args, tool_context):
+        tool = await self._toolset.remote_tool(self.name)
+        return await tool(**args)
+
+
+class ManifestToolset(BaseToolset):
+
+    def __init__(self, server_url, toolset_name=TOOLSET, manifest_path=MANIFEST_PATH):
+        super().__init__()
+        self.server_url = server_url
+        self.toolset_name = toolset_name
+        self._manifest = load_manifest(manifest_path)
+        self._tools = [ManifestTool(self, spec) for spec in self._manifest["tools"]]
+        # The Toolbox client's HTTP session belongs to the event loop that created it
+        self._loop = None
+        self._client = None
+        self._remote = None
+        self._lock = None
+
+    async def get_tools(self, readonly_context=None):
+        return self._tools
+
+    async def _load_remote(self):
+        from toolbox_core import ToolboxClient
+
+        client = ToolboxClient(self.server_url)
+        remote = {tool.__name__: tool for tool in await client.load_toolset(self.toolset_name)}
+        declared = {spec["name"] for spec in self._manifest["tools"]}
+        if declared != set(remote):
+            logger.warning("tool_manifest.json is stale: declares %s, Toolbox serves %s",
+                           sorted(declared), sorted(remote))
+        return client, remote
+
+    async def remote_tool(self, name):
+        """The Toolbox tool behind name, loaded on the first call from this event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._lock, self._client, self._remote = loop, asyncio.Lock(), None, None
+        async with self._lock:
+            if self._remote is None:
+                self._client, self._remote = await self._load_remote()
+        return self._remote[name]
+
+    def warm_up(self, timeout=10):
+        """Wakes the Toolbox service up; any HTTP response means an instance is serving."""
+        try:
+            urllib.request.urlopen(self.server_url, timeout=timeout).close()
+        except urllib.error.HTTPError:
+            pass
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client, self._remote = None, None
+
+
+if __name__ == "__main__":
+    tools_yaml = sys.argv[1] if len(sys.argv) > 1 else "Toolbox/tools.yaml"
+    with open(MANIFEST_PATH, "w") as f:
+        json.dump(build_manifest(tools_yaml), f, indent=2)
+        f.write("\n")
+    print(f"Wrote {MANIFEST_PATH}")
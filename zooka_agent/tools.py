@@ -0,0 +1,220 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from .spanner_db import get_database, POOL_SIZE
+from .embeddings import embed_text, embed_texts
+from .symptom_index import get_symptom_index
+from .graph_cache import get_graph_cache
+from .coalescing import get_coalescer
+
+# How many nearest symptoms find_all_diseases_by_symptom returns
+SYMPTOM_TOP_K = int(os.getenv("SYMPTOM_TOP_K", "3"))
+# Stored symptoms further than this cosine distance from a reported symptom are ignored when ranking
+MATCH_MAX_DISTANCE = float(os.getenv("SYMPTOM_MATCH_MAX_DISTANCE", "0.35"))
+RANKED_DISEASES_LIMIT = int(os.getenv("RANKED_DISEASES_LIMIT", "10"))
+
+# Weight of the Confidence label on an indicate edge when aggregating evidence
+CONFIDENCE_WEIGHTS = {"high": 1.0, "medium": 0.6, "low": 0.3}
+
+# ADK runs the function calls of one model response concurrently; each tool's blocking
+# Spanner work runs here, one thread per pooled Spanner session
+_executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="zooka-tool")
+
+async def _run_blocking(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+
+async def _run_coalesced(tool, args, func, *func_args):
+    """Runs func like _run_blocking, sharing one run among identical concurrent calls (see coalescing.py)."""
+    return await get_coalescer().run(tool, args, lambda: _run_blocking(func, *func_args))
+
+DISEASES_BY_SYMPTOMS_SQL = """
+    SELECT i.SymptomID, d.Name, d.Description, i.Confidence
+    FROM indicate i
+    JOIN disease d ON d.ID = i.DiseaseID
+    WHERE i.SymptomID IN UNNEST(@symptom_ids)
+"""
+
+def diseases_by_symptom_ids(symptom_ids):
+    """Maps each symptom ID to the diseases it indicates, from the graph cache where possible."""
+    diseases = get_graph_cache().diseases_by_symptom_ids(symptom_ids)
+    missing = [symptom_id for symptom_id, found in diseases.items() if found is None]
+    if missing:
+        diseases.update(query_diseases_by_symptom_ids(missing))
+    return diseases
+
+def query_diseases_by_symptom_ids(symptom_ids):
+    """Maps each symptom ID to the diseases it indicates, straight from Spanner."""
+    from google.cloud import spanner
+
+    diseases = {symptom_id: [] for symptom_id in symptom_ids}
+    with get_database().snapshot() as snapshot:
+        results = snapshot.execute_sql(
+            DISEASES_BY_SYMPTOMS_SQL,
+            params={"symptom_ids": list(symptom_ids)},
+            param_types={"symptom_ids": spanner.param_types.Array(spanner.param_types.STRING)},
+        )
+        for symptom_id, name, description, confidence in results:
+            diseases[symptom_id].append({
+                "disease_name": name,
+                "confidence": confidence,
+                "disease_description": description,
+            })
+    return diseases
+
+def _find_all_diseases_by_symptom(symptom):
+    vector = embed_text(symptom)
+    if not vector:
+        return {"symptom": symptom, "matches": []}
+
+    matches = get_symptom_index().search(vector, k=SYMPTOM_TOP_K)
+    diseases = diseases_by_symptom_ids([m["symptom_id"] for m in matches])
+    for match in matches:
+        match["diseases"] = diseases[match.pop("symptom_id")]
+    return {"symptom": symptom, "matches": matches}
+
+async def find_all_diseases_by_symptom(symptom: str) -> dict:
+    """Search for all possible diseases based on one specific symptom.
+
+    Args:
+        symptom: The symptom to search for, including its details and conditions.
+
+    Returns:
+        The closest stored symptoms with their cosine distance (lower is closer) and, for each one,
+        the disease name, disease description and the confidence level that this is the correct disease.
+    """
+    return await _run_coalesced("find_all_diseases_by_symptom", {"symptom": symptom}, _find_all_diseases_by_symptom, symptom)
+
+def _rank_diseases_by_symptoms(symptoms):
+    symptoms = [s for s in dict.fromkeys(symptoms) if s and s.strip()]
+    vectors = embed_texts(symptoms)
+    queries = [(s, v) for s, v in zip(symptoms, vectors) if v is not None]
+    if not queries:
+        return {"symptoms": symptoms, "diseases": []}
+
+    neighbours = get_symptom_index().search_many([v for _, v in queries], k=SYMPTOM_TOP_K)
+    # Always keep each reported symptom's nearest neighbour, like the single-symptom tool does
+    neighbours = [[m for i, m in enumerate(ms) if i == 0 or m["distance"] <= MATCH_MAX_DISTANCE] for ms in neighbours]
+    diseases_by_symptom = diseases_by_symptom_ids({m["symptom_id"] for ms in neighbours for m in ms})
+
+    ranked = {}
+    for (reported, _), matches in zip(queries, neighbours):
+        # Best evidence this reported symptom gives each disease
+        best = {}
+        for match in matches:
+            similarity = max(0.0, 1.0 - match["distance"])
+            for disease in diseases_by_symptom[match["symptom_id"]]:
+                weight = CONFIDENCE_WEIGHTS.get((disease["confidence"] or "").lower(), 0.3)
+                score = similarity * weight
+                if disease["disease_name"] not in best or score > best[disease["disease_name"]][0]:
+                    best[disease["disease_name"]] = (score, disease, match)
+
+        for name, (score, disease, match) in best.items():
+            entry = ranked.setdefault(name, {
+                "disease_name": name,
+                "disease_description": disease["disease_description"],
+                "matched_symptom_count": 0,
+                "confidence_score": 0.0,
+                "matched_symptoms": [],
+            })
+            entry["matched_symptom_count"] += 1
+            entry["confidence_score"] += score
+            entry["matched_symptoms"].append({
+                "reported_symptom": reported,
+                "stored_symptom": match["symptom_name"],
+                "confidence": disease["confidence"],
+                "distance": match["distance"],
+            })
+
+    diseases = sorted(ranked.values(), key=lambda d: (d["matched_symptom_count"], d["confidence_score"]), reverse=True)
+    for disease in diseases:
+        disease["confidence_score"] = round(disease["confidence_score"] / len(queries), 4)
+    return {"symptoms": symptoms, "diseases": diseases[:RANKED_DISEASES_LIMIT]}
+
+async def rank_diseases_by_symptoms(symptoms: list[str]) -> dict:
+    """Rank possible diseases for ALL of the user's symptoms in a single call.
+
+    Args:
+        symptoms: Every symptom the user reported, each concatenated with its details and conditions.
+
+    Returns:
+        Diseases ordered by how many of the symptoms indicate them, then by an aggregated confidence
+        score between 0 and 1. Each disease lists its description and the symptoms that matched it
+        with their confidence level and cosine distance.
+    """
+    return await _run_coalesced("rank_diseases_by_symptoms", {"symptoms": symptoms}, _rank_diseases_by_symptoms, symptoms)
+
+def _by_disease(disease, lookup, key):
+    """Runs lookup on the stored disease name that `disease` resolves to (see disease_names.py)."""
+    match, others = get_graph_cache().match_disease(disease)
+    result = {"disease": disease}
+    if match is not None:
+        result.update(matched_disease=match["disease_name"], match_score=match["match_score"])
+        result[key] = lookup(match["disease_name"])
+        return result
+    # Not in the snapshot; the exact lookup still finds diseases added since it was loaded
+    result.update(matched_disease=None, match_score=0.0)
+    result[key] = lookup(disease)
+    if not result[key] and others:
+        result["did_you_mean"] = [m["disease_name"] for m in others]
+    return result
+
+async def search_diagnostic_by_disease(disease: str) -> dict:
+    """Find all diagnostic tests for a specific given disease.
+
+    Args:
+        disease: The name of the disease. Common names and abbreviations are resolved to the stored name.
+
+    Returns:
+        The stored disease name the argument matched with a match score between 0 and 1 (or, when
+        the name is ambiguous or matched nothing, the diseases to ask the user about in did_you_mean),
+        and the diagnostic name, details and whether it's gold standard for this specific disease.
+    """
+    return await _run_coalesced("search_diagnostic_by_disease", {"disease": disease},
+                                _by_disease, disease, get_graph_cache().diagnostics, "diagnostics")
+
+async def search_cure_by_disease(disease: str) -> dict:
+    """Find all treatments for a specific given disease.
+
+    Args:
+        disease: The name of the disease. Common names and abbreviations are resolved to the stored name.
+
+    Returns:
+        The stored disease name the argument matched with a match score between 0 and 1 (or, when
+        the name is ambiguous or matched nothing, the diseases to ask the user about in did_you_mean),
+        and the treatment name, details, type and confidence that it would cure the disease.
+    """
+    return await _run_coalesced("search_cure_by_disease", {"disease": disease},
+                                _by_disease, disease, get_graph_cache().treatments, "treatments")
+
+def _disease_dossier(disease):
+    match, others = get_graph_cache().match_disease(disease)
+    name = match["disease_name"] if match else disease
+    dossier = get_graph_cache().dossier(name)
+    result = {"disease": disease, "matched_disease": name if dossier else None,
+              "match_score": match["match_score"] if match else 0.0}
+    if dossier is None:
+        if others:
+            result["did_you_mean"] = [m["disease_name"] for m in others]
+        return result
+    return {**result, **dossier}
+
+async def get_disease_dossier(disease: str) -> dict:
+    """Fetch everything about one disease at once: its description, symptoms, diagnostic tests and treatments.
+
+    Args:
+        disease: The name of the disease. Common names and abbreviations are resolved to the stored name.
+
+    Returns:
+        The stored disease name the argument matched with a match score between 0 and 1 (or, when the
+        name is ambiguous or matched nothing, the diseases to ask the user about in did_you_mean), the disease
+        description, the symptoms that indicate it with their confidence, the diagnostic name, details and
+        whether it's gold standard, and the treatment name, details, type and confidence that it would cure
+        the disease.
+    """
+    return await _run_coalesced("get_disease_dossier", {"disease": disease}, _disease_dossier, disease)
+
+def warm_up():
+    """Opens the Spanner session pool and loads the catalog snapshots the tools read."""
+    get_database()
+    get_graph_cache().graph()
+    get_symptom_index()
@@ -0,0 +1,60 @@
+"""Per-turn state the agent's callbacks keep in process memory, keyed by invocation ID.
+
+The callback that ends a turn removes its entry, but a turn that aborts (a model error,
+a cancelled request, an admission timeout on the frontend) never reaches it. Entries are
+therefore dropped TTL_SECONDS after they were created, checked whenever an entry is
+added, so abandoned turns can't pile up in a long-running worker.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+
+# Longer than any turn; an entry this old belongs to a turn that ended without cleaning up
+TTL_SECONDS = float(os.getenv("TURN_STATE_TTL_SECONDS", "900"))
+
+
+class InvocationMap:
+    """invocation_id -> value, each entry expiring TTL_SECONDS after it was added."""
+
+    def __init__(self, ttl=TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # invocation_id -> (added at, value), oldest first
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expire(self, now):
+        while self._entries:
+            added, _ = next(iter(self._entries.values()))
+            if now - added < self.ttl:
+                break
+            self._entries.popitem(last=False)
+
+    def get(self, invocation_id, default=None):
+        entry = self._entries.get(invocation_id)
+        return default if entry is None else entry[1]
+
+    def get_or_create(self, invocation_id, factory):
+        """The entry for invocation_id, adding factory() first if there is none."""
+        with self._lock:
+            entry = self._entries.get(invocation_id)
+            if entry is None:
+                now = time.monotonic()
+                self._expire(now)
+                entry = self._entries[invocation_id] = (now, factory())
+            return entry[1]
+
+    def set(self, invocation_id, value):
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            self._entries.pop(invocation_id, None)
+            self._entries[invocation_id] = (now, value)
+
+    def pop(self, invocation_id, default=None):
+        with self._lock:
+            entry = self._entries.pop(invocation_id, None)
+        return default if entry is None else entry[1]